@@ -0,0 +1,72 @@
+"""
+Per-page cost of getting a rendered PDF page to the model.
+
+Compares the old path (pixmap -> PNG bytes -> PIL decode -> temp PNG on disk ->
+model re-opens it) with the in-memory path (pixmap samples wrapped by
+Image.frombuffer, handed to the model without touching disk).
+
+    python benchmarks/bench_page_decode.py --pages 10 --dpi 200
+"""
+import io
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli.converters import raster_to_image  # noqa: E402
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((48, 60 + line * 18), f"Page {i + 1} line {line + 1}: the quick brown fox jumps over the lazy dog")
+    doc.save(path)
+    doc.close()
+
+def old_path(pix, tmp_dir):
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    temp_img_path = Path(tmp_dir) / "temp_page.png"
+    image.save(temp_img_path)
+    # What the model's load_image then does with the path
+    with Image.open(temp_img_path) as reloaded:
+        reloaded.convert("RGB")
+    temp_img_path.unlink()
+
+def new_path(pix, tmp_dir):
+    raster_to_image(pix.width, pix.height, pix.stride, pix.samples).convert("RGB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = Path(tmp_dir) / "bench.pdf"
+        make_pdf(pdf_path, args.pages)
+        doc = fitz.open(pdf_path)
+        pixmaps = [doc.load_page(i).get_pixmap(dpi=args.dpi, alpha=False) for i in range(len(doc))]
+
+        results = {}
+        for name, fn in [("png round-trip + temp file", old_path), ("in-memory frombuffer", new_path)]:
+            start = time.perf_counter()
+            for pix in pixmaps:
+                fn(pix, tmp_dir)
+            results[name] = (time.perf_counter() - start) / len(pixmaps) * 1000
+        doc.close()
+
+    w, h = pixmaps[0].width, pixmaps[0].height
+    print(f"{args.pages} pages at {args.dpi} DPI ({w}x{h})")
+    for name, ms in results.items():
+        print(f"  {name:<28} {ms:8.2f} ms/page")
+    old_ms, new_ms = results.values()
+    print(f"  saved {old_ms - new_ms:.2f} ms/page ({old_ms / max(new_ms, 1e-9):.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
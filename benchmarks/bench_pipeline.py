@@ -0,0 +1,292 @@
+"""
+Offline end-to-end benchmark of the OCR pipeline with a stub model.
+
+Generates a synthetic corpus (a multi-page PDF, a DOCX and a PNG at configurable
+page counts and resolutions), saves the deterministic stand-in model from
+stub_model.py as a local model directory and runs every input through
+`process_file` on CPU, each in a fresh process. Records pages/sec, per-stage
+latency (ms/page, from the --metrics-json report) and peak RSS, and compares them
+with a baseline file: the run fails if anything regressed beyond the tolerances.
+Needs no network and no GPU.
+
+    python benchmarks/bench_pipeline.py                    # compare with benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --update-baseline  # record a new baseline
+    python benchmarks/bench_pipeline.py --pages 20 --page-size a4 --image-size 2480x3508
+"""
+import io
+import sys
+import json
+import zipfile
+import argparse
+import tempfile
+import contextlib
+import multiprocessing as mp
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+sys.path.insert(0, str(BENCH_DIR))
+
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+PAGE_SIZES = {"a4": (595, 842), "letter": (612, 792), "a3": (842, 1191)}
+# Stage differences below this are timer noise, not regressions
+MIN_STAGE_DELTA_MS = 5.0
+MIN_RSS_DELTA_MB = 20.0
+
+def sample_text(page, line):
+    return f"Page {page + 1}, line {line + 1}: the quick brown fox jumps over the lazy dog 0123456789"
+
+def make_pdf(path, pages, page_size):
+    width, height = page_size
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((48, 56), f"Synthetic report, page {i + 1}", fontsize=18)
+        for line in range(int((height - 140) // 16)):
+            page.insert_text((48, 90 + line * 16), sample_text(i, line), fontsize=10)
+        # A table-like grid, so pages are not text only
+        for col in range(4):
+            page.draw_rect(fitz.Rect(48 + col * 120, height - 40, 160 + col * 120, height - 20), color=(0, 0, 0))
+    doc.save(path)
+    doc.close()
+
+def make_docx(path, pages, lines_per_page=40):
+    """
+    Minimal WordprocessingML package with one page break per page (no python-docx needed).
+    """
+    body = []
+    for i in range(pages):
+        body.append(f'<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>Synthetic report, page {i + 1}</w:t></w:r></w:p>')
+        for line in range(lines_per_page):
+            body.append(f"<w:p><w:r><w:t>{escape(sample_text(i, line))}</w:t></w:r></w:p>")
+        if i < pages - 1:
+            body.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{"".join(body)}</w:body></w:document>'
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '</Types>'
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", content_types)
+        package.writestr("_rels/.rels", rels)
+        package.writestr("word/document.xml", document)
+
+def make_image(path, image_size):
+    width, height = image_size
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    line_height = max(12, height // 60)
+    for line in range((height - 2 * line_height) // line_height):
+        draw.text((width // 20, line_height + line * line_height), sample_text(0, line), fill="black")
+    image.save(path)
+
+def make_stub_model(model_dir):
+    """
+    Save the stub as a trust_remote_code model directory with a word-level tokenizer.
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+    from stub_model import StubOCRConfig, StubOCRModel
+
+    torch.manual_seed(0)
+    StubOCRConfig.register_for_auto_class()
+    StubOCRModel.register_for_auto_class("AutoModel")
+    StubOCRModel(StubOCRConfig()).save_pretrained(model_dir, safe_serialization=True)
+
+    vocab = {"<unk>": 0, "<pad>": 1, "</s>": 2}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="<unk>", pad_token="<pad>",
+                            eos_token="</s>").save_pretrained(model_dir)
+
+def run_case(input_path, output_dir, model_dir, cache_dir, batch_size, verbose):
+    """
+    One process_file run in a fresh process; returns its metrics report, or {"error": ...}.
+    """
+    from deepseek_ocr_cli.core import process_file
+
+    metrics_path = Path(output_dir) / "metrics.json"
+    log = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with log:
+            result = process_file(
+                input_path, None, "document", output_dir, "cpu", model_dir,
+                cache_dir=cache_dir, use_cache=False, batch_size=batch_size, metrics_json=metrics_path,
+            )
+    except Exception as e:
+        return {"error": str(e)}
+    if result is None or not metrics_path.exists():
+        return {"error": "no output (run with --verbose for details)"}
+    report = json.loads(metrics_path.read_text(encoding="utf-8"))
+    report["output"] = Path(result).read_text(encoding="utf-8")
+    return report
+
+def summarize(report):
+    pages = max(report["pages"], 1)
+    stages = {
+        name: round(stage["seconds"] / pages * 1000, 2)
+        for name, stage in report["stages"].items() if name != "model load"
+    }
+    return {
+        "pages": report["pages"],
+        "pages_per_sec": round(report["pages"] / report["wall_time"], 3) if report["wall_time"] else None,
+        "model_load_s": round(report["stages"].get("model load", {}).get("seconds", 0.0), 3),
+        "stage_ms_per_page": stages,
+        "peak_rss_mb": report["peak_rss_mb"],
+    }
+
+def best_of(runs):
+    """
+    Combine repeated runs of a case, keeping the best value of each metric to damp noise.
+    """
+    best = dict(runs[0])
+    best["pages_per_sec"] = max(run["pages_per_sec"] for run in runs)
+    best["model_load_s"] = min(run["model_load_s"] for run in runs)
+    best["stage_ms_per_page"] = {
+        stage: min(run["stage_ms_per_page"].get(stage, ms) for run in runs)
+        for stage, ms in runs[0]["stage_ms_per_page"].items()
+    }
+    rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"]]
+    best["peak_rss_mb"] = min(rss) if rss else None
+    return best
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """
+    Return a list of human-readable regressions against the baseline.
+    """
+    regressions = []
+    for case, current in results.items():
+        base = baseline.get("cases", {}).get(case)
+        if base is None:
+            continue
+        if base.get("output_sha") and current.get("output_sha") != base["output_sha"]:
+            regressions.append(f"{case}: output changed (stub model output should be deterministic)")
+        if base.get("pages_per_sec") and current["pages_per_sec"] < base["pages_per_sec"] * (1 - tolerance):
+            regressions.append(f"{case}: pages/sec {current['pages_per_sec']} < baseline {base['pages_per_sec']}")
+        for stage, ms in current["stage_ms_per_page"].items():
+            base_ms = base.get("stage_ms_per_page", {}).get(stage)
+            if base_ms is not None and ms > base_ms * (1 + tolerance) and ms - base_ms > MIN_STAGE_DELTA_MS:
+                regressions.append(f"{case}: {stage} {ms} ms/page > baseline {base_ms}")
+        base_rss = base.get("peak_rss_mb")
+        rss = current.get("peak_rss_mb")
+        if base_rss and rss and rss > base_rss * (1 + memory_tolerance) and rss - base_rss > MIN_RSS_DELTA_MB:
+            regressions.append(f"{case}: peak RSS {rss} MB > baseline {base_rss} MB")
+    return regressions
+
+def parse_size(value):
+    if value.lower() in PAGE_SIZES:
+        return PAGE_SIZES[value.lower()]
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+def main():
+    import hashlib
+    from deepseek_ocr_cli.core import load_model
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=8, help="Pages in the synthetic PDF and DOCX")
+    parser.add_argument("--page-size", default="a4", help="PDF page size: a4, letter, a3 or WxH in points")
+    parser.add_argument("--image-size", default="1654x2339", help="PNG size in pixels (default: A4 at 200 DPI)")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best value of each metric is kept")
+    parser.add_argument("--cases", default="pdf,docx,png", help="Comma-separated subset of pdf,docx,png")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (fraction)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.15, help="Allowed peak RSS growth (fraction)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        model_dir, cache_dir = tmp / "stub-model", tmp / "cache"
+        make_stub_model(model_dir)
+        # Build the pre-cast weights once, so every case measures the warm load path
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_model("cpu", str(model_dir), cache_dir=str(cache_dir))
+
+        # Synthetic inputs, one per case
+        inputs = {}
+        if "pdf" in cases:
+            inputs["pdf"] = tmp / "pdf" / "corpus.pdf"
+            inputs["pdf"].parent.mkdir()
+            make_pdf(inputs["pdf"], args.pages, parse_size(args.page_size))
+        if "docx" in cases:
+            inputs["docx"] = tmp / "docx" / "corpus.docx"
+            inputs["docx"].parent.mkdir()
+            make_docx(inputs["docx"], args.pages)
+        if "png" in cases:
+            inputs["png"] = tmp / "png" / "corpus.png"
+            inputs["png"].parent.mkdir()
+            make_image(inputs["png"], parse_size(args.image_size))
+
+        ctx = mp.get_context("spawn")
+        for case, input_path in inputs.items():
+            runs = []
+            for _ in range(max(1, args.repeat)):
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                    report = executor.submit(
+                        run_case, str(input_path), str(tmp / f"out-{case}"), str(model_dir), str(cache_dir),
+                        args.batch_size, args.verbose,
+                    ).result()
+                if "error" in report:
+                    break
+                run = summarize(report)
+                run["output_sha"] = hashlib.sha256(report["output"].encode("utf-8")).hexdigest()[:16]
+                runs.append(run)
+            if not runs:
+                print(f"  {case:<6} skipped: {report['error']}")
+                continue
+            results[case] = best_of(runs)
+
+    for case, result in results.items():
+        stages = ", ".join(f"{name} {ms}" for name, ms in result["stage_ms_per_page"].items())
+        print(f"  {case:<6} {result['pages']:>3} pages  {result['pages_per_sec']:>7} pages/s  "
+              f"load {result['model_load_s']}s  peak RSS {result['peak_rss_mb']} MB")
+        print(f"         ms/page: {stages}")
+
+    config = {"pages": args.pages, "page_size": args.page_size, "image_size": args.image_size,
+              "batch_size": args.batch_size}
+    if args.update_baseline or not args.baseline.exists():
+        args.baseline.write_text(json.dumps({"config": config, "cases": results}, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("config") != config:
+        print(f"Baseline was recorded with {baseline.get('config')}; rerun with the same settings or --update-baseline")
+        sys.exit(2)
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    if regressions:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
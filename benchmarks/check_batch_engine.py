@@ -0,0 +1,151 @@
+"""
+Batched decoding (`--batch-size`) against the upstream per-page `model.infer`.
+
+Runs a fixed page set through the model once per page with model.infer and once
+through BatchedInferenceEngine in batches of --batch-size, at every resolution
+preset (or those given with --preset), recording what each path hands to
+`model.generate`. Checks that every page gets the same input ids,
+image token mask, crop grid and image tensors on both paths, compares the cleaned
+text page by page (difflib similarity) and prints pages/min for each path. Exits
+non-zero if the inputs differ or the mean similarity drops below --min-similarity.
+Without inputs a synthetic PDF is used.
+
+    python benchmarks/check_batch_engine.py
+    python benchmarks/check_batch_engine.py samples/report.pdf samples/scan.png --pages 8 --batch-size 4
+    python benchmarks/check_batch_engine.py --preset tiny --preset small
+"""
+import sys
+import time
+import difflib
+import argparse
+import tempfile
+from pathlib import Path
+
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from bench_page_decode import make_pdf  # noqa: E402
+from check_quantization import load_pages  # noqa: E402
+from deepseek_ocr_cli.core import load_model, get_device, get_prompt, run_inference  # noqa: E402
+from deepseek_ocr_cli.engine import BatchedInferenceEngine  # noqa: E402
+from deepseek_ocr_cli.resolution import PRESETS  # noqa: E402
+from deepseek_ocr_cli.utils import clean_ocr_output  # noqa: E402
+
+def record_generate(model):
+    """
+    Wrap `model.generate` to keep, per batch row, the unpadded inputs it was called with.
+    Returns the list the rows are appended to.
+    """
+    rows = []
+    generate = model.generate
+    def recording_generate(*args, **kwargs):
+        input_ids = kwargs.get("input_ids", args[0] if args else None)
+        attention_mask = kwargs.get("attention_mask")
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        seq_mask = kwargs["images_seq_mask"]
+        spatial_crop = torch.as_tensor(kwargs["images_spatial_crop"]).reshape(len(input_ids), -1)
+        for row, (crop, ori) in enumerate(kwargs["images"]):
+            keep = attention_mask[row].bool()
+            rows.append({
+                "input_ids": input_ids[row][keep].tolist(),
+                "images_seq_mask": seq_mask[row][keep].tolist(),
+                "images_spatial_crop": spatial_crop[row].tolist(),
+                "images_ori": ori.float().cpu(),
+                "images_crop": crop.float().cpu(),
+            })
+        return generate(*args, **kwargs)
+    model.generate = recording_generate
+    return rows
+
+def input_differences(upstream, batched):
+    """
+    What differs between the generate inputs of one page on the two paths.
+    """
+    differences = [name for name in ("input_ids", "images_seq_mask", "images_spatial_crop")
+                   if upstream[name] != batched[name]]
+    for name in ("images_ori", "images_crop"):
+        if upstream[name].shape != batched[name].shape or not torch.allclose(upstream[name], batched[name], atol=1e-3):
+            differences.append(name)
+    return differences
+
+def check_preset(model, tokenizer, rows, pages, prompt, preset, args, tmp_dir):
+    """
+    Run `pages` through both paths at one resolution preset, print the comparison and
+    return the failures (empty when the paths agree).
+    """
+    geometry = PRESETS[preset]
+    rows[:] = []
+    start = time.perf_counter()
+    upstream_texts = [clean_ocr_output(str(run_inference(model, tokenizer, image, prompt, Path(tmp_dir), *geometry)))
+                      for image in pages]
+    upstream_seconds = time.perf_counter() - start
+    upstream_rows, rows[:] = list(rows), []
+
+    engine = BatchedInferenceEngine(model, tokenizer, args.batch_size)
+    start = time.perf_counter()
+    batched_texts = [clean_ocr_output(text) for text in engine.infer(pages, prompt, *geometry)]
+    batched_seconds = time.perf_counter() - start
+    batched_rows = list(rows)
+
+    if len(upstream_rows) != len(pages) or len(batched_rows) != len(pages):
+        return [f"{preset}: expected one generate row per page, got {len(upstream_rows)} upstream "
+                f"and {len(batched_rows)} batched for {len(pages)} pages"]
+
+    print(f"{preset} {geometry}: {len(pages)} pages, mode={args.mode}, batch size {engine.batch_size}")
+    print(f"  {'page':>4} {'prompt tokens':>13} {'inputs':>10} {'similarity':>11}")
+    mismatched, similarities = 0, []
+    for i, (a, b) in enumerate(zip(upstream_rows, batched_rows)):
+        differences = input_differences(a, b)
+        mismatched += bool(differences)
+        similarity = difflib.SequenceMatcher(None, upstream_texts[i], batched_texts[i]).ratio()
+        similarities.append(similarity)
+        inputs_label = ", ".join(differences) if differences else "same"
+        print(f"  {i + 1:>4} {len(a['input_ids']):>13} {inputs_label:>10} {similarity:11.3f}")
+    mean = sum(similarities) / len(similarities)
+    print(f"  per page: {len(pages) / upstream_seconds * 60:.1f} pages/min, "
+          f"batched: {len(pages) / batched_seconds * 60:.1f} pages/min "
+          f"({upstream_seconds / max(batched_seconds, 1e-9):.2f}x)")
+    print(f"  mean similarity {mean:.3f} (min {args.min_similarity}), "
+          f"{sum(a == b for a, b in zip(upstream_texts, batched_texts))}/{len(pages)} pages identical")
+    failures = []
+    if mismatched:
+        failures.append(f"{preset}: {mismatched} pages reach generate with different inputs than model.infer gives them")
+    if mean < args.min_similarity:
+        failures.append(f"{preset}: batched output drifts too far from per-page decoding")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="PDFs/images forming the page set")
+    parser.add_argument("--pages", type=int, default=4, help="Max pages taken from the inputs")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--mode", default="document")
+    parser.add_argument("--preset", action="append", choices=list(PRESETS),
+                        help="Resolution preset to check (repeatable; default: all)")
+    parser.add_argument("--device")
+    parser.add_argument("--model-cache")
+    parser.add_argument("--cache-dir", help="Where the pre-cast weights are cached")
+    parser.add_argument("--min-similarity", type=float, default=0.98)
+    args = parser.parse_args()
+
+    tokenizer, model = load_model(get_device(args.device), args.model_cache, cache_dir=args.cache_dir)
+    rows = record_generate(model)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        inputs = args.inputs
+        if not inputs:
+            inputs = [Path(tmp_dir) / "pages.pdf"]
+            make_pdf(inputs[0], args.pages)
+        pages = load_pages(inputs, args.pages)
+        prompt = get_prompt(args.mode)
+        for preset in args.preset or PRESETS:
+            failures += check_preset(model, tokenizer, rows, pages, prompt, preset, args, tmp_dir)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
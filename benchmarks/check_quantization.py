@@ -0,0 +1,81 @@
+"""
+Accuracy and speed of `--quantize int8` against the full-precision model.
+
+Runs the same fixed page set through both models on CPU, compares the cleaned
+text page by page (difflib similarity) and exits non-zero if the mean similarity
+drops below --min-similarity. Without inputs a synthetic 3-page PDF is used.
+
+    python benchmarks/check_quantization.py
+    python benchmarks/check_quantization.py samples/report.pdf samples/scan.png --pages 5
+"""
+import gc
+import sys
+import time
+import difflib
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from bench_page_decode import make_pdf  # noqa: E402
+from deepseek_ocr_cli.converters import iter_pages  # noqa: E402
+from deepseek_ocr_cli.core import load_model, get_prompt, run_inference  # noqa: E402
+from deepseek_ocr_cli.utils import clean_ocr_output  # noqa: E402
+
+def load_pages(paths, limit):
+    pages = []
+    for path in paths:
+        for _, image in iter_pages(Path(path)):
+            pages.append(image)
+            if len(pages) >= limit:
+                return pages
+    return pages
+
+def ocr_pages(quantize, pages, prompt, args, tmp_dir):
+    tokenizer, model = load_model("cpu", args.model_cache, cache_dir=args.cache_dir, quantize=quantize)
+    texts, seconds = [], []
+    for image in pages:
+        start = time.perf_counter()
+        texts.append(clean_ocr_output(str(run_inference(model, tokenizer, image, prompt, Path(tmp_dir)))))
+        seconds.append(time.perf_counter() - start)
+    del model
+    gc.collect()
+    return texts, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="PDFs/images forming the page set")
+    parser.add_argument("--pages", type=int, default=3, help="Max pages taken from the inputs")
+    parser.add_argument("--mode", default="document")
+    parser.add_argument("--model-cache")
+    parser.add_argument("--cache-dir", help="Where the pre-cast/quantized weights are cached")
+    parser.add_argument("--min-similarity", type=float, default=0.95)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        inputs = args.inputs
+        if not inputs:
+            inputs = [Path(tmp_dir) / "pages.pdf"]
+            make_pdf(inputs[0], args.pages)
+        pages = load_pages(inputs, args.pages)
+        prompt = get_prompt(args.mode)
+
+        full_texts, full_seconds = ocr_pages(None, pages, prompt, args, tmp_dir)
+        int8_texts, int8_seconds = ocr_pages("int8", pages, prompt, args, tmp_dir)
+
+    print(f"{len(pages)} pages, mode={args.mode}")
+    print(f"  {'page':>4} {'full s':>8} {'int8 s':>8} {'similarity':>11}")
+    similarities = []
+    for i, (a, b) in enumerate(zip(full_texts, int8_texts)):
+        similarity = difflib.SequenceMatcher(None, a, b).ratio()
+        similarities.append(similarity)
+        print(f"  {i + 1:>4} {full_seconds[i]:8.2f} {int8_seconds[i]:8.2f} {similarity:11.3f}")
+    mean = sum(similarities) / len(similarities)
+    speedup = sum(full_seconds) / max(sum(int8_seconds), 1e-9)
+    print(f"  mean similarity {mean:.3f} (min {args.min_similarity}), int8 {speedup:.2f}x faster")
+    if mean < args.min_similarity:
+        print("FAIL: int8 output drifts too far from the full-precision model")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
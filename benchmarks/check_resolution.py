@@ -0,0 +1,124 @@
+"""
+Accuracy and speed of each `--resolution` preset, and of `--resolution auto`.
+
+Runs a fixed page set through the model once per preset on CPU, compares the
+cleaned text page by page with the default preset's output (difflib similarity)
+and prints sec/page, vision tokens/page and mean similarity for each. Exits
+non-zero if `auto` drops below --min-similarity. Without inputs a synthetic
+corpus is used: dense report pages (A4, letter, A3), a screenshot-like image and
+sparse slide/memo pages.
+
+    python benchmarks/check_resolution.py
+    python benchmarks/check_resolution.py samples/report.pdf samples/scan.png --pages 8
+"""
+import sys
+import time
+import difflib
+import argparse
+import tempfile
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from bench_pipeline import make_pdf, make_image, PAGE_SIZES  # noqa: E402
+from deepseek_ocr_cli.converters import iter_pages  # noqa: E402
+from deepseek_ocr_cli.core import load_model, get_prompt, run_inference  # noqa: E402
+from deepseek_ocr_cli.resolution import (  # noqa: E402
+    PRESETS, DEFAULT_PRESET, AUTO, analyze_complexity, choose_preset, vision_tokens,
+)
+from deepseek_ocr_cli.utils import clean_ocr_output  # noqa: E402
+
+def make_sparse_pdf(path):
+    """
+    A landscape slide and a short memo: pages the small presets should handle.
+    """
+    doc = fitz.open()
+    slide = doc.new_page(width=842, height=595)
+    slide.insert_text((60, 120), "Quarterly review", fontsize=40)
+    for line in range(4):
+        slide.insert_text((80, 220 + line * 60), f"- Key point {line + 1}: revenue up, costs flat", fontsize=24)
+    memo = doc.new_page(width=595, height=842)
+    memo.insert_text((48, 80), "Memo", fontsize=24)
+    for line in range(6):
+        memo.insert_text((48, 130 + line * 22), f"Line {line + 1}: please review the attached figures by Friday.",
+                         fontsize=12)
+    doc.save(path)
+    doc.close()
+
+def make_corpus(tmp_dir):
+    tmp_dir = Path(tmp_dir)
+    inputs = []
+    for name in ("a4", "letter", "a3"):
+        inputs.append(tmp_dir / f"{name}.pdf")
+        make_pdf(inputs[-1], 1, PAGE_SIZES[name])
+    inputs.append(tmp_dir / "screenshot.png")
+    make_image(inputs[-1], (1280, 800))
+    inputs.append(tmp_dir / "sparse.pdf")
+    make_sparse_pdf(inputs[-1])
+    return inputs
+
+def load_pages(paths, limit):
+    pages = []
+    for path in paths:
+        for _, image in iter_pages(Path(path)):
+            if not hasattr(image, "size"):
+                continue
+            pages.append(image)
+            if len(pages) >= limit:
+                return pages
+    return pages
+
+def ocr_pages(model, tokenizer, pages, presets, prompt, tmp_dir):
+    texts, seconds = [], []
+    for image, preset in zip(pages, presets):
+        start = time.perf_counter()
+        result = run_inference(model, tokenizer, image, prompt, Path(tmp_dir), *PRESETS[preset])
+        seconds.append(time.perf_counter() - start)
+        texts.append(clean_ocr_output(str(result)))
+    return texts, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="PDFs/images forming the page set")
+    parser.add_argument("--pages", type=int, default=10, help="Max pages taken from the inputs")
+    parser.add_argument("--mode", default="document")
+    parser.add_argument("--model-cache")
+    parser.add_argument("--cache-dir", help="Where the pre-cast weights are cached")
+    parser.add_argument("--min-similarity", type=float, default=0.95)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pages = load_pages(args.inputs or make_corpus(tmp_dir), args.pages)
+        prompt = get_prompt(args.mode)
+        start = time.perf_counter()
+        chosen = [choose_preset(analyze_complexity(image)) for image in pages]
+        analysis_ms = (time.perf_counter() - start) / len(pages) * 1000
+
+        tokenizer, model = load_model("cpu", args.model_cache, cache_dir=args.cache_dir)
+        runs = {}
+        for preset in [DEFAULT_PRESET] + [p for p in PRESETS if p != DEFAULT_PRESET] + [AUTO]:
+            presets = chosen if preset == AUTO else [preset] * len(pages)
+            runs[preset] = presets, *ocr_pages(model, tokenizer, pages, presets, prompt, tmp_dir)
+
+    print(f"{len(pages)} pages, mode={args.mode}, reference={DEFAULT_PRESET}")
+    print(f"  auto picked: {', '.join(f'p{i + 1} {preset}' for i, preset in enumerate(chosen))} "
+          f"({analysis_ms:.1f} ms/page analysis)")
+    print(f"  {'preset':>8} {'s/page':>8} {'tokens':>8} {'similarity':>11} {'worst':>7}")
+    reference = runs[DEFAULT_PRESET][1]
+    results = {}
+    for preset, (presets, texts, seconds) in runs.items():
+        tokens = sum(vision_tokens(p, image.size) for p, image in zip(presets, pages)) / len(pages)
+        similarities = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, texts)]
+        results[preset] = sum(similarities) / len(similarities), sum(seconds)
+        print(f"  {preset:>8} {sum(seconds) / len(pages):8.2f} {tokens:8.0f} {results[preset][0]:11.3f} "
+              f"{min(similarities):7.3f}")
+    mean, seconds = results[AUTO]
+    speedup = results[DEFAULT_PRESET][1] / max(seconds, 1e-9)
+    print(f"  auto: mean similarity {mean:.3f} (min {args.min_similarity}), {speedup:.2f}x the speed of {DEFAULT_PRESET}")
+    if mean < args.min_similarity:
+        print(f"FAIL: auto resolution drifts too far from {DEFAULT_PRESET}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
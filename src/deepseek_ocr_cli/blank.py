@@ -0,0 +1,88 @@
+from PIL import Image
+
+# Pages are analyzed on a thumbnail about this size (longest side, px)
+ANALYSIS_SIZE = 512
+# Ink: pixels this much darker or lighter than the page background (0-255), so
+# faint bleed-through and paper tone do not count and light-on-dark pages do
+INK_CONTRAST = 48
+# Ink is grouped into cells of CELL x CELL thumbnail pixels; touching inked cells
+# form one region. Regions with fewer ink pixels than MIN_REGION_INK are specks.
+CELL = 8
+MIN_REGION_INK = 6
+# A page is blank when no ink region is left after removing specks, or when the ink
+# left covers less than this share of the page. The default is below a single kept
+# region (MIN_REGION_INK pixels of a 512 px thumbnail is ~0.0016%; the word "hello"
+# in 12 pt body text ~0.006%), so by default only pages without any ink region are blank.
+DEFAULT_BLANK_THRESHOLD = 0.00001
+# Written in place of a blank page's text, so the page stays visible in the output
+BLANK_PAGE_TEXT = "<!-- blank page -->"
+
+class PageContent:
+    """
+    Cheap measures of how much is on a page image.
+    """
+
+    def __init__(self, coverage, std, regions):
+        self.coverage = coverage
+        self.std = std
+        self.regions = regions
+
+    def is_blank(self, threshold=DEFAULT_BLANK_THRESHOLD):
+        return self.regions == 0 or self.coverage < threshold
+
+def _label_regions(mask):
+    """
+    8-connected component labels of a small boolean grid (-1 outside the mask),
+    by repeated minimum-propagation between neighbours.
+    """
+    import numpy as np
+
+    rows, cols = mask.shape
+    sentinel = rows * cols
+    labels = np.where(mask, np.arange(sentinel).reshape(rows, cols), sentinel)
+    while True:
+        padded = np.pad(labels, 1, constant_values=sentinel)
+        neighbours = np.stack([padded[dy:dy + rows, dx:dx + cols] for dy in range(3) for dx in range(3)])
+        updated = np.where(mask, neighbours.min(axis=0), sentinel)
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return np.where(mask, labels, -1)
+
+def analyze_page(image):
+    """
+    Ink coverage, grayscale spread and number of ink regions of a page image.
+    Isolated specks (scanner dust, noise) are left out of coverage and regions.
+    """
+    import numpy as np
+
+    # Box-reduce before the grayscale conversion: a fraction of the work on the full raster
+    factor = max(image.size) // ANALYSIS_SIZE
+    gray = (image.reduce(factor) if factor > 1 else image).convert("L")
+    pixels = np.asarray(gray, dtype=np.float32)
+    std = float(pixels.std())
+    background = float(np.median(pixels))
+    ink = np.abs(pixels - background) > INK_CONTRAST
+
+    # Ink pixel count per cell (cropped to whole cells)
+    rows, cols = ink.shape[0] // CELL, ink.shape[1] // CELL
+    if rows == 0 or cols == 0:
+        return PageContent(float(ink.mean()), std, int(ink.any()))
+    cells = ink[:rows * CELL, :cols * CELL].reshape(rows, CELL, cols, CELL).sum(axis=(1, 3))
+
+    labels = _label_regions(cells > 0)
+    inked = labels >= 0
+    region_ids, region_index = np.unique(labels[inked], return_inverse=True)
+    region_ink = np.bincount(region_index, weights=cells[inked])
+    kept = region_ink >= MIN_REGION_INK
+    coverage = float(region_ink[kept].sum()) / pixels.size
+    return PageContent(coverage, std, int(kept.sum()))
+
+def is_blank_page(image, threshold=DEFAULT_BLANK_THRESHOLD):
+    """
+    Whether a rendered page can skip the model. Returns (blank, PageContent).
+    """
+    if not isinstance(image, Image.Image) or not threshold:
+        return False, None
+    content = analyze_page(image)
+    return content.is_blank(threshold), content
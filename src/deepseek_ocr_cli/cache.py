@@ -0,0 +1,149 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from PIL import Image
+from rich.console import Console
+
+console = Console()
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "dsocr"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def get_cache_dir(cache_dir=None):
+    """
+    Resolve the result cache directory.
+    Prioritizes:
+    1. cache_dir (CLI arg)
+    2. DSOCR_CACHE_DIR (Env var)
+    3. ~/.cache/dsocr
+    """
+    if cache_dir:
+        return Path(cache_dir)
+    env_cache_dir = os.environ.get("DSOCR_CACHE_DIR")
+    if env_cache_dir:
+        return Path(env_cache_dir)
+    return DEFAULT_CACHE_DIR
+
+def model_fingerprint(model):
+    """
+    Identify the loaded model snapshot.
+    HF snapshot paths already contain the commit hash; weight file sizes and
+    mtimes cover custom model directories that get replaced in place.
+    Quantized models get their own identity.
+    """
+    model_path = getattr(model, "name_or_path", None) or getattr(getattr(model, "config", None), "_name_or_path", "")
+    parts = [str(model_path)]
+    quantize = getattr(model, "_dsocr_quantize", None)
+    if quantize:
+        parts.append(f"quantize:{quantize}")
+    parts += snapshot_stats(model_path)
+    return "|".join(parts)
+
+def snapshot_stats(model_path):
+    """
+    Size and mtime of a model directory's weight and config files, so a snapshot
+    replaced in place gets a new identity. Empty for anything but a directory.
+    """
+    path = Path(str(model_path))
+    stats = []
+    if path.is_dir():
+        for f in sorted(path.glob("*.safetensors")) + [path / "config.json"]:
+            if f.exists():
+                stat = f.stat()
+                stats.append(f"{f.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return stats
+
+def image_digest(image):
+    """
+    Hash the pixels of a PIL Image, or the bytes of an image file.
+    """
+    h = hashlib.sha256()
+    if isinstance(image, Image.Image):
+        h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+        h.update(image.tobytes())
+    else:
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+class ResultCache:
+    """
+    Content-addressed, size-bounded LRU cache of raw model output in SQLite.
+    Keys cover the page pixels, prompt, inference parameters and model snapshot,
+    so a hit is always safe to reuse.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = get_cache_dir(cache_dir) / "results.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._model_ids = {}
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+        self._conn.commit()
+
+    def make_key(self, model, image, prompt, params):
+        model_id = self._model_ids.get(id(model))
+        if model_id is None:
+            model_id = self._model_ids[id(model)] = model_fingerprint(model)
+        payload = json.dumps(
+            {"image": image_digest(image), "prompt": prompt, "params": params, "model": model_id},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, text):
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least-recently-used entries until back under budget
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
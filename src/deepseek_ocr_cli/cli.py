@@ -1,35 +1,228 @@
+import os
 import click
+from click.core import ParameterSource
+import itertools
+from pathlib import Path
 from rich.console import Console
-from .core import process_file
+from .core import process_file, resolve_input, default_output_dir, JOB_OPTIONS
+from .pipeline import collect_inputs, process_batch
+from .server import serve, submit_job, is_server_running
+from .ingest import URLIngester, DEFAULT_DOWNLOAD_WORKERS, download_dir, read_url_list
+from .generation import DEFAULT_MAX_TOKENS, DEFAULT_REPETITION_GUARD, SUGGESTED_REPETITION_GUARD, MIN_PAGE_TOKENS
+from .blank import DEFAULT_BLANK_THRESHOLD
+from .office import DEFAULT_OFFICE_WORKERS
+from .writers import OUTPUT_FORMATS, DEFAULT_FORMATS
+from .resolution import PRESETS, DEFAULT_PRESET, AUTO
 
 console = Console()
 
+def parse_dpi(ctx, param, value):
+    """
+    --dpi is 'auto' (per page, matched to the model input) or a fixed number.
+    """
+    if value is None or value.lower() == 'auto':
+        return None
+    try:
+        dpi = int(value)
+    except ValueError:
+        raise click.BadParameter("must be 'auto' or a number")
+    if dpi < 36:
+        raise click.BadParameter("must be at least 36")
+    return dpi
+
+# CLI parameters behind session options of another name
+_OPTION_PARAMS = {
+    "use_cache": "no_cache",
+    "use_weights_cache": "no_weights_cache",
+    "resume": "no_resume",
+}
+
+def job_options(session_options):
+    """
+    The session options a running daemon applies to each submitted job.
+    """
+    return {name: session_options[name] for name in JOB_OPTIONS if name in session_options}
+
+def server_ignored(session_options):
+    """
+    Flags given on the command line that a running daemon cannot apply per job:
+    it keeps the values it was started with.
+    """
+    ctx = click.get_current_context()
+    names = ["device", "model_cache"] + [
+        _OPTION_PARAMS.get(name, name) for name in session_options if name not in JOB_OPTIONS and name != "metrics_json"
+    ]
+    return [f"--{name.replace('_', '-')}" for name in names
+            if ctx.get_parameter_source(name) not in (None, ParameterSource.DEFAULT)]
+
 @click.command()
-@click.argument('input_path', type=click.Path(exists=False, dir_okay=False, readable=True), required=False)
-@click.option('--url', help='URL to download file from')
-@click.option('--mode', default='document', type=click.Choice(['document', 'standard', 'format-free', 'chart', 'detail'], case_sensitive=False), help='OCR Mode')
+@click.argument('input_paths', nargs=-1, type=click.Path(exists=False, readable=True))
+@click.option('--file-list', type=click.Path(dir_okay=False, allow_dash=True), help="Text file with one input path per line ('-' for stdin)")
+@click.option('--url', 'urls', multiple=True, help='URL to download and OCR (repeatable)')
+@click.option('--url-list', type=click.Path(dir_okay=False, allow_dash=True), help="Text file with one URL per line ('-' for stdin)")
+@click.option('--download-workers', default=DEFAULT_DOWNLOAD_WORKERS, show_default=True, type=click.IntRange(min=1), help='Concurrent downloads for --url/--url-list')
+@click.option('--mode', multiple=True, default=['document'], show_default=True, type=click.Choice(['document', 'standard', 'format-free', 'chart', 'detail'], case_sensitive=False), help='OCR Mode; repeat to get several modes from one pass over each page, written to <output>/<mode>/')
 @click.option('--output', '-o', type=click.Path(file_okay=False, writable=True), help='Output directory')
 @click.option('--device', type=click.Choice(['cpu', 'mps']), help='Force specific device')
 @click.option('--model-cache', type=click.Path(exists=True, file_okay=False, readable=True), help='Explicit path to DeepSeek-OCR model directory')
+@click.option('--format', 'formats', multiple=True, default=DEFAULT_FORMATS, show_default=True, type=click.Choice(OUTPUT_FORMATS), help='Output format, repeatable: md (one file), jsonl (one record per page, with timings and grounding boxes), pages (one .md per page)')
 @click.option('--raw-output', is_flag=True, default=False, help='Keep raw model output (with markers). Default cleans to text only.')
-def main(input_path, url, mode, output, device, model_cache, raw_output):
+@click.option('--serve', 'serve_mode', is_flag=True, default=False, help='Run as a daemon that keeps the model loaded and serves OCR jobs.')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Daemon socket path (default: $DSOCR_SOCKET or ~/.cache/dsocr/dsocr.sock)')
+@click.option('--no-server', is_flag=True, default=False, help='Always load the model in-process, even if a daemon is running.')
+@click.option('--render-workers', default=2, show_default=True, type=click.IntRange(min=1), help='Batch mode: threads rendering/converting documents ahead of inference')
+@click.option('--queue-size', default=4, show_default=True, type=click.IntRange(min=1), help='Batch mode: max rendered pages waiting for inference')
+@click.option('--lookahead', default=2, show_default=True, type=click.IntRange(min=1), help='Pages rendered ahead of inference for a single document')
+@click.option('--cache-dir', type=click.Path(file_okay=False), help='Result cache directory (default: $DSOCR_CACHE_DIR or ~/.cache/dsocr)')
+@click.option('--cache-size-mb', default=512, show_default=True, type=click.IntRange(min=1), help='Result cache size limit; least recently used entries are evicted')
+@click.option('--no-cache', is_flag=True, default=False, help='Do not read or write the result cache')
+@click.option('--batch-size', default=1, show_default=True, type=click.IntRange(min=1), help='Pages per batched generate call (halved automatically on out-of-memory)')
+@click.option('--workers', default=1, show_default=True, type=click.IntRange(min=1), help='Model-holding worker processes (CPU); pages are spread across them')
+@click.option('--threads-per-worker', type=click.IntRange(min=1), help='Torch threads per worker (default: CPUs / workers)')
+@click.option('--pin-cores', is_flag=True, default=False, help='Pin each worker to its own block of CPU cores (Linux)')
+@click.option('--no-weights-cache', is_flag=True, default=False, help='Do not create/use the pre-cast, memory-mapped weights copy (saves disk space)')
+@click.option('--quantize', type=click.Choice(['int8']), help='CPU: int8 dynamic quantization of the language model (faster, smaller, slight accuracy loss)')
+@click.option('--metrics-json', type=click.Path(dir_okay=False, writable=True), help='Write per-stage timings, tokens/sec and peak RSS per page to this JSON file')
+@click.option('--render-processes', default=1, show_default=True, type=click.IntRange(min=1), help='Processes rasterizing PDF pages in parallel')
+@click.option('--dpi', default='auto', show_default=True, callback=parse_dpi, help="PDF render DPI, or 'auto' to match each page to the model's input resolution")
+@click.option('--hybrid', is_flag=True, default=False, help='PDF pages with a reliable text layer are extracted directly as Markdown; only scanned/image-heavy pages are OCRed')
+@click.option('--no-resume', is_flag=True, default=False, help='Start interrupted documents over instead of resuming from their checkpoint')
+@click.option('--max-tokens', default=DEFAULT_MAX_TOKENS, show_default=True, type=click.IntRange(min=1), help='Upper limit of tokens decoded per page')
+@click.option('--token-budget', is_flag=True, default=False, help=f'Cap each page at a token budget scaled to its ink (at least {MIN_PAGE_TOKENS}) instead of --max-tokens')
+@click.option('--repetition-guard', default=DEFAULT_REPETITION_GUARD, show_default=True, type=click.FloatRange(0, 1), help=f'Stop a page once this share of its recent output repeats itself, e.g. {SUGGESTED_REPETITION_GUARD} (0 disables)')
+@click.option('--blank-threshold', default=DEFAULT_BLANK_THRESHOLD, show_default=True, type=click.FloatRange(0, 1), help='Pages with no ink regions, or whose ink covers less than this share of the page, skip inference as blank (0 disables)')
+@click.option('--page-timeout', default=None, type=click.FloatRange(min=0, min_open=True), help='Stop decoding a page after this many seconds')
+@click.option('--office-workers', default=DEFAULT_OFFICE_WORKERS, show_default=True, type=click.IntRange(min=0), help='Warm headless LibreOffice instances converting DOCX in parallel (0: start LibreOffice per document)')
+@click.option('--layout', is_flag=True, default=False, help='Keep a layout index of grounding blocks in the output dir; on later runs unchanged pages reuse their text and only changed blocks are re-OCRed (also retries the failing block of pages stopped early)')
+@click.option('--resolution', default=DEFAULT_PRESET, show_default=True, type=click.Choice([AUTO, *PRESETS]), help="Model input resolution preset, or 'auto' to pick the smallest preset each page's text density and glyph size allow")
+@click.option('--speculative', is_flag=True, default=False, help="Decode pages speculatively from a reference text (the previous run's output in the output dir, else the PDF text layer): drafted tokens are verified several per forward pass, with output identical to normal decoding")
+def main(input_paths, file_list, urls, url_list, download_workers, mode, output, formats, device, model_cache, raw_output,
+         serve_mode, socket_path, no_server,
+         render_workers, queue_size, lookahead, cache_dir, cache_size_mb, no_cache, batch_size,
+         workers, threads_per_worker, pin_cores, no_weights_cache, quantize, metrics_json,
+         render_processes, dpi, hybrid, no_resume,
+         max_tokens, token_budget, repetition_guard, blank_threshold, page_timeout,
+         office_workers, layout, resolution, speculative):
     """DeepSeek-OCR Local CLI
 
     Parse local images, PDFs, or DOCX files to Markdown.
+    INPUT_PATHS may be files, directories or glob patterns; more than one input runs in batch mode.
     """
-    if not input_path and not url:
-        console.print("[red]Error: Please provide an INPUT_PATH or --url[/red]")
+    # One mode stays a plain string, as the server and the output layout expect
+    mode = mode[0] if len(set(mode)) == 1 else tuple(dict.fromkeys(mode))
+    session_options = {
+        "lookahead": lookahead,
+        "cache_dir": cache_dir,
+        "cache_size_mb": cache_size_mb,
+        "use_cache": not no_cache,
+        "batch_size": batch_size,
+        "workers": workers,
+        "threads_per_worker": threads_per_worker,
+        "pin_cores": pin_cores,
+        "use_weights_cache": not no_weights_cache,
+        "quantize": quantize,
+        "metrics_json": metrics_json,
+        "render_processes": render_processes,
+        "dpi": dpi,
+        "hybrid": hybrid,
+        "resume": not no_resume,
+        "max_tokens": max_tokens,
+        "token_budget": token_budget,
+        "repetition_guard": repetition_guard,
+        "page_timeout": page_timeout,
+        "blank_threshold": blank_threshold,
+        "office_workers": office_workers,
+        "layout": layout,
+        "resolution": resolution,
+        "speculative": speculative,
+    }
+
+    if serve_mode:
+        serve(device, model_cache, socket_path, **session_options)
+        return
+
+    urls = list(urls) + (read_url_list(url_list) if url_list else [])
+    if not input_paths and not urls and not file_list:
+        console.print("[red]Error: Please provide an INPUT_PATH, --file-list, --url or --url-list[/red]")
         click.echo(main.get_help(click.get_current_context()))
         return
 
-    # Check input_path existence only if url is not provided
-    if input_path and not url:
-        import os
-        if not os.path.exists(input_path):
-             console.print(f"[red]Error: File '{input_path}' does not exist.[/red]")
-             return
+    local_inputs = bool(input_paths or file_list)
+    if urls:
+        single_file = len(urls) == 1 and not local_inputs
+    else:
+        single_file = len(input_paths) == 1 and not file_list and os.path.isfile(input_paths[0])
+    if not single_file:
+        inputs = collect_inputs(input_paths, file_list) if local_inputs else []
+        if not inputs and not urls:
+            console.print("[red]Error: No supported input files found.[/red]")
+            return
+        run_batch(inputs, urls, mode, output, formats, device, model_cache, raw_output, socket_path, no_server,
+                  render_workers, queue_size, download_workers, session_options)
+        return
+
+    input_path, output = resolve_input(input_paths[0] if input_paths else None, urls[0] if urls else None, output)
+    if not input_path:
+        console.print("[red]No input file provided or download failed.[/red]")
+        return
+
+    # Hand the job to a resident daemon if one is running
+    if not no_server:
+        reply = submit_job(input_path, mode, output, raw_output, socket_path, metrics_json, formats,
+                           job_options(session_options))
+        if reply is not None:
+            ignored = server_ignored(session_options)
+            if ignored:
+                console.print(f"[yellow]Using running dsocr server; {', '.join(ignored)} keep the values "
+                              f"the server was started with.[/yellow]")
+            if reply.get("ok"):
+                console.print(f"[bold green]Success![/bold green] Results saved to: {reply['result']}")
+            else:
+                console.print(f"[red]Server error: {reply.get('error')}[/red]")
+            return
+
+    process_file(input_path, None, mode, output, device, model_cache, raw_output, formats, **session_options)
+
+def _downloaded(ingester, urls):
+    """
+    Paths of `urls` as their downloads complete; failures are reported and skipped.
+    """
+    for _, url, path, error in ingester.download(urls):
+        if error is not None:
+            console.print(f"[red]Failed to download {url}: {error}[/red]")
+        else:
+            yield path
+
+def run_batch(inputs, urls, mode, output, formats, device, model_cache, raw_output, socket_path, no_server,
+              render_workers, queue_size, download_workers, session_options):
+    """
+    Send a batch to the running daemon file by file, or run the in-process pipeline.
+    URLs are downloaded concurrently either way, each one queued as soon as it is complete.
+    """
+    if not no_server and is_server_running(socket_path):
+        ignored = server_ignored(session_options)
+        if ignored:
+            console.print(f"[yellow]Using running dsocr server; {', '.join(ignored)} keep the values "
+                          f"the server was started with.[/yellow]")
+        ingester = URLIngester(download_dir(output), download_workers)
+        try:
+            for input_path in itertools.chain(inputs, _downloaded(ingester, urls) if urls else []):
+                output_dir = Path(output) / input_path.stem if output else default_output_dir(input_path)
+                reply = submit_job(input_path, mode, output_dir, raw_output, socket_path,
+                                   session_options.get("metrics_json"), formats, job_options(session_options))
+                if reply is None:
+                    console.print("[red]Lost connection to dsocr server.[/red]")
+                    return
+                if reply.get("ok"):
+                    console.print(f"[green]✓[/green] {input_path.name} → {reply['result']}")
+                else:
+                    console.print(f"[red]{input_path.name}: {reply.get('error')}[/red]")
+        finally:
+            ingester.close()
+        return
 
-    process_file(input_path, url, mode, output, device, model_cache, raw_output)
+    process_batch(inputs, mode, output, device, model_cache, raw_output, render_workers, queue_size,
+                  urls=urls, download_workers=download_workers, formats=formats, **session_options)
 
 if __name__ == '__main__':
     main()
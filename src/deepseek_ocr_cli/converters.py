@@ -1,23 +1,59 @@
 import sys
+import shutil
+import tempfile
 import subprocess
+import queue
+import threading
+import multiprocessing as mp
 from pathlib import Path
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from rich.console import Console
-import fitz  # PyMuPDF
-from PIL import Image
-import io
+from PIL import Image, ImageOps
 
 console = Console()
 
-def docx_to_pdf(input_path):
+IMAGE_SUFFIXES = ['.png', '.jpg', '.jpeg', '.webp', '.bmp']
+DOCUMENT_SUFFIXES = ['.pdf', '.docx']
+SUPPORTED_SUFFIXES = DOCUMENT_SUFFIXES + IMAGE_SUFFIXES
+
+# MuPDF is not thread-safe, even across separate documents; serialize fitz calls
+# so the batch pipeline's render threads can share the process safely.
+FITZ_LOCK = threading.Lock()
+
+# Model input geometry (run_inference defaults): a base_size global view plus
+# image_size crop tiles laid out on a 2..9 tile grid matching the page's aspect ratio
+MODEL_BASE_SIZE = 1024
+MODEL_IMAGE_SIZE = 640
+MIN_TILES, MAX_TILES = 2, 9
+MIN_DPI, MAX_DPI = 72, 300
+
+def find_soffice():
     """
-    Convert DOCX to PDF.
+    Path of the LibreOffice `soffice` executable, or None if it is not installed.
+    """
+    # Common paths for LibreOffice on macOS and Linux, then whatever is on PATH
+    soffice_paths = [
+        "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+        "/usr/bin/soffice",
+        "/usr/local/bin/soffice"
+    ]
+    for p in soffice_paths:
+        if Path(p).exists():
+            return p
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+def docx_to_pdf(input_path, output_dir=None):
+    """
+    Convert DOCX to PDF, into `output_dir` (default: next to the input).
     Strategy:
     1. Try docx2pdf (Requires MS Word on macOS).
     2. Try LibreOffice (headless).
     3. Try pypandoc (Requires pandoc + latex/wkhtmltopdf, often fails for complex docs).
     """
     input_path = Path(input_path).absolute()
-    output_path = input_path.with_suffix('.pdf')
+    output_dir = Path(output_dir) if output_dir else input_path.parent
+    output_path = output_dir / f"{input_path.stem}.pdf"
     
     # Strategy 1: docx2pdf (MS Word)
     if sys.platform == 'darwin':
@@ -31,29 +67,21 @@ def docx_to_pdf(input_path):
             console.print(f"[yellow]docx2pdf failed: {e}. Trying fallback...[/yellow]")
 
     # Strategy 2: LibreOffice
-    # Common paths for LibreOffice on macOS
-    soffice_paths = [
-        "/Applications/LibreOffice.app/Contents/MacOS/soffice",
-        "/usr/bin/soffice",
-        "/usr/local/bin/soffice"
-    ]
-    soffice_cmd = None
-    for p in soffice_paths:
-        if Path(p).exists():
-            soffice_cmd = p
-            break
-            
+    soffice_cmd = find_soffice()
     if soffice_cmd:
         try:
             console.print("[dim]Attempt 2: Converting DOCX to PDF using LibreOffice...[/dim]")
-            cmd = [
-                soffice_cmd,
-                "--headless",
-                "--convert-to", "pdf",
-                "--outdir", str(input_path.parent),
-                str(input_path)
-            ]
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            # A throwaway profile: soffice refuses to start while another instance holds the default one
+            with tempfile.TemporaryDirectory(prefix="dsocr-office-") as profile:
+                cmd = [
+                    soffice_cmd,
+                    "--headless",
+                    f"-env:UserInstallation={Path(profile).as_uri()}",
+                    "--convert-to", "pdf",
+                    "--outdir", str(output_dir),
+                    str(input_path)
+                ]
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             if output_path.exists():
                 return output_path
         except Exception as e:
@@ -87,16 +115,255 @@ def docx_to_pdf(input_path):
     
     return output_path
 
-def pdf_to_images(pdf_path, dpi=200):
+class TextLayerPage:
+    """
+    A PDF page taken from its embedded text layer (as Markdown) instead of a raster.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+def raster_to_image(width, height, stride, samples):
+    """
+    Wrap a PyMuPDF pixmap's raw RGB samples (as _render_page returns them) as a PIL Image.
+    No PNG encode/decode round-trip: the pixel buffer is used as-is.
+    """
+    return Image.frombuffer("RGB", (width, height), samples, "raw", "RGB", stride, 1)
+
+def tile_grid(aspect):
+    """
+    Crop-tile grid (cols, rows) the model picks for a page of this aspect ratio
+    (width / height), as its dynamic_preprocess does.
+    """
+    grids = {
+        (cols, rows)
+        for cols in range(1, MAX_TILES + 1)
+        for rows in range(1, MAX_TILES + 1)
+        if MIN_TILES <= cols * rows <= MAX_TILES
+    }
+    # Closest aspect ratio; on ties the larger grid, which needs more detail
+    return min(grids, key=lambda g: (abs(aspect - g[0] / g[1]), -g[0] * g[1]))
+
+def page_dpi(width_pt, height_pt, base_size=MODEL_BASE_SIZE, image_size=MODEL_IMAGE_SIZE):
+    """
+    Lowest DPI at which the model never has to upsample the page: enough for the crop-tile
+    grid it will pick for this aspect ratio and for the base_size global view.
+    Anything rendered above that is downscaled anyway.
+    """
+    cols, rows = tile_grid(width_pt / height_pt)
+    dpi = max(
+        cols * image_size / width_pt,
+        rows * image_size / height_pt,
+        base_size / max(width_pt, height_pt),
+    ) * 72
+    return int(min(MAX_DPI, max(MIN_DPI, round(dpi))))
+
+def _render_page(page, dpi=None, hybrid=False):
+    """
+    Render one fitz page into a picklable result: ("text", markdown) or ("raster", (w, h, stride, samples)).
+    In hybrid mode pages with a reliable text layer are extracted instead of rasterized.
+    """
+    if hybrid:
+        from .textlayer import text_layer_markdown
+        markdown = text_layer_markdown(page)
+        if markdown is not None:
+            return "text", markdown
+    pix = page.get_pixmap(dpi=dpi or page_dpi(page.rect.width, page.rect.height), alpha=False)
+    return "raster", (pix.width, pix.height, pix.stride, pix.samples)
+
+def _to_page(result):
+    kind, payload = result
+    if kind == "text":
+        return TextLayerPage(payload)
+    return raster_to_image(*payload)
+
+def pdf_to_images(pdf_path, dpi=None, hybrid=False, skip=()):
     """
-    Render PDF pages to PIL Images using PyMuPDF.
-    Yields (index, PIL.Image).
+    Render PDF pages to PIL Images using PyMuPDF, in this process.
+    `dpi=None` picks the DPI per page from the model's input resolution (see page_dpi).
+    In hybrid mode, pages with a reliable text layer are yielded as TextLayerPage instead.
+    Page indices in `skip` (already done by a resumed job) are not rendered.
+    Yields (index, PIL.Image or TextLayerPage).
     """
-    doc = fitz.open(pdf_path)
-    for i in range(len(doc)):
-        page = doc.load_page(i)
-        pix = page.get_pixmap(dpi=dpi)
-        img_data = pix.tobytes("png")
-        image = Image.open(io.BytesIO(img_data))
-        yield i, image
-    doc.close()
\ No newline at end of file
+    import fitz  # PyMuPDF
+
+    with FITZ_LOCK:
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+    try:
+        for i in range(page_count):
+            if i in skip:
+                continue
+            with FITZ_LOCK:
+                result = _render_page(doc.load_page(i), dpi, hybrid)
+            yield i, _to_page(result)
+    finally:
+        with FITZ_LOCK:
+            doc.close()
+
+# Per render process: recently used documents, each opened once by this process
+_worker_docs = OrderedDict()
+_WORKER_MAX_DOCS = 4
+
+def _render_task(pdf_path, mtime_ns, index, dpi, hybrid):
+    import fitz  # PyMuPDF
+
+    key = (pdf_path, mtime_ns)
+    doc = _worker_docs.get(key)
+    if doc is None:
+        doc = _worker_docs[key] = fitz.open(pdf_path)
+        while len(_worker_docs) > _WORKER_MAX_DOCS:
+            _, old = _worker_docs.popitem(last=False)
+            old.close()
+    _worker_docs.move_to_end(key)
+    return _render_page(doc.load_page(index), dpi, hybrid)
+
+class PageRenderer:
+    """
+    Renders PDF pages across a pool of processes, each with its own document handles,
+    so rasterization scales past MuPDF's one-thread-per-process limit.
+    Pages are yielded in order with a bounded number in flight. With processes=1 it
+    renders in-process (pdf_to_images). Safe to share between threads.
+    """
+
+    def __init__(self, processes=1, dpi=None, hybrid=False):
+        self.processes = max(1, processes)
+        self.dpi = dpi
+        self.hybrid = hybrid
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork a process that may hold torch/OpenMP state
+                self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=mp.get_context("spawn"))
+            return self._executor
+
+    def pages(self, pdf_path, skip=()):
+        """
+        Yield (index, PIL.Image or TextLayerPage) for every page of a PDF not in `skip`.
+        """
+        if self.processes == 1:
+            yield from pdf_to_images(pdf_path, self.dpi, self.hybrid, skip)
+            return
+
+        pdf_path = str(Path(pdf_path).absolute())
+        mtime_ns = Path(pdf_path).stat().st_mtime_ns
+        indices = deque(i for i in range(pdf_page_count(pdf_path)) if i not in skip)
+        executor = self._pool()
+        in_flight = deque()
+        try:
+            while indices or in_flight:
+                # Two pages per process keeps every process busy without piling up rasters
+                while indices and len(in_flight) < 2 * self.processes:
+                    index = indices.popleft()
+                    in_flight.append((index, executor.submit(
+                        _render_task, pdf_path, mtime_ns, index, self.dpi, self.hybrid)))
+                index, future = in_flight.popleft()
+                yield index, _to_page(future.result())
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+def pdf_page_count(pdf_path):
+    """
+    Number of pages in a PDF, without rendering anything.
+    """
+    import fitz  # PyMuPDF
+
+    with FITZ_LOCK:
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+
+def load_image(image_path):
+    """
+    Decode an image file into an RGB PIL Image, honouring EXIF orientation
+    the same way the model's own loader does.
+    """
+    with Image.open(image_path) as image:
+        return ImageOps.exif_transpose(image).convert("RGB")
+
+def iter_pages(input_path, renderer=None, skip=()):
+    """
+    Turn any supported input into page images.
+    PDFs are rendered (through `renderer`, a PageRenderer, if given), DOCX is converted
+    to a temporary PDF first, images are decoded. Page indices in `skip` are left out.
+    Yields (index, PIL.Image or TextLayerPage). Raises ValueError for unsupported formats.
+    """
+    input_path = Path(input_path)
+    suffix = input_path.suffix.lower()
+    render = renderer.pages if renderer is not None else pdf_to_images
+
+    if suffix == '.pdf':
+        yield from render(input_path, skip=skip)
+    elif suffix == '.docx':
+        # Never write the converted PDF next to the input; it lives as long as the pages are rendered
+        with tempfile.TemporaryDirectory(prefix="dsocr-docx-") as tmp_dir:
+            yield from render(docx_to_pdf(input_path, tmp_dir), skip=skip)
+    elif suffix in IMAGE_SUFFIXES:
+        if 0 not in skip:
+            yield 0, load_image(input_path)
+    else:
+        raise ValueError(f"Unsupported format: {suffix}")
+
+def page_stage(input_path):
+    """
+    Metrics stage name for producing the pages of `input_path` (see iter_pages).
+    """
+    return "image decode" if Path(input_path).suffix.lower() in IMAGE_SUFFIXES else "pdf render"
+
+def prefetch(iterable, lookahead=2):
+    """
+    Consume `iterable` on a background thread, staying at most `lookahead` items ahead.
+    Lets the next pages render while the current one is in inference, without ever
+    holding more than `lookahead` decoded pages in memory. Exceptions are re-raised
+    in the consumer.
+    """
+    items = queue.Queue(maxsize=max(1, lookahead))
+    stop = threading.Event()
+    done = object()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except BaseException as e:
+            _put((done, e))
+            return
+        finally:
+            # Runs generator cleanup (e.g. closing the PDF) on this thread
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        _put((done, None))
+
+    worker = threading.Thread(target=_produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Consumer finished or bailed out early: release the producer
+        stop.set()
+        worker.join(timeout=1)
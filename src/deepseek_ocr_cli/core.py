@@ -1,7 +1,7 @@
 import os
-import torch
+import time
 from pathlib import Path
-from transformers import AutoModel, AutoTokenizer
+from contextlib import ExitStack, contextmanager, nullcontext
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from .utils import (
@@ -11,23 +11,95 @@ from .utils import (
     download_file,
     disable_cuda,
     clean_ocr_output,
+    parse_grounding,
+    patch_image_loader,
+    supports_in_memory_images,
+    in_memory_image,
 )
-from .converters import docx_to_pdf, pdf_to_images
+from .converters import iter_pages, page_stage, pdf_page_count, prefetch, IMAGE_SUFFIXES, PageRenderer, TextLayerPage
+from .writers import open_writer, DEFAULT_FORMATS
+from .office import DocxConverter, DEFAULT_OFFICE_WORKERS
+from .jobs import JobManifest, CheckpointedWriter
+from .cache import ResultCache, DEFAULT_MAX_BYTES
+from .workers import WorkerPool
+from .metrics import RunMetrics, instrument_model
+from .blank import is_blank_page, DEFAULT_BLANK_THRESHOLD, BLANK_PAGE_TEXT
+from .layout import DocumentLayout, PageFingerprint, crop_block, layout_blocks, page_text, region_mode, same_text
+from .generation import GenerationController, DEFAULT_MAX_TOKENS, DEFAULT_REPETITION_GUARD
+from .resolution import PRESETS, DEFAULT_PRESET, AUTO, analyze_complexity, choose_preset, image_size_of, vision_tokens
+from .speculative import DocumentDrafts, DraftStats, text_layer_pages
+from . import __version__
 from PIL import Image
 
 console = Console()
 
+# torch/transformers are imported inside the functions that need them,
+# so `dsocr --help`, the server client and batch discovery start instantly.
+
+# Session options (create_session arguments) a single job may override, e.g. the
+# flags a client sends to the daemon, and the session attribute each one lives on
+JOB_OPTIONS = {
+    "hybrid": ("renderer", "hybrid"),
+    "resume": (None, "resume"),
+    "max_tokens": ("controller", "max_tokens"),
+    "token_budget": ("controller", "token_budget"),
+    "repetition_guard": ("controller", "repetition_guard"),
+    "page_timeout": ("controller", "page_timeout"),
+    "blank_threshold": (None, "blank_threshold"),
+    "layout": (None, "layout"),
+    "resolution": (None, "resolution"),
+    "speculative": (None, "speculative"),
+}
+
 def get_device(requested_device=None):
     if requested_device:
         return requested_device
+    import torch
     if torch.backends.mps.is_available():
         return "mps"
     return "cpu"
 
-def load_model(device, model_cache=None):
+def select_dtype(device):
+    """
+    Pick the weight dtype for a device.
+    """
+    import torch
+
+    # Fallback logic for bfloat16 (MPS doesn't support it, older CPUs may not either)
+    dtype = torch.bfloat16
+    if device == "mps":
+        # MPS does not support bfloat16, use float16 instead
+        console.print("[yellow]MPS does not support bfloat16, using float16.[/yellow]")
+        dtype = torch.float16
+    elif device == "cpu":
+        try:
+            # Test if bfloat16 is supported for a simple operation
+            torch.tensor([1.0], dtype=torch.bfloat16).to("cpu")
+        except Exception:
+            console.print("[yellow]bfloat16 not fully supported on this CPU, falling back to float32.[/yellow]")
+            dtype = torch.float32
+    return dtype
+
+def resolve_model_path(model_cache=None):
+    """
+    Find the local model snapshot, downloading it if needed.
+    """
+    model_path = check_model_exists(model_cache)
+    if not model_path:
+        model_path = download_model(model_cache)
+    return model_path
+
+def load_model(device, model_cache=None, use_weights_cache=True, cache_dir=None, quantize=None):
     """
     Load the DeepSeek-OCR model.
+    The first load casts the weights straight to the target dtype and stores them as a
+    pre-cast, memory-mapped checkpoint; later loads map that checkpoint and skip conversion.
+    With quantize="int8" (CPU only) the language model's linears are quantized, and the
+    quantized checkpoint is cached the same way.
     """
+    from transformers import AutoModel, AutoTokenizer
+    from .weights import weights_cache_path, save_weights_cache, load_model_from_weights_cache
+
     # 0. Force-disable CUDA if not explicitly using it (upstream infer() hardcodes .cuda())
     disable_cuda(device)
 
@@ -35,9 +107,7 @@ def load_model(device, model_cache=None):
     patch_transformers()
     
     # 2. Check/Download Model
-    model_path = check_model_exists(model_cache)
-    if not model_path:
-        model_path = download_model(model_cache)
+    model_path = resolve_model_path(model_cache)
     
     console.print(f"[dim]Loading model from {model_path}...[/dim]")
     
@@ -45,28 +115,36 @@ def load_model(device, model_cache=None):
         model_path, 
         trust_remote_code=True
     )
-    
-    model = AutoModel.from_pretrained(
-        model_path,
-        trust_remote_code=True,
-        use_safetensors=True
-    )
-    
-    # Fallback logic for bfloat16 (MPS doesn't support it, older CPUs may not either)
-    dtype = torch.bfloat16
-    if device == "mps":
-        # MPS does not support bfloat16, use float16 instead
-        console.print("[yellow]MPS does not support bfloat16, using float16.[/yellow]")
-        dtype = torch.float16
-    elif device == "cpu":
-        try:
-            # Test if bfloat16 is supported for a simple operation
-            torch.tensor([1.0], dtype=torch.bfloat16).to("cpu")
-        except Exception:
-            console.print("[yellow]bfloat16 not fully supported on this CPU, falling back to float32.[/yellow]")
-            dtype = torch.float32
 
-    model = model.eval().to(dtype=dtype).to(device)
+    dtype = select_dtype(device)
+    weights_path = weights_cache_path(model_path, dtype, cache_dir, quantize)
+
+    if use_weights_cache and weights_path.exists():
+        console.print(f"[dim]Using pre-cast weights: {weights_path}[/dim]")
+        model = load_model_from_weights_cache(model_path, weights_path, dtype, device, quantize)
+    else:
+        # Load directly in the target dtype: one copy of the weights instead of
+        # loading, then .to(dtype), then .to(device)
+        model = AutoModel.from_pretrained(
+            model_path,
+            trust_remote_code=True,
+            use_safetensors=True,
+            torch_dtype=dtype,
+        )
+        model = model.eval().to(device)
+        if quantize:
+            from .quantize import quantize_model
+            console.print(f"[dim]Quantizing language model to {quantize} (one-time, cached)...[/dim]")
+            count = quantize_model(model, quantize)
+            console.print(f"[dim]Quantized {count} linear layers.[/dim]")
+        if use_weights_cache:
+            try:
+                save_weights_cache(model, weights_path)
+            except Exception as e:
+                console.print(f"[yellow]Could not cache pre-cast weights: {e}[/yellow]")
+
+    # Feed rendered pages to the model without a temp PNG per page
+    patch_image_loader(model)
     
     return tokenizer, model
 
@@ -83,23 +161,44 @@ def get_prompt(mode):
     }
     return prompts.get(mode, prompts['document'])
 
-def run_inference(model, tokenizer, image, prompt, output_dir):
+def _cache_key(cache, model, image, prompt, base_size, image_size, crop_mode):
+    params = {"base_size": base_size, "image_size": image_size, "crop_mode": crop_mode}
+    return cache.make_key(model, image, prompt, params)
+
+def run_inference(model, tokenizer, image, prompt, output_dir, base_size=1024, image_size=640, crop_mode=True, cache=None,
+                  controller=None):
     """
     Run inference on a single image (PIL Image object or path).
+    With a ResultCache, identical page/prompt/parameter/model combinations skip the model.
+    With a GenerationController, decoding is bounded by its per-page limits; pages it
+    stops early are not cached.
     """
-    # If image is PIL, save it temporarily because model.infer usually expects a path
-    # Checking model code source (from generic knowledge of DeepSeek-VL/OCR):
-    # Usually `image_file` arg expects a path.
-    
-    temp_img_path = None
-    if isinstance(image, Image.Image):
-        temp_img_path = output_dir / "temp_page.png"
-        image.save(temp_img_path)
-        image_path = str(temp_img_path)
-    else:
-        image_path = str(image)
-        
-    try:
+    cache_key = None
+    if controller is not None:
+        controller.stops = []
+    if cache is not None:
+        cache_key = _cache_key(cache, model, image, prompt, base_size, image_size, crop_mode)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # model.infer only takes an `image_file` path. PIL images are handed over
+    # in memory through the patched loader; a temp file is the fallback.
+    with ExitStack() as stack:
+        if controller is not None:
+            stack.enter_context(controller.page([image]))
+        if isinstance(image, Image.Image):
+            if supports_in_memory_images(model):
+                image_path = stack.enter_context(in_memory_image(image))
+            else:
+                # Per-process name: pool workers may share an output dir
+                temp_img_path = output_dir / f"temp_page_{os.getpid()}.png"
+                image.save(temp_img_path)
+                stack.callback(temp_img_path.unlink, missing_ok=True)
+                image_path = str(temp_img_path)
+        else:
+            image_path = str(image)
+
         # Note: model.infer signature might vary slightly based on the specific remote code version
         # We assume the standard signature used in the original script
         result = model.infer(
@@ -107,23 +206,731 @@ def run_inference(model, tokenizer, image, prompt, output_dir):
             prompt=prompt,
             image_file=image_path,
             output_path=str(output_dir), # Model might save assets here
-            base_size=1024,
-            image_size=640,
-            crop_mode=True,
+            base_size=base_size,
+            image_size=image_size,
+            crop_mode=crop_mode,
             save_results=False, # We want the text back, not just files
             test_compress=True,
             eval_mode=True  # Return text instead of writing files
         )
-        return result
-    finally:
-        if temp_img_path and temp_img_path.exists():
-            temp_img_path.unlink()
 
-def process_file(input_path, url, mode, output_dir, device_arg, model_cache=None, raw_output=False):
+    if cache_key is not None and result is not None and not (controller and controller.cut_short):
+        cache.put(cache_key, str(result))
+    return result
+
+def run_inference_batch(engine, images, prompt, base_size=1024, image_size=640, crop_mode=True, cache=None,
+                        controller=None):
     """
-    Main processing pipeline.
+    Run inference on several images with one batched generate per engine batch.
+    Cache hits are filled in directly; only misses reach the model.
+    Returns (results, stops): raw results and early-stop reasons in input order.
+    """
+    results = [None] * len(images)
+    stops = [None] * len(images)
+    keys = [None] * len(images)
+    if cache is not None:
+        for i, image in enumerate(images):
+            keys[i] = _cache_key(cache, engine.model, image, prompt, base_size, image_size, crop_mode)
+            results[i] = cache.get(keys[i])
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        with controller.page([images[i] for i in misses]) if controller else nullcontext():
+            texts = engine.infer([images[i] for i in misses], prompt, base_size, image_size, crop_mode)
+        # One reason per generated row, in the order the engine generated them
+        row_stops = controller.stops if controller else []
+        for j, (i, text) in enumerate(zip(misses, texts)):
+            results[i] = text
+            stops[i] = row_stops[j] if j < len(row_stops) else None
+            if keys[i] is not None and not stops[i]:
+                cache.put(keys[i], text)
+    return results, stops
+
+def run_inference_modes(engine, image, prompts, base_size=1024, image_size=640, crop_mode=True, cache=None,
+                        controller=None, drafts=None, draft_stats=None):
+    """
+    Run several prompts over one image, encoding the image once: the vision encoder
+    and the shared prompt prefix go through the model a single time and each prompt
+    is decoded from a copy of that cache (see BatchedInferenceEngine.encode_shared).
+    `drafts` optionally gives each prompt a reference text to decode it speculatively
+    from (see BatchedInferenceEngine.decode_shared), also when there is only one prompt.
+    Returns (results, stops) in prompt order.
+    """
+    results = [None] * len(prompts)
+    stops = [None] * len(prompts)
+    keys = [None] * len(prompts)
+    if cache is not None:
+        for k, prompt in enumerate(prompts):
+            keys[k] = _cache_key(cache, engine.model, image, prompt, base_size, image_size, crop_mode)
+            results[k] = cache.get(keys[k])
+
+    misses = [k for k, result in enumerate(results) if result is None]
+    drafts = drafts or [None] * len(prompts)
+    shared = None
+    if len(misses) > 1 or any(drafts[k] for k in misses):
+        shared = engine.encode_shared(image, [prompts[k] for k in misses], base_size, image_size, crop_mode)
+    for j, k in enumerate(misses):
+        # Each prompt gets the page's full decoding limits
+        with controller.page([image]) if controller else nullcontext():
+            if shared is not None:
+                results[k] = engine.decode_shared(shared, j, drafts[k], draft_stats)
+            else:
+                results[k] = engine.infer([image], prompts[k], base_size, image_size, crop_mode)[0]
+        stops[k] = next((stop for stop in controller.stops if stop), None) if controller else None
+        if keys[k] is not None and not stops[k]:
+            cache.put(keys[k], results[k])
+    return results, stops
+
+def as_modes(mode):
+    """
+    A mode name or a sequence of them, as a tuple of distinct modes.
+    """
+    return (mode,) if isinstance(mode, str) else tuple(dict.fromkeys(mode))
+
+def mode_output_dir(output_dir, mode, modes):
+    """
+    Where a mode's output goes: `output_dir` itself, or `<output_dir>/<mode>` when
+    several modes are written at once.
+    """
+    return Path(output_dir) if len(modes) == 1 else Path(output_dir) / mode
+
+def format_page_list(pages, limit=10):
+    """
+    "a.pdf p2, p5; b.pdf p1" for page records with "document" and "page" keys.
+    """
+    by_document = {}
+    for record in pages[:limit]:
+        by_document.setdefault(record["document"] or "page", []).append(f"p{record['page']}")
+    text = "; ".join(f"{document} {', '.join(numbers)}" for document, numbers in by_document.items())
+    if len(pages) > limit:
+        text += f"; +{len(pages) - limit} more"
+    return text
+
+def batched(iterable, size):
+    """
+    Group an iterable into lists of at most `size` items.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class OCRSession:
+    """
+    A loaded tokenizer/model pair that can OCR many files.
+    Used directly by process_file and kept resident by the `dsocr --serve` daemon.
+    """
+
+    def __init__(self, tokenizer, model, device=None, lookahead=2, cache=None, batch_size=1, pool=None, renderer=None,
+                 controller=None, docx=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        # Pages rendered ahead of the one in inference
+        self.lookahead = lookahead
+        # Optional ResultCache shared by every page this session processes
+        self.cache = cache
+        # Batched generate across pages, when the model's remote code allows it
+        self.engine = None
+        if batch_size > 1:
+            from .engine import BatchedInferenceEngine
+            if BatchedInferenceEngine.is_supported(model):
+                self.engine = BatchedInferenceEngine(model, tokenizer, batch_size)
+            else:
+                console.print("[yellow]Batched inference not supported by this model code, using one page at a time.[/yellow]")
+        # Optional WorkerPool of model-holding processes; the session then holds no model itself
+        self.pool = pool
+        # Rasterizes PDF pages (possibly across processes) at a DPI matched to the model input
+        self.renderer = renderer or PageRenderer()
+        # DOCX -> PDF through warm LibreOffice instances, into a private temp directory
+        self.docx = docx or DocxConverter()
+        self.text_layer_pages = 0
+        # Pages below this ink coverage skip the model (0 disables the check)
+        self.blank_threshold = DEFAULT_BLANK_THRESHOLD
+        self.blank_pages = []
+        # Per-page records of the last ocr_pages call (how each page was produced, timings, grounding)
+        self.last_pages = []
+        # Keep a layout index per document and re-OCR only changed or failed blocks (see DocumentLayout)
+        self.layout = False
+        self.layout_pages = 0
+        self.regions_ocred = 0
+        # Resolution preset for every page, or AUTO to pick one per page (see resolution.choose_preset)
+        self.resolution = DEFAULT_PRESET
+        self.resolution_counts = {}
+        self.vision_tokens_saved = 0
+        # Extra prompts decoded from an image encoding shared with another mode
+        self.shared_encodings = 0
+        self._modes_engine = None
+        # Decode pages speculatively from a previous run's output or the PDF text layer (see open_drafts)
+        self.speculative = False
+        self.draft_stats = DraftStats()
+        self.pages_processed = 0
+        self.inference_time = 0.0
+        # Startup timings, filled in by create_session
+        self.started_at = time.perf_counter()
+        self.load_time = None
+        self.time_to_first_page = None
+        # Per-stage timings, tokens and per-page records; written to metrics_json on close
+        self.metrics = RunMetrics()
+        self.metrics_json = None
+        # Continue interrupted documents from their checkpoint in the output directory
+        self.resume = True
+        # Per-page decoding limits (token budget, repetition guard, timeout)
+        self.controller = controller or GenerationController()
+        self.controller.metrics = self.metrics
+        if model is not None:
+            instrument_model(model, self.metrics)
+            self.controller.install(model)
+
+    @property
+    def batch_size(self):
+        return self.engine.batch_size if self.engine else 1
+
+    @contextmanager
+    def job_options(self, **options):
+        """
+        Apply per-job options (see JOB_OPTIONS) for the duration of one job; the
+        session's own settings are restored afterwards.
+        Raises ValueError for options that are fixed when the session is created.
+        """
+        targets = {}
+        for name in options:
+            if name not in JOB_OPTIONS:
+                raise ValueError(f"'{name}' cannot be changed per job")
+            owner, attribute = JOB_OPTIONS[name]
+            targets[name] = (getattr(self, owner) if owner else self, attribute)
+        saved = {name: getattr(target, attribute) for name, (target, attribute) in targets.items()}
+        try:
+            for name, value in options.items():
+                target, attribute = targets[name]
+                setattr(target, attribute, value)
+            yield self
+        finally:
+            for name, value in saved.items():
+                target, attribute = targets[name]
+                setattr(target, attribute, value)
+
+    def reset_run(self):
+        """
+        Clear the run counters, per-page lists and metrics so the next summary and
+        metrics report cover only what follows (one job of the `--serve` daemon).
+        Startup timings are kept.
+        """
+        self.text_layer_pages = 0
+        self.blank_pages = []
+        self.last_pages = []
+        self.layout_pages = 0
+        self.regions_ocred = 0
+        self.resolution_counts = {}
+        self.vision_tokens_saved = 0
+        self.shared_encodings = 0
+        self.draft_stats = DraftStats()
+        self.pages_processed = 0
+        self.inference_time = 0.0
+        self.metrics.reset()
+        for counter in (self.cache, self.pool):
+            if counter is not None:
+                counter.hits = counter.misses = 0
+
+    @property
+    def pages_per_step(self):
+        """
+        How many pages to hand to ocr_pages at once to keep the model(s) busy.
+        """
+        if self.pool is not None:
+            return self.pool.workers
+        return self.batch_size
+
+    def ocr_page(self, image, prompt, output_dir, raw_output=False, page_id=None):
+        """
+        OCR one page (PIL Image or image path) and return its text.
+        """
+        page_ids = [page_id] if page_id else None
+        return self.ocr_pages([image], prompt, output_dir, raw_output, page_ids)[0]
+
+    def open_manifest(self, output_dir, input_path, mode, raw_output=False):
+        """
+        The document's JobManifest under the session's current settings.
+        """
+        return JobManifest.open(output_dir, input_path, mode, raw_output, resume=self.resume,
+                                hybrid=self.renderer.hybrid, resolution=self.resolution, layout=self.layout)
+
+    def open_layout(self, output_dir, input_path, mode, raw_output=False):
+        """
+        The document's DocumentLayout when layout tracking is on, else None.
+        Raw output keeps the model's markers, which reassembled blocks cannot reproduce.
+        """
+        if not self.layout or raw_output:
+            return None
+        return DocumentLayout(output_dir, input_path, mode)
+
+    def open_drafts(self, output_dirs, input_path, source_path, skip=()):
+        """
+        A DocumentDrafts per mode (keyed like `output_dirs`) when speculative decoding
+        is on, else an empty dict. The text layer of a PDF source is read once for all modes.
+        Raises RuntimeError when the installed transformers cannot decode speculatively.
+        """
+        if not self.speculative or self.pool is not None:
+            return {}
+        from .engine import check_speculative_support
+        check_speculative_support(self.model)
+        text_layer = {}
+        if Path(source_path).suffix.lower() == '.pdf':
+            try:
+                text_layer = text_layer_pages(source_path, skip)
+            except Exception as e:
+                # Drafts only speed decoding up; the document is OCRed either way
+                console.print(f"[dim]No text-layer drafts for {Path(input_path).name}: {e}[/dim]")
+        return {mode: DocumentDrafts(output_dir, input_path, text_layer) for mode, output_dir in output_dirs.items()}
+
+    def choose_resolution(self, image):
+        """
+        The resolution preset to OCR a page (or crop) with.
+        """
+        if self.resolution != AUTO:
+            return self.resolution
+        with self.metrics.timed("resolution check"):
+            return choose_preset(analyze_complexity(image))
+
+    def _infer(self, images, prompt, output_dir, presets=None):
+        """
+        Raw results for page rasters from the worker pool, the batch engine or the model,
+        each at its resolution preset (default: choose_resolution).
+        Returns (results, stops): stops holds the early-stop reason per page, where it
+        can be attributed to a single page.
+        """
+        if presets is None:
+            presets = [self.choose_resolution(image) for image in images]
+        stops = [None] * len(images)
+        if self.pool is not None:
+            results = self.pool.ocr_pages(images, prompt, output_dir, [PRESETS[preset] for preset in presets],
+                                          self.controller.options())
+            stops = self.pool.last_stops
+            for stop in stops:
+                if stop:
+                    self.metrics.add_stop(stop)
+        elif self.engine is not None and len(images) > 1:
+            # One batched generate per preset: a batch shares its input geometry
+            results = [None] * len(images)
+            for preset in dict.fromkeys(presets):
+                indexes = [i for i, p in enumerate(presets) if p == preset]
+                texts, batch_stops = run_inference_batch(self.engine, [images[i] for i in indexes], prompt,
+                                                         *PRESETS[preset], cache=self.cache, controller=self.controller)
+                for i, text, stop in zip(indexes, texts, batch_stops):
+                    results[i] = text
+                    stops[i] = stop
+        else:
+            results = []
+            for i, (image, preset) in enumerate(zip(images, presets)):
+                results.append(run_inference(self.model, self.tokenizer, image, prompt, output_dir, *PRESETS[preset],
+                                             cache=self.cache, controller=self.controller))
+                stops[i] = next((stop for stop in self.controller.stops if stop), None)
+        return results, stops
+
+    def ocr_region(self, image, block, output_dir):
+        """
+        OCR one layout block of a page on its own: cropped, with the prompt for its label.
+        """
+        crop = crop_block(image, block["box"])
+        with self.metrics.timed("region ocr"):
+            results, _ = self._infer([crop], get_prompt(region_mode(block["label"])), output_dir)
+        self.regions_ocred += 1
+        return clean_ocr_output(str(results[0]))
+
+    def _shared_engine(self):
+        """
+        Engine for sharing one image encoding across prompts: the batch engine, or a
+        single-page one. None with a worker pool or when the model code does not allow it.
+        """
+        if self.pool is not None:
+            return None
+        if self.engine is not None:
+            return self.engine
+        if self._modes_engine is None:
+            from .engine import BatchedInferenceEngine
+            if BatchedInferenceEngine.is_supported(self.model):
+                self._modes_engine = BatchedInferenceEngine(self.model, self.tokenizer, 1)
+            else:
+                console.print("[yellow]This model code cannot reuse a page's image encoding; each mode "
+                              "encodes the page again and pages are not decoded speculatively.[/yellow]")
+                self._modes_engine = False
+        return self._modes_engine or None
+
+    def _infer_prompts(self, images, prompts, output_dir, presets, drafts=None):
+        """
+        Like _infer, with a list of prompts per image. Images needing several prompts,
+        or with a draft (reference text per prompt, in `drafts`) to decode from, are
+        encoded once for all of them (run_inference_modes); the rest are grouped by prompt.
+        Returns (results, stops), per image in the order of its prompts.
+        """
+        results = [[None] * len(page_prompts) for page_prompts in prompts]
+        stops = [[None] * len(page_prompts) for page_prompts in prompts]
+        drafts = drafts or [None] * len(images)
+        shared = [len(page_prompts) > 1 or any(page_drafts or ()) for page_prompts, page_drafts in zip(prompts, drafts)]
+        engine = self._shared_engine() if any(shared) else None
+        slots = {}
+        for j, page_prompts in enumerate(prompts):
+            if engine is not None and shared[j]:
+                # A draft is verified against one page at a time, outside any batch
+                results[j], stops[j] = run_inference_modes(engine, images[j], page_prompts, *PRESETS[presets[j]],
+                                                           cache=self.cache, controller=self.controller,
+                                                           drafts=drafts[j], draft_stats=self.draft_stats)
+                self.shared_encodings += len(page_prompts) - 1
+                continue
+            for k, prompt in enumerate(page_prompts):
+                slots.setdefault(prompt, []).append((j, k))
+        for prompt, positions in slots.items():
+            texts, prompt_stops = self._infer([images[j] for j, _ in positions], prompt, output_dir,
+                                              [presets[j] for j, _ in positions])
+            for (j, k), text, stop in zip(positions, texts, prompt_stops):
+                results[j][k] = text
+                stops[j][k] = stop
+        return results, stops
+
+    def ocr_pages(self, images, prompt, output_dir, raw_output=False, page_ids=None, layouts=None):
+        """
+        OCR several pages, in one batched generate when an engine is available.
+        TextLayerPage items skip the model and return their embedded text; blank
+        pages (see blank_threshold) skip it and return BLANK_PAGE_TEXT.
+        `page_ids` are optional (document, page number) labels for the metrics report.
+        `layouts` optionally gives each page's DocumentLayout (with page_ids): pages
+        unchanged since the previous run reuse their text or re-OCR only changed blocks.
+        Returns texts in input order; `last_pages` holds a record for each page.
+        """
+        texts, records = self.ocr_pages_multi(images, [prompt], output_dir, raw_output, page_ids,
+                                              [layouts] if layouts else None)
+        self.last_pages = records[0]
+        return texts[0]
+
+    def ocr_pages_multi(self, images, prompts, output_dir, raw_output=False, page_ids=None, layouts=None,
+                        drafts=None, skip=None):
+        """
+        ocr_pages with several prompts (one per mode) over the same pages. Each page is
+        checked and encoded once, then decoded with every prompt it still needs.
+        `layouts` optionally gives, per prompt, each page's DocumentLayout, `drafts`
+        each page's reference text to decode speculatively from (or None), and `skip`
+        the indexes of the pages it is not needed for (e.g. done by an earlier run).
+        Returns (texts, records): per prompt, the texts and last_pages records in input
+        order; skipped pages keep a None text unless they needed no decoding anyway.
+        """
+        skipped = {(k, i) for k, indexes in enumerate(skip or ()) for i in indexes}
+        shared = [page.text if isinstance(page, TextLayerPage) else None for page in images]
+        self.text_layer_pages += sum(text is not None for text in shared)
+        sources = ["text layer" if text is not None else None for text in shared]
+        if self.blank_threshold:
+            with self.metrics.timed("blank check", count=shared.count(None)):
+                for i, page in enumerate(images):
+                    if shared[i] is not None:
+                        continue
+                    blank, content = is_blank_page(page, self.blank_threshold)
+                    if blank:
+                        shared[i] = BLANK_PAGE_TEXT
+                        sources[i] = "blank"
+                        document, page_number = page_ids[i] if page_ids else (None, None)
+                        self.blank_pages.append({
+                            "document": document,
+                            "page": page_number,
+                            "coverage": round(content.coverage, 6),
+                            "regions": content.regions,
+                        })
+        texts = [list(shared) for _ in prompts]
+        records = [[None] * len(images) for _ in prompts]
+        fingerprints = {}
+        if layouts and page_ids and not raw_output:
+            for k, page_layouts in enumerate(layouts):
+                for i, page in enumerate(images):
+                    if (texts[k][i] is not None or (k, i) in skipped or page_layouts[i] is None
+                            or not isinstance(page, Image.Image)):
+                        continue
+                    start = time.perf_counter()
+                    with self.metrics.timed("layout check"):
+                        if i not in fingerprints:
+                            fingerprints[i] = PageFingerprint(page)
+                        entry, changed = page_layouts[i].plan(page_ids[i][1], fingerprints[i])
+                    if entry is None:
+                        continue
+                    blocks = [dict(block) for block in entry["blocks"]]
+                    for j in changed:
+                        blocks[j]["text"] = self.ocr_region(page, blocks[j], output_dir)
+                    texts[k][i] = page_text(blocks) if changed else entry["text"]
+                    page_layouts[i].record(page_ids[i][1], fingerprints[i], texts[k][i], blocks)
+                    records[k][i] = {"source": "layout", "seconds": round(time.perf_counter() - start, 4),
+                                     "tokens": None, "regions_ocred": len(changed)}
+                    self.layout_pages += 1
+        for i in range(len(images)):
+            if sources[i] is None and all(page_texts[i] is not None or (k, i) in skipped
+                                          for k, page_texts in enumerate(texts)):
+                sources[i] = "layout"
+            if sources[i] is None:
+                continue
+            for page_records in records:
+                if page_records[i] is None:
+                    page_records[i] = {"source": sources[i], "seconds": 0.0, "tokens": 0}
+            if page_ids:
+                seconds = sum(page_records[i]["seconds"] for page_records in records)
+                self.metrics.add_page(*page_ids[i], seconds, records[0][i]["tokens"], mode=sources[i])
+        raster_indexes = [i for i, source in enumerate(sources) if source is None]
+        rasters = [images[i] for i in raster_indexes]
+        if not rasters:
+            return texts, records
+
+        # The prompts each page still needs, by index
+        pending = [[k for k, page_texts in enumerate(texts) if page_texts[i] is None and (k, i) not in skipped]
+                   for i in raster_indexes]
+        outputs = sum(map(len, pending))
+        presets = [self.choose_resolution(image) for image in rasters]
+        sizes = [image_size_of(image) for image in rasters]
+        tokens_before = self.metrics.tokens
+        start = time.perf_counter()
+        raster_drafts = [[drafts[k][i] for k in ks] for i, ks in zip(raster_indexes, pending)] if drafts else None
+        results, stops = self._infer_prompts(rasters, [[prompts[k] for k in ks] for ks in pending], output_dir, presets,
+                                             raster_drafts)
+        elapsed = time.perf_counter() - start
+        self.inference_time += elapsed
+        self.pages_processed += len(rasters)
+        if self.time_to_first_page is None:
+            self.time_to_first_page = time.perf_counter() - self.started_at
+
+        # Batched pages share the step's time and tokens evenly; workers report no tokens
+        self.metrics.add("inference", elapsed, len(rasters))
+        tokens = None if self.pool is not None else self.metrics.tokens - tokens_before
+        raster_ids = [page_ids[i] for i in raster_indexes] if page_ids else [(None, None)] * len(rasters)
+        # Vision tokens per page at its preset, and how many fewer than the default preset would use
+        spent = [vision_tokens(preset, size) for preset, size in zip(presets, sizes)]
+        saved = [vision_tokens(DEFAULT_PRESET, size) - n for n, size in zip(spent, sizes)]
+        for preset, n in zip(presets, saved):
+            self.resolution_counts[preset] = self.resolution_counts.get(preset, 0) + 1
+            self.vision_tokens_saved += n
+        for (document, page), page_stops, preset, n in zip(raster_ids, stops, presets, saved):
+            self.metrics.add_page(document, page, elapsed / len(rasters),
+                                  None if tokens is None else round(tokens / len(rasters)),
+                                  stop=next((stop for stop in page_stops if stop), None), resolution=preset,
+                                  vision_tokens_saved=n)
+
+        groundings = {}
+        with self.metrics.timed("clean output", count=outputs):
+            for j, i in enumerate(raster_indexes):
+                for k, result, stop in zip(pending[j], results[j], stops[j]):
+                    text_result = str(result)
+                    records[k][i] = {"source": "ocr", "seconds": round(elapsed / outputs, 4),
+                                     "tokens": None if tokens is None else round(tokens / outputs),
+                                     "stopped_early": stop, "resolution": presets[j], "vision_tokens": spent[j],
+                                     "vision_tokens_saved": saved[j]}
+                    groundings[k, i] = parse_grounding(text_result)
+                    if groundings[k, i]:
+                        records[k][i]["grounding"] = groundings[k, i]
+                    if not raw_output:
+                        text_result = clean_ocr_output(text_result)
+                    texts[k][i] = text_result
+
+        for (k, i), grounding in groundings.items():
+            if i not in fingerprints or layouts[k][i] is None:
+                continue
+            blocks = layout_blocks(grounding)
+            if records[k][i]["stopped_early"] and blocks and same_text(page_text(blocks), texts[k][i]):
+                # Decoding went wrong in the last block it reached: OCR that block again on its own
+                blocks[-1]["text"] = self.ocr_region(images[i], blocks[-1], output_dir)
+                texts[k][i] = page_text(blocks)
+                records[k][i]["regions_ocred"] = 1
+            layouts[k][i].record(page_ids[i][1], fingerprints[i], texts[k][i], blocks)
+        return texts, records
+
+    def ocr_file(self, input_path, mode, output_dir, raw_output=False, formats=DEFAULT_FORMATS):
+        """
+        OCR a single local file into `output_dir`, streaming pages in each of `formats`
+        (see writers.open_writer). `mode` may be several modes: each page is then rendered
+        and encoded once and decoded per mode, into `<output_dir>/<mode>/`.
+        Returns the path of the first output (the Markdown file by default), or None on failure.
+        """
+        input_path = Path(input_path)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        modes = as_modes(mode)
+        output_dirs = {mode: mode_output_dir(output_dir, mode, modes) for mode in modes}
+
+        # 2. Pre-process Input (DOCX -> PDF), then stream pages
+        suffix = input_path.suffix.lower()
+        console.print(f"Processing {input_path.name}...")
+        
+        if suffix in ['.docx']:
+            console.print("Converting DOCX to PDF...")
+            with self.metrics.timed("docx conversion"):
+                source_path = self.docx.convert(input_path)
+        elif suffix in ['.pdf'] + IMAGE_SUFFIXES:
+            source_path = input_path
+        else:
+            console.print(f"[red]Unsupported format: {suffix}[/red]")
+            return None
+
+        layouts = {mode: self.open_layout(output_dirs[mode], input_path, mode, raw_output) for mode in modes}
+        try:
+            total_pages = pdf_page_count(source_path) if source_path.suffix.lower() == '.pdf' else 1
+            manifests = {}
+            for mode in modes:
+                output_dirs[mode].mkdir(parents=True, exist_ok=True)
+                manifests[mode] = self.open_manifest(output_dirs[mode], input_path, mode, raw_output)
+            # Pages done in every mode are not rendered again; the others are decoded
+            # only in the modes that still lack them
+            done = frozenset.intersection(*(frozenset(manifest.completed) for manifest in manifests.values()))
+            if done:
+                console.print(f"[dim]Resuming {input_path.name}: {len(done)}/{total_pages} pages already done.[/dim]")
+            drafts = self.open_drafts(output_dirs, input_path, source_path, done)
+            # Pages are rendered a few ahead of inference on a background thread;
+            # memory stays flat regardless of document length.
+            pages = prefetch(self.metrics.timed_pages(iter_pages(source_path, self.renderer, skip=done),
+                                                      page_stage(source_path)),
+                             max(self.lookahead, self.pages_per_step))
+
+            # 3. Inference Loop, flushing each page to the output file as it finishes
+            prompts = [get_prompt(mode) for mode in modes]
+        
+            with Progress(
+                TextColumn("[progress.description]{task.description}"),
+                transient=False,
+            ) as progress, ExitStack() as stack:
+                writers = {
+                    mode: stack.enter_context(CheckpointedWriter(
+                        open_writer(output_dirs[mode], input_path, mode, formats), manifests[mode]))
+                    for mode in modes
+                }
+                task = progress.add_task("[green]OCR Processing...", total=total_pages, completed=len(done))
+            
+                for batch in batched(pages, self.pages_per_step):
+                    first, last = batch[0][0], batch[-1][0]
+                    label = f"page {first+1}" if first == last else f"pages {first+1}-{last+1}"
+                    progress.update(task, description=f"Processing {label}/{total_pages}")
+                
+                    # Sub-folder for assets of this page if needed, but model handles it via output_path
+                    # We pass the main output dir. The model usually saves images if instructed.
+                    # Here we just want text.
+                
+                    page_ids = [(input_path.name, idx + 1) for idx, _ in batch]
+                    texts, records = self.ocr_pages_multi([image_obj for _, image_obj in batch], prompts, output_dir,
+                                                          raw_output, page_ids,
+                                                          [[layouts[mode]] * len(batch) for mode in modes],
+                                                          [[drafts[mode].get(idx + 1) for idx, _ in batch]
+                                                           for mode in modes] if drafts else None,
+                                                          [[j for j, (idx, _) in enumerate(batch)
+                                                            if idx in manifests[mode].completed] for mode in modes])
+                    with self.metrics.timed("write", count=len(batch)):
+                        for mode, mode_texts, mode_records in zip(modes, texts, records):
+                            for (idx, _), text_result, record in zip(batch, mode_texts, mode_records):
+                                if idx in manifests[mode].completed:
+                                    # Done in this mode by an earlier run; filled in from its checkpoint
+                                    continue
+                                writers[mode].write_page(idx, text_result, record)
+                
+                    progress.advance(task, len(batch))
+            
+        finally:
+            if source_path != input_path:
+                self.docx.release(source_path)
+            for layout in layouts.values():
+                if layout is not None:
+                    layout.save()
+
+        for mode in modes:
+            label = f" ({mode})" if len(modes) > 1 else ""
+            console.print(f"[bold green]Success![/bold green] Results{label} saved to: {writers[mode].result_file}")
+        self.print_summary()
+        return writers[modes[0]].result_file
+
+    @property
+    def plain_tokens_per_sec(self):
+        """
+        Decoding speed of the pages decoded without a draft, the baseline for speculative decoding.
+        """
+        tokens = self.metrics.tokens - self.draft_stats.tokens
+        seconds = self.metrics.generation_time - self.draft_stats.seconds
+        return tokens / seconds if tokens > 0 and seconds > 0 else None
+
+    def print_summary(self):
+        """
+        Print run counters (startup, throughput, cache hits/misses).
+        """
+        if self.load_time is not None and self.time_to_first_page is not None:
+            console.print(f"[dim]Startup: model load {self.load_time:.1f}s, "
+                          f"time to first page {self.time_to_first_page:.1f}s[/dim]")
+        if self.pages_processed and self.inference_time > 0:
+            rate = self.pages_processed / self.inference_time * 60
+            parallelism = f"{self.pool.workers} workers" if self.pool else f"batch size {self.batch_size}"
+            console.print(f"[dim]Inference: {self.pages_processed} pages in {self.inference_time:.1f}s "
+                          f"({rate:.1f} pages/min, {parallelism})[/dim]")
+        if self.pool is not None and self.pool.use_cache:
+            console.print(f"[dim]{self.pool.summary()}[/dim]")
+        if self.cache is not None:
+            console.print(f"[dim]{self.cache.summary()}[/dim]")
+        if self.renderer.hybrid:
+            total = self.text_layer_pages + self.pages_processed
+            console.print(f"[dim]Hybrid: {self.text_layer_pages} of {total} pages took the text-layer fast path, "
+                          f"{self.pages_processed} went through OCR[/dim]")
+        if self.blank_pages:
+            console.print(f"[dim]Blank: {len(self.blank_pages)} pages skipped inference "
+                          f"({format_page_list(self.blank_pages)})[/dim]")
+        if self.layout_pages or self.regions_ocred:
+            console.print(f"[dim]Layout: {self.layout_pages} pages matched the layout index, "
+                          f"{self.regions_ocred} regions re-OCRed[/dim]")
+        if self.resolution != DEFAULT_PRESET and self.resolution_counts:
+            presets = ", ".join(f"{count} {preset}" for preset, count in sorted(self.resolution_counts.items()))
+            console.print(f"[dim]Resolution: {presets} ({self.vision_tokens_saved:+d} vision tokens saved "
+                          f"against {DEFAULT_PRESET})[/dim]")
+        if self.shared_encodings:
+            console.print(f"[dim]Modes: {self.shared_encodings} extra mode outputs decoded from a shared "
+                          f"image encoding[/dim]")
+        if self.draft_stats.pages:
+            console.print(f"[dim]{self.draft_stats.summary(self.plain_tokens_per_sec)}[/dim]")
+        if self.metrics.busy:
+            console.print(f"[dim]{self.metrics.summary()}[/dim]")
+
+    def write_metrics(self, path):
+        """
+        Write the machine-readable metrics report (JSON) to `path`.
+        """
+        path = self.metrics.write_json(
+            path,
+            version=__version__,
+            device=self.device,
+            batch_size=self.batch_size,
+            workers=self.pool.workers if self.pool else 1,
+            load_time=self.load_time,
+            time_to_first_page=self.time_to_first_page,
+            text_layer_pages=self.text_layer_pages,
+            blank_pages=self.blank_pages,
+            layout_pages=self.layout_pages,
+            regions_ocred=self.regions_ocred,
+            resolution=self.resolution,
+            resolution_presets={name: dict(zip(("base_size", "image_size", "crop_mode"), preset))
+                                for name, preset in PRESETS.items()},
+            resolution_counts=self.resolution_counts,
+            vision_tokens_saved=self.vision_tokens_saved,
+            shared_encodings=self.shared_encodings,
+            speculative=self.draft_stats.to_dict(self.plain_tokens_per_sec) if self.speculative else None,
+        )
+        console.print(f"[dim]Metrics written to {path}[/dim]")
+        return path
+
+    def close(self):
+        """
+        Write the metrics report if requested, stop worker, render and LibreOffice processes and close the cache.
+        """
+        if self.metrics_json:
+            self.write_metrics(self.metrics_json)
+        self.renderer.close()
+        self.docx.close()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+
+def resolve_input(input_path, url, output_dir):
+    """
+    Download `url` if given and work out the output directory.
+    Returns (input_path, output_dir), with input_path None if nothing usable was provided.
     """
-    # 0. Setup
     if url:
         # Create a temp dir for download if not provided
         # Or just download to CWD? Let's download to output_dir to keep it clean
@@ -139,21 +946,79 @@ def process_file(input_path, url, mode, output_dir, device_arg, model_cache=None
             # Default output dir logic needs input path, so set it later
             
     if not input_path:
-        console.print("[red]No input file provided or download failed.[/red]")
-        return
+        return None, None
 
     input_path = Path(input_path)
     
     if not output_dir:
-        output_dir = input_path.parent / "ocr_output" / input_path.stem
+        output_dir = default_output_dir(input_path)
     else:
         output_dir = Path(output_dir)
-        
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 1. Load Model
+
+    return input_path, output_dir
+
+def default_output_dir(input_path):
+    """
+    Default output location: <input dir>/ocr_output/<input stem>.
+    """
+    input_path = Path(input_path)
+    return input_path.parent / "ocr_output" / input_path.stem
+
+def create_session(device_arg=None, model_cache=None, lookahead=2, cache_dir=None, cache_size_mb=None, use_cache=True,
+                   batch_size=1, workers=1, threads_per_worker=None, pin_cores=False, use_weights_cache=True,
+                   quantize=None, metrics_json=None, render_processes=1, dpi=None, hybrid=False, resume=True,
+                   max_tokens=DEFAULT_MAX_TOKENS, token_budget=False, repetition_guard=DEFAULT_REPETITION_GUARD,
+                   page_timeout=None, blank_threshold=DEFAULT_BLANK_THRESHOLD, office_workers=DEFAULT_OFFICE_WORKERS,
+                   layout=False, resolution=DEFAULT_PRESET, speculative=False):
+    """
+    Pick a device and load the model into an OCRSession.
+    With workers > 1 the model lives in a WorkerPool of separate processes instead.
+    Returns None if the model could not be loaded.
+    """
+    started_at = time.perf_counter()
     device = get_device(device_arg)
     console.print(f"[bold green]Using device: {device}[/bold green]")
+    max_bytes = cache_size_mb * 1024 * 1024 if cache_size_mb else DEFAULT_MAX_BYTES
+    renderer = PageRenderer(render_processes, dpi, hybrid)
+    controller = GenerationController(max_tokens, token_budget, repetition_guard, page_timeout)
+    docx = DocxConverter(office_workers)
+    if quantize and device != "cpu":
+        console.print(f"[yellow]--quantize {quantize} only has CPU kernels; ignored on {device}.[/yellow]")
+        quantize = None
+
+    if workers > 1:
+        if not use_weights_cache:
+            console.print("[red]--workers needs the weights cache: every worker maps the same pre-cast "
+                          "checkpoint. Drop --no-weights-cache or use --workers 1.[/red]")
+            return None
+        if batch_size > 1:
+            console.print("[yellow]--batch-size is ignored with --workers; each worker processes one page at a time.[/yellow]")
+        if speculative:
+            console.print("[yellow]--speculative is not available with --workers; decoding normally.[/yellow]")
+        pool = WorkerPool(workers, device, model_cache, threads_per_worker, pin_cores,
+                          cache_dir, max_bytes, use_cache, quantize, controller.options())
+        try:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                transient=True,
+            ) as progress:
+                progress.add_task(description=f"Starting {workers} DeepSeek-OCR workers...", total=None)
+                pool.start()
+        except Exception as e:
+            console.print(f"[red]Failed to start workers: {e}[/red]")
+            return None
+        session = OCRSession(None, None, device, lookahead=lookahead, pool=pool, renderer=renderer,
+                             controller=controller, docx=docx)
+        session.started_at = started_at
+        session.load_time = time.perf_counter() - started_at
+        session.metrics.add("model load", session.load_time)
+        session.metrics_json = metrics_json
+        session.resume = resume
+        session.blank_threshold = blank_threshold
+        session.layout = layout
+        session.resolution = resolution
+        return session
     
     try:
         with Progress(
@@ -162,69 +1027,50 @@ def process_file(input_path, url, mode, output_dir, device_arg, model_cache=None
             transient=True,
         ) as progress:
             progress.add_task(description="Loading DeepSeek-OCR Model...", total=None)
-            tokenizer, model = load_model(device, model_cache)
+            tokenizer, model = load_model(device, model_cache, use_weights_cache, cache_dir, quantize)
     except Exception as e:
         console.print(f"[red]Failed to load model: {e}[/red]")
-        return
+        return None
 
-    # 2. Pre-process Input (Convert to Images)
-    images_to_process = [] # List of (page_num, image_path_or_obj) 
-    
-    suffix = input_path.suffix.lower()
-    console.print(f"Processing {input_path.name}...")
-    
-    if suffix in ['.pdf']:
-        console.print("Rendering PDF pages...")
-        for idx, img in pdf_to_images(input_path):
-            images_to_process.append((idx, img))
-            
-    elif suffix in ['.docx']:
-        console.print("Converting DOCX to PDF...")
-        pdf_path = docx_to_pdf(input_path)
-        console.print("Rendering PDF pages...")
-        for idx, img in pdf_to_images(pdf_path):
-            images_to_process.append((idx, img))
-            
-    elif suffix in ['.png', '.jpg', '.jpeg', '.webp', '.bmp']:
-        images_to_process.append((0, input_path))
-        
-    else:
-        console.print(f"[red]Unsupported format: {suffix}[/red]")
-        return
+    if threads_per_worker:
+        import torch
+        torch.set_num_threads(threads_per_worker)
 
-    # 3. Inference Loop
-    full_markdown = f"# {input_path.name}\n\n"
-    prompt = get_prompt(mode)
-    
-    total_pages = len(images_to_process)
+    cache = ResultCache(cache_dir, max_bytes) if use_cache else None
+
+    session = OCRSession(tokenizer, model, device, lookahead=lookahead, cache=cache, batch_size=batch_size,
+                         renderer=renderer, controller=controller, docx=docx)
+    session.started_at = started_at
+    session.load_time = time.perf_counter() - started_at
+    session.metrics.add("model load", session.load_time)
+    session.metrics_json = metrics_json
+    session.resume = resume
+    session.blank_threshold = blank_threshold
+    session.layout = layout
+    session.resolution = resolution
+    session.speculative = speculative
+    return session
+
+def process_file(input_path, url, mode, output_dir, device_arg, model_cache=None, raw_output=False,
+                 formats=DEFAULT_FORMATS, **session_options):
+    """
+    Main processing pipeline.
+    `session_options` are passed through to create_session.
+    """
+    # 0. Setup
+    input_path, output_dir = resolve_input(input_path, url, output_dir)
+    if not input_path:
+        console.print("[red]No input file provided or download failed.[/red]")
+        return None
+
+    output_dir.mkdir(parents=True, exist_ok=True)
     
-    with Progress(
-        TextColumn("[progress.description]{task.description}"),
-        transient=False,
-    ) as progress:
-        task = progress.add_task("[green]OCR Processing...", total=total_pages)
-        
-        for idx, image_obj in images_to_process:
-            progress.update(task, description=f"Processing page {idx+1}/{total_pages}")
-            
-            # Sub-folder for assets of this page if needed, but model handles it via output_path
-            # We pass the main output dir. The model usually saves images if instructed.
-            # Here we just want text.
-            
-            result = run_inference(model, tokenizer, image_obj, prompt, output_dir)
-            
-            # Append result
-            full_markdown += f"## Page {idx+1}\n\n"
-            text_result = str(result)
-            if not raw_output:
-                text_result = clean_ocr_output(text_result)
-            full_markdown += text_result + "\n\n"
-            
-            progress.advance(task)
+    # 1. Load Model
+    session = create_session(device_arg, model_cache, **session_options)
+    if session is None:
+        return None
 
-    # 4. Save Result
-    result_file = output_dir / f"{input_path.stem}.md"
-    with open(result_file, 'w', encoding='utf-8') as f:
-        f.write(full_markdown)
-        
-    console.print(f"[bold green]Success![/bold green] Results saved to: {result_file}")
+    try:
+        return session.ocr_file(input_path, mode, output_dir, raw_output, formats)
+    finally:
+        session.close()
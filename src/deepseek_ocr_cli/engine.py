@@ -0,0 +1,364 @@
+import sys
+import copy
+import math
+import time
+import inspect
+import torch
+import transformers
+from PIL import Image, ImageOps
+from rich.console import Console
+from transformers.generation.candidate_generator import CandidateGenerator
+from .speculative import DraftLookup, DRAFT_TOKENS, MAX_NGRAM
+
+console = Console()
+
+# Constants from the upstream DeepSeek-OCR infer()
+IMAGE_TOKEN = "<image>"
+IMAGE_TOKEN_ID = 128815
+BOS_ID = 0
+PATCH_SIZE = 16
+DOWNSAMPLE_RATIO = 4
+STOP_STR = "<｜end▁of▁sentence｜>"
+
+def is_out_of_memory(error):
+    """
+    True for allocator failures on CPU, MPS or CUDA.
+    """
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error).lower()
+    return "out of memory" in message or "can't allocate memory" in message or "failed to allocate" in message
+
+def check_speculative_support(model):
+    """
+    Raise RuntimeError unless `model.generate` builds its candidate generator through
+    `_get_candidate_generator(generation_config, ...)`, the private transformers method
+    decode_shared replaces for a call (as in transformers 4.46).
+    """
+    hook = getattr(type(model), "_get_candidate_generator", None)
+    if hook is None or "generation_config" not in inspect.signature(hook).parameters:
+        raise RuntimeError(f"--speculative is not supported with transformers {transformers.__version__}: "
+                           "generate() has no _get_candidate_generator(generation_config, ...) to draft through")
+
+class DraftCandidates(CandidateGenerator):
+    """
+    Candidate generator for transformers' assisted generation that drafts from a
+    reference text (DraftLookup) instead of an assistant model. generate() verifies
+    each draft in one forward pass and keeps it up to the first token the model
+    disagrees with, so the output is the same as plain greedy decoding.
+    """
+
+    def __init__(self, lookup, max_length):
+        self.lookup = lookup
+        self.max_length = max_length
+        self.proposed = 0
+        self.accepted = 0
+        self.passes = 0
+        # Passes with nothing drafted decode one token, as plain decoding does: its speed baseline
+        self.plain_passes = 0
+        self.plain_seconds = 0.0
+        self.prompt_length = None
+        self.length = None
+        self._pass_start = None
+        self._drafted = False
+
+    @property
+    def generated(self):
+        return self.length - self.prompt_length if self.length is not None else 0
+
+    def get_candidates(self, input_ids):
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1]
+        self.passes += 1
+        # The model adds one token of its own after the draft
+        limit = min(DRAFT_TOKENS, self.max_length - input_ids.shape[1] - 1)
+        draft = self.lookup.propose(input_ids[0, -MAX_NGRAM:].tolist(), limit)
+        self._pass_start = time.perf_counter()
+        self._drafted = bool(draft)
+        if not draft:
+            return input_ids, None
+        self.proposed += len(draft)
+        draft_ids = torch.tensor([draft], dtype=input_ids.dtype, device=input_ids.device)
+        return torch.cat((input_ids, draft_ids), dim=1), None
+
+    def update_candidate_strategy(self, input_ids, scores, num_matches):
+        # The first pass also runs the rest of the prompt
+        if not self._drafted and self.passes > 1:
+            self.plain_passes += 1
+            self.plain_seconds += time.perf_counter() - self._pass_start
+        self.accepted += int(num_matches)
+        self.lookup.accept(int(num_matches))
+        self.length = input_ids.shape[1]
+
+class BatchedInferenceEngine:
+    """
+    Runs several pages through one batched `generate` call.
+    Mirrors the preprocessing of the upstream `model.infer` (global view + crop tiles,
+    image token layout) for each page, left-pads the prompts into one batch and splits
+    the generated ids back per page. Batch size backs off on out-of-memory errors.
+    """
+
+    def __init__(self, model, tokenizer, batch_size=4, max_new_tokens=8192):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.batch_size = max(1, batch_size)
+        self.max_new_tokens = max_new_tokens
+        self.remote = sys.modules.get(type(model).__module__)
+
+    @classmethod
+    def is_supported(cls, model):
+        """
+        The engine needs the preprocessing helpers from the model's remote code.
+        """
+        remote = sys.modules.get(type(model).__module__)
+        return remote is not None and all(
+            hasattr(remote, name) for name in ("dynamic_preprocess", "BasicImageTransform", "text_encode", "format_messages")
+        )
+
+    def _model_placement(self):
+        param = next(self.model.parameters())
+        return param.device, param.dtype
+
+    def prepare_views(self, image, base_size=1024, image_size=640, crop_mode=True):
+        """
+        Preprocess one image the way model.infer does: the global view (padded, or resized
+        for single-view inputs up to 640 px), the crop tiles and the image token ids
+        standing for them. Any prompt over the image can reuse it.
+        """
+        remote = self.remote
+        if not isinstance(image, Image.Image):
+            image = remote.load_image(str(image)) if hasattr(remote, "load_image") else Image.open(image)
+        image = image.convert("RGB")
+        image_transform = remote.BasicImageTransform(mean=(0.5, 0.5, 0.5), std=(0.5, 0.5, 0.5), normalize=True)
+
+        images_crop_raw = []
+        if crop_mode and (image.size[0] > 640 or image.size[1] > 640):
+            images_crop_raw, crop_ratio = remote.dynamic_preprocess(image)
+        else:
+            crop_ratio = [1, 1]
+
+        view_size = base_size if crop_mode else image_size
+        view_source = image
+        if not crop_mode and image_size <= 640:
+            # Upstream squashes small single-view inputs to the square instead of padding them
+            view_source = image.resize((image_size, image_size))
+        global_view = ImageOps.pad(view_source, (view_size, view_size),
+                                   color=tuple(int(x * 255) for x in image_transform.mean))
+
+        width_crop_num, height_crop_num = crop_ratio
+        crops = []
+        if width_crop_num > 1 or height_crop_num > 1:
+            crops = [image_transform(tile) for tile in images_crop_raw]
+
+        num_queries = math.ceil((image_size // PATCH_SIZE) / DOWNSAMPLE_RATIO)
+        num_queries_base = math.ceil((view_size // PATCH_SIZE) / DOWNSAMPLE_RATIO)
+        tokenized_image = ([IMAGE_TOKEN_ID] * num_queries_base + [IMAGE_TOKEN_ID]) * num_queries_base
+        tokenized_image += [IMAGE_TOKEN_ID]
+        if width_crop_num > 1 or height_crop_num > 1:
+            tokenized_image += ([IMAGE_TOKEN_ID] * (num_queries * width_crop_num) + [IMAGE_TOKEN_ID]) * (
+                num_queries * height_crop_num)
+
+        return {
+            "image": image,
+            "global_view": image_transform(global_view),
+            "crops": crops,
+            "spatial_crop": [width_crop_num, height_crop_num],
+            "image_ids": tokenized_image,
+        }
+
+    def prepare(self, image, prompt, base_size=1024, image_size=640, crop_mode=True, views=None):
+        """
+        Tokenize one (image, prompt) pair the way model.infer does.
+        `views` is the image's prepare_views output, when already computed.
+        Returns a dict of unbatched tensors.
+        """
+        remote = self.remote
+        views = views or self.prepare_views(image, base_size, image_size, crop_mode)
+
+        conversation = [
+            {"role": "<|User|>", "content": prompt, "images": [views["image"]]},
+            {"role": "<|Assistant|>", "content": ""},
+        ]
+        formatted = remote.format_messages(conversations=conversation, sft_format="plain", system_prompt="")
+        text_splits = formatted.split(IMAGE_TOKEN)
+
+        tokenized_str, images_seq_mask = [], []
+        images_list, images_crop_list, images_spatial_crop = [], [], []
+        for text_sep in text_splits[:-1]:
+            tokenized_sep = remote.text_encode(self.tokenizer, text_sep, bos=False, eos=False)
+            tokenized_str += tokenized_sep
+            images_seq_mask += [False] * len(tokenized_sep)
+
+            images_list.append(views["global_view"])
+            images_spatial_crop.append(views["spatial_crop"])
+            images_crop_list += views["crops"]
+            tokenized_str += views["image_ids"]
+            images_seq_mask += [True] * len(views["image_ids"])
+
+        tokenized_sep = remote.text_encode(self.tokenizer, text_splits[-1], bos=False, eos=False)
+        tokenized_str = [BOS_ID] + tokenized_str + tokenized_sep
+        images_seq_mask = [False] + images_seq_mask + [False] * len(tokenized_sep)
+
+        images_ori = torch.stack(images_list, dim=0)
+        if images_crop_list:
+            images_crop = torch.stack(images_crop_list, dim=0)
+        else:
+            images_crop = torch.zeros((1, 3, base_size, base_size))
+
+        return {
+            "input_ids": torch.LongTensor(tokenized_str),
+            "images_seq_mask": torch.tensor(images_seq_mask, dtype=torch.bool),
+            "images_ori": images_ori,
+            "images_crop": images_crop,
+            "images_spatial_crop": images_spatial_crop[0],
+        }
+
+    def collate(self, prepared):
+        """
+        Left-pad a list of prepared inputs into one batch.
+        """
+        device, dtype = self._model_placement()
+        pad_id = self.tokenizer.pad_token_id
+        if pad_id is None:
+            pad_id = self.tokenizer.eos_token_id
+        max_len = max(p["input_ids"].shape[0] for p in prepared)
+
+        input_ids = torch.full((len(prepared), max_len), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(prepared), max_len), dtype=torch.long)
+        images_seq_mask = torch.zeros((len(prepared), max_len), dtype=torch.bool)
+        for row, p in enumerate(prepared):
+            length = p["input_ids"].shape[0]
+            input_ids[row, max_len - length:] = p["input_ids"]
+            attention_mask[row, max_len - length:] = 1
+            images_seq_mask[row, max_len - length:] = p["images_seq_mask"]
+
+        return {
+            "input_ids": input_ids.to(device),
+            "attention_mask": attention_mask.to(device),
+            "images": [
+                (p["images_crop"].to(device=device, dtype=dtype), p["images_ori"].to(device=device, dtype=dtype))
+                for p in prepared
+            ],
+            "images_seq_mask": images_seq_mask.to(device),
+            "images_spatial_crop": torch.tensor([p["images_spatial_crop"] for p in prepared], dtype=torch.long),
+        }
+
+    def decode(self, output_ids, prompt_length):
+        """
+        Split batched output ids back into one cleaned string per page.
+        """
+        texts = []
+        for row in output_ids:
+            text = self.tokenizer.decode(row[prompt_length:])
+            if STOP_STR in text:
+                text = text[:text.index(STOP_STR)]
+            texts.append(text.strip())
+        return texts
+
+    def generate(self, prepared, **generate_kwargs):
+        """
+        One batched forward/generate pass. Returns one string per prepared input.
+        """
+        batch = self.collate(prepared)
+        pad_id = self.tokenizer.pad_token_id
+        if pad_id is None:
+            pad_id = self.tokenizer.eos_token_id
+        kwargs = dict(
+            temperature=0.0,
+            eos_token_id=self.tokenizer.eos_token_id,
+            pad_token_id=pad_id,
+            max_new_tokens=self.max_new_tokens,
+            no_repeat_ngram_size=35,
+            use_cache=True,
+        )
+        kwargs.update(generate_kwargs)
+        with torch.no_grad():
+            output_ids = self.model.generate(**batch, **kwargs)
+        return self.decode(output_ids, batch["input_ids"].shape[1])
+
+    def encode_shared(self, image, prompts, base_size=1024, image_size=640, crop_mode=True):
+        """
+        Run the vision encoder and the prompts' common prefix (up to where they diverge)
+        through the model once, for decoding each prompt with decode_shared.
+        Returns None when the common prefix does not cover the image.
+        """
+        views = self.prepare_views(image, base_size, image_size, crop_mode)
+        prepared = [self.prepare(image, prompt, base_size, image_size, crop_mode, views) for prompt in prompts]
+        ids = [p["input_ids"].tolist() for p in prepared]
+        length = 0
+        while length < min(map(len, ids)) - 1 and all(row[length] == ids[0][length] for row in ids):
+            length += 1
+        image_positions = prepared[0]["images_seq_mask"].nonzero()
+        if not len(image_positions) or length <= int(image_positions[-1]):
+            return None
+
+        from transformers import DynamicCache
+
+        prefix = dict(prepared[0], input_ids=prepared[0]["input_ids"][:length],
+                      images_seq_mask=prepared[0]["images_seq_mask"][:length])
+        batch = self.collate([prefix])
+        with torch.no_grad():
+            output = self.model(**batch, past_key_values=DynamicCache(), use_cache=True, return_dict=True)
+        return {"prepared": prepared, "cache": output.past_key_values, "length": length}
+
+    def decode_shared(self, shared, index, draft=None, stats=None, **generate_kwargs):
+        """
+        Decode prompt `index` of an encode_shared result from a copy of its prefix cache.
+        With a `draft` (reference text of the page) decoding is speculative: continuations
+        looked up in the draft are verified several tokens per forward pass (DraftCandidates),
+        with the totals added to `stats` (a DraftStats).
+        """
+        prepared = shared["prepared"][index]
+        # The cache already holds the image; all-zero images make the model skip its vision
+        # encoder, also in the multi-token forward passes that verify a draft
+        blank = dict(prepared, images_ori=torch.zeros_like(prepared["images_ori"]),
+                     images_crop=torch.zeros_like(prepared["images_crop"]))
+        cache = copy.deepcopy(shared["cache"])
+        if not draft:
+            return self.generate([blank], past_key_values=cache, **generate_kwargs)[0]
+
+        check_speculative_support(self.model)
+        lookup = DraftLookup(self.tokenizer.encode(draft, add_special_tokens=False))
+        candidates = None
+        def candidate_generator(generation_config, **kwargs):
+            nonlocal candidates
+            candidates = DraftCandidates(lookup, generation_config.max_length)
+            return candidates
+        # generate() builds its candidate generator through this method; shadow it for this call
+        self.model._get_candidate_generator = candidate_generator
+        start = time.perf_counter()
+        try:
+            text = self.generate([blank], past_key_values=cache, prompt_lookup_num_tokens=DRAFT_TOKENS,
+                                 **generate_kwargs)[0]
+        finally:
+            del self.model._get_candidate_generator
+        if candidates is None:
+            raise RuntimeError(f"--speculative is not supported with transformers {transformers.__version__}: "
+                               "generate() did not draft through _get_candidate_generator")
+        if stats is not None and candidates is not None:
+            stats.add(candidates.proposed, candidates.accepted, candidates.passes, candidates.generated,
+                      time.perf_counter() - start, candidates.plain_passes, candidates.plain_seconds)
+        return text
+
+    def infer(self, images, prompt, base_size=1024, image_size=640, crop_mode=True):
+        """
+        OCR a list of pages, `batch_size` at a time, halving the batch on out-of-memory.
+        Returns texts in input order.
+        """
+        prepared = [self.prepare(image, prompt, base_size, image_size, crop_mode) for image in images]
+        results = []
+        start = 0
+        while start < len(prepared):
+            chunk = prepared[start:start + self.batch_size]
+            try:
+                results += self.generate(chunk)
+            except (RuntimeError, MemoryError) as e:
+                if not is_out_of_memory(e) or self.batch_size == 1:
+                    raise
+                self.batch_size = max(1, self.batch_size // 2)
+                console.print(f"[yellow]Out of memory in batched inference, reducing batch size to {self.batch_size}.[/yellow]")
+                if torch.backends.mps.is_available():
+                    torch.mps.empty_cache()
+                continue
+            start += len(chunk)
+        return results
@@ -0,0 +1,209 @@
+import time
+from contextlib import contextmanager
+from PIL import Image
+
+# Upstream model.infer decodes up to this many tokens per page
+DEFAULT_MAX_TOKENS = 8192
+# Optional per-page budget (--token-budget): tokens per unit of ink (mean darkness of
+# the page). A dense single-column text page renders at ~8-10% ink and holds ~3500
+# characters, about 1500-2000 tokens of Markdown; 40000 per unit of ink gives such a
+# page 3200-4000 tokens, twice what it needs. The floor keeps pages with little ink
+# but much text (small print, thin fonts, large tables) from being cut off.
+TOKENS_PER_INK = 40000
+MIN_PAGE_TOKENS = 2048
+# Optional repetition guard (--repetition-guard): share of repeated n-grams among
+# the last REPEAT_WINDOW tokens, checked every REPEAT_CHECK_EVERY tokens. Off by
+# default: even 16-grams repeat in legitimate output such as empty table rows.
+# 16-grams keep sparse numeric tables near 0 while a decoding loop scores ~0.98,
+# so a threshold around 0.9 only catches loops.
+DEFAULT_REPETITION_GUARD = 0.0
+SUGGESTED_REPETITION_GUARD = 0.9
+REPEAT_NGRAM = 16
+REPEAT_WINDOW = 512
+REPEAT_CHECK_EVERY = 32
+
+def ink_ratio(image):
+    """
+    Mean darkness of a page (0 = blank white, 1 = solid black), from a small grayscale thumbnail.
+    """
+    import numpy as np
+
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return ink_ratio(opened)
+    gray = image.convert("L")
+    gray.thumbnail((256, 256))
+    return 1.0 - float(np.asarray(gray, dtype=np.float32).mean()) / 255.0
+
+def page_token_budget(image, max_tokens=DEFAULT_MAX_TOKENS):
+    """
+    Decode budget for a page, scaled to how much content it has.
+    """
+    try:
+        ink = ink_ratio(image)
+    except Exception:
+        return max_tokens
+    return max(min(MIN_PAGE_TOKENS, max_tokens), min(max_tokens, round(ink * TOKENS_PER_INK)))
+
+def repeated_fraction(tokens, n=REPEAT_NGRAM):
+    """
+    Share of the n-grams in `tokens` that already occurred earlier in it.
+    Close to 0 for normal text, close to 1 for a decoding loop.
+    """
+    grams = [tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+    if not grams:
+        return 0.0
+    return 1.0 - len(set(grams)) / len(grams)
+
+class _PageGuard:
+    """
+    Stopping criterion for one generate call: stops each row on its token budget,
+    a repetition loop or the page deadline, and records why.
+    """
+
+    def __init__(self, budget, repetition_guard, deadline, eos_ids, prompt_length=None):
+        self.budget = budget
+        self.repetition_guard = repetition_guard
+        self.deadline = deadline
+        self.eos_ids = eos_ids
+        self.prompt_length = prompt_length
+        self.reasons = []
+        self._finished = []
+        self._checked = 0
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        batch, length = input_ids.shape
+        if self.prompt_length is None:
+            # First call comes right after the first new token
+            self.prompt_length = length - 1
+        if not self.reasons:
+            self.reasons = [None] * batch
+            self._finished = [False] * batch
+        generated = length - self.prompt_length
+        timed_out = self.deadline is not None and time.perf_counter() > self.deadline
+        tails = None
+        # Speculative decoding adds several tokens per step, so no fixed multiple is hit reliably
+        if self.repetition_guard and generated >= REPEAT_WINDOW and generated - self._checked >= REPEAT_CHECK_EVERY:
+            self._checked = generated
+            tails = input_ids[:, -REPEAT_WINDOW:].tolist()
+        last = input_ids[:, -1].tolist()
+
+        done = [False] * batch
+        for row in range(batch):
+            if self._finished[row]:
+                # A stopped row stays stopped: speculative decoding also asks about drafts
+                # before the tokens it keeps
+                done[row] = self.reasons[row] is not None
+                continue
+            if last[row] in self.eos_ids:
+                # Finished normally; later steps only pad this row
+                self._finished[row] = True
+                continue
+            if timed_out:
+                reason = "timeout"
+            elif generated >= self.budget:
+                reason = "token budget"
+            elif tails is not None and repeated_fraction(tails[row]) >= self.repetition_guard:
+                reason = "repetition"
+            else:
+                continue
+            self.reasons[row] = reason
+            self._finished[row] = done[row] = True
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+class GenerationController:
+    """
+    Bounds decoding per page so a looping page cannot dominate the run: --max-tokens
+    (optionally a budget scaled to the page's content), an n-gram repetition guard and
+    a wall-clock timeout. Installed by wrapping `model.generate`, which model.infer calls.
+    """
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, token_budget=False, repetition_guard=DEFAULT_REPETITION_GUARD,
+                 page_timeout=None):
+        self.max_tokens = max_tokens
+        # Scale the budget to page content, or allow max_tokens on every page
+        self.token_budget = token_budget
+        # Repeated n-gram share that stops a page; 0 disables the guard
+        self.repetition_guard = repetition_guard
+        self.page_timeout = page_timeout
+        # Optional RunMetrics counting early stops
+        self.metrics = None
+        # Stop reason (or None) per row generated for the current page(s)
+        self.stops = []
+        self._budget = None
+        self._deadline = None
+
+    def options(self):
+        """
+        Constructor arguments, for rebuilding the controller in a worker process.
+        """
+        return {
+            "max_tokens": self.max_tokens,
+            "token_budget": self.token_budget,
+            "repetition_guard": self.repetition_guard,
+            "page_timeout": self.page_timeout,
+        }
+
+    def budget_for(self, image):
+        if not self.token_budget:
+            return self.max_tokens
+        return page_token_budget(image, self.max_tokens)
+
+    @contextmanager
+    def page(self, images):
+        """
+        Apply the limits to the generate calls made for `images` (one page or one batch).
+        A batch shares the largest budget of its pages.
+        """
+        self._budget = max(self.budget_for(image) for image in images)
+        self._deadline = time.perf_counter() + self.page_timeout if self.page_timeout else None
+        self.stops = []
+        try:
+            yield self
+        finally:
+            self._budget = None
+            self._deadline = None
+
+    @property
+    def cut_short(self):
+        """
+        Whether any page of the last `page()` block was stopped early.
+        """
+        return any(self.stops)
+
+    def install(self, model):
+        """
+        Wrap `model.generate` so the current page's limits apply to it.
+        """
+        if getattr(model, "_dsocr_generation", None) is not None:
+            return
+        model._dsocr_generation = self
+
+        generate = model.generate
+        def limited_generate(*args, **kwargs):
+            if self._budget is None:
+                return generate(*args, **kwargs)
+            from transformers import StoppingCriteriaList
+
+            eos = kwargs.get("eos_token_id")
+            if eos is None:
+                eos = getattr(getattr(model, "generation_config", None), "eos_token_id", None)
+            eos_ids = set(eos) if isinstance(eos, (list, tuple)) else {eos}
+            input_ids = kwargs.get("input_ids", args[0] if args else None)
+            prompt_length = input_ids.shape[-1] if hasattr(input_ids, "shape") else None
+            guard = _PageGuard(self._budget, self.repetition_guard, self._deadline, eos_ids, prompt_length)
+            criteria = StoppingCriteriaList(kwargs.get("stopping_criteria") or [])
+            criteria.append(guard)
+            kwargs["stopping_criteria"] = criteria
+            kwargs["max_new_tokens"] = min(kwargs.get("max_new_tokens") or self.max_tokens, self._budget)
+
+            output_ids = generate(*args, **kwargs)
+            self.stops.extend(guard.reasons)
+            if self.metrics is not None:
+                for reason in guard.reasons:
+                    if reason:
+                        self.metrics.add_stop(reason)
+            return output_ids
+        model.generate = limited_generate
@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import itertools
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rich.console import Console
+from . import __version__
+
+console = Console()
+
+DEFAULT_DOWNLOAD_WORKERS = 4
+DEFAULT_RETRIES = 3
+# (connect, read) timeouts in seconds; read is per chunk, not the whole body
+DEFAULT_TIMEOUT = (10, 60)
+CHUNK_SIZE = 1024 * 1024
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_CONTENT_TYPES = {
+    "application/pdf": ".pdf",
+    "application/x-pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp",
+    "image/x-ms-bmp": ".bmp",
+}
+
+def sniff_suffix(head, content_type=None):
+    """
+    File suffix for a download, from its first bytes or else its Content-Type header.
+    Returns None if neither identifies a supported format.
+    """
+    if head.startswith(b"%PDF-"):
+        return ".pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[:2] == b"BM" and len(head) > 26 and head[6:10] == b"\0\0\0\0":
+        return ".bmp"
+    # DOCX is a zip whose first entries are the Word package parts
+    if head.startswith(b"PK\x03\x04") and b"word/" in head:
+        return ".docx"
+    mime = (content_type or "").split(";")[0].strip().lower()
+    return _CONTENT_TYPES.get(mime)
+
+def _download_stem(url, response):
+    """
+    Base name for a download: Content-Disposition filename, else the last URL path segment.
+    """
+    disposition = response.headers.get("Content-Disposition", "")
+    match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", disposition, re.IGNORECASE)
+    name = unquote(match.group(1)) if match else unquote(Path(urlparse(url).path).name)
+    stem = re.sub(r"[^\w.-]+", "_", Path(name).stem).strip("._")
+    return stem or "download"
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def download_dir(output_root=None):
+    """
+    Where batch-mode URL downloads go: <output root>/downloads, or ./downloads.
+    """
+    return Path(output_root) / "downloads" if output_root else Path("downloads")
+
+def read_url_list(url_list):
+    """
+    URLs from a text file with one per line, or '-' for stdin. Blank lines and # comments are skipped.
+    """
+    if url_list == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = Path(url_list).read_text(encoding='utf-8').splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+class URLIngester:
+    """
+    Downloads URLs concurrently over one pooled HTTP session, with retries and timeouts.
+    Bodies are streamed to disk in large chunks and checksummed; the file type is
+    sniffed from the content (then the Content-Type header), not guessed from the URL.
+    """
+
+    def __init__(self, target_dir, workers=DEFAULT_DOWNLOAD_WORKERS, retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT):
+        self.target_dir = Path(target_dir)
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.timeout = timeout
+        # Optional RunMetrics timing each download
+        self.metrics = None
+        self._session = None
+        self._lock = threading.Lock()
+        # Target files handed out in this run, so two URLs never share one
+        self._claimed = set()
+
+    def _get_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        with self._lock:
+            if self._session is None:
+                # Connection errors and retryable statuses are retried by urllib3 with backoff
+                retry = Retry(total=self.retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                              allowed_methods=frozenset({"GET"}), raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = f"dsocr/{__version__}"
+                self._session = session
+            return self._session
+
+    def fetch(self, url):
+        """
+        Download one URL into target_dir. Returns the file path; raises on failure.
+        """
+        import requests
+
+        session = self._get_session()
+        for attempt in range(self.retries + 1):
+            try:
+                if self.metrics is None:
+                    return self._fetch_once(session, url)
+                with self.metrics.timed("download"):
+                    return self._fetch_once(session, url)
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
+                # Dropped mid-body: urllib3 only retries until the response starts
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _fetch_once(self, session, url):
+        self.target_dir.mkdir(parents=True, exist_ok=True)
+        part_file = self.target_dir / f".download-{os.getpid()}-{threading.get_ident()}.part"
+        digest = hashlib.sha256()
+        try:
+            with session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                head = next(chunks, b"")
+                suffix = sniff_suffix(head, response.headers.get("Content-Type"))
+                if suffix is None:
+                    content_type = response.headers.get("Content-Type", "unknown")
+                    raise ValueError(f"unsupported content type ({content_type})")
+                stem = _download_stem(url, response)
+                with open(part_file, "wb") as f:
+                    for chunk in itertools.chain([head], chunks):
+                        digest.update(chunk)
+                        f.write(chunk)
+            return self._publish(part_file, stem, suffix, digest.hexdigest())
+        finally:
+            part_file.unlink(missing_ok=True)
+
+    def _publish(self, part_file, stem, suffix, sha256):
+        with self._lock:
+            target = self.target_dir / f"{stem}{suffix}"
+            n = 2
+            while target in self._claimed:
+                target = self.target_dir / f"{stem}-{n}{suffix}"
+                n += 1
+            self._claimed.add(target)
+        if target.exists() and _sha256(target) == sha256:
+            # Unchanged since an earlier run: keep the file (and its mtime) so that run's checkpoint still applies
+            return target
+        os.replace(part_file, target)
+        return target
+
+    def download(self, urls):
+        """
+        Download `urls` concurrently. Yields (index, url, path, error) as each one finishes.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dsocr-download")
+        try:
+            futures = {executor.submit(self.fetch, url): (i, url) for i, url in enumerate(urls)}
+            for future in as_completed(futures):
+                i, url = futures[future]
+                try:
+                    yield i, url, future.result(), None
+                except Exception as e:
+                    yield i, url, None, str(e)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,146 @@
+import os
+import json
+import shutil
+from pathlib import Path
+from rich.console import Console
+
+console = Console()
+
+MANIFEST_VERSION = 1
+
+def atomic_write_text(path, text):
+    """
+    Write `text` to `path` via a temp file + rename, so readers never see a partial file.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def job_dir_for(output_dir, input_path):
+    return Path(output_dir) / f".{Path(input_path).stem}.dsocr"
+
+class JobManifest:
+    """
+    Checkpoint of one document's OCR job, kept in `<output dir>/.<stem>.dsocr/`.
+    manifest.json records the input, the settings and which pages are done; each
+    finished page's text is stored in pages/<n>.md. Every file is written atomically,
+    so after a crash the manifest only lists pages whose text is safely on disk.
+    """
+
+    def __init__(self, job_dir, settings, completed=()):
+        self.job_dir = Path(job_dir)
+        self.settings = settings
+        self.completed = set(completed)
+
+    @classmethod
+    def open(cls, output_dir, input_path, mode, raw_output=False, resume=True, hybrid=False, resolution=None,
+             layout=False):
+        """
+        Load the checkpoint of an interrupted run of the same input and settings,
+        or start a new one (discarding any stale checkpoint). `hybrid`, `resolution`
+        and `layout` change what a page's text is, so they are part of the settings.
+        """
+        input_path = Path(input_path).absolute()
+        stat = input_path.stat()
+        settings = {
+            "input": str(input_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "mode": mode,
+            "raw_output": raw_output,
+            "hybrid": hybrid,
+            "resolution": resolution,
+            "layout": layout,
+        }
+        job_dir = job_dir_for(output_dir, input_path)
+        manifest_file = job_dir / "manifest.json"
+        if resume and manifest_file.exists():
+            try:
+                data = json.loads(manifest_file.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("version") == MANIFEST_VERSION and data.get("settings") == settings:
+                manifest = cls(job_dir, settings)
+                # Trust only pages whose stored result is actually there
+                manifest.completed = {i for i in data.get("completed", []) if manifest._page_file(i).exists()}
+                return manifest
+            console.print(f"[dim]Discarding checkpoint of {input_path.name}: input or settings changed.[/dim]")
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return cls(job_dir, settings)
+
+    def _page_file(self, idx):
+        return self.job_dir / "pages" / f"{idx + 1:05d}.md"
+
+    def _save(self):
+        data = {"version": MANIFEST_VERSION, "settings": self.settings, "completed": sorted(self.completed)}
+        atomic_write_text(self.job_dir / "manifest.json", json.dumps(data, indent=1))
+
+    def read_page(self, idx):
+        return self._page_file(idx).read_text(encoding="utf-8")
+
+    def record(self, idx, text):
+        """
+        Store a finished page, then mark it complete.
+        """
+        self._page_file(idx).parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self._page_file(idx), text)
+        self.completed.add(idx)
+        self._save()
+
+    def finish(self):
+        """
+        The document's `.md` is complete: the checkpoint is no longer needed.
+        """
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+
+class CheckpointedWriter:
+    """
+    Feeds a document's pages to a PageWriter in page order: each new page is
+    checkpointed in the manifest first, and pages completed by an earlier run are
+    filled in from the manifest instead of being OCRed again.
+    """
+
+    def __init__(self, writer, manifest):
+        self.writer = writer
+        self.manifest = manifest
+        self._resumed = sorted(manifest.completed)
+
+    @property
+    def pages_written(self):
+        return self.writer.pages_written
+
+    @property
+    def result_file(self):
+        return self.writer.result_file
+
+    def _write_resumed(self, before=None):
+        while self._resumed and (before is None or self._resumed[0] < before):
+            idx = self._resumed.pop(0)
+            self.writer.write_page(idx, self.manifest.read_page(idx))
+
+    def write_page(self, idx, text, record=None):
+        self.manifest.record(idx, text)
+        self._write_resumed(before=idx)
+        self.writer.write_page(idx, text, record)
+
+    def close(self):
+        self._write_resumed()
+        result_file = self.writer.close()
+        self.manifest.finish()
+        return result_file
+
+    def abort(self):
+        self.writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,164 @@
+import json
+import hashlib
+from pathlib import Path
+from .jobs import atomic_write_text
+from .blank import INK_CONTRAST
+
+LAYOUT_VERSION = 1
+# Grounding boxes are on a 0-999 grid over the page
+GRID = 999
+# Pages are compared at this width (px), enough to resolve body-text glyphs
+HASH_WIDTH = 1000
+# Margin (grid units) around a block, for crops and for masking it out of the page
+REGION_PADDING = 6
+# Cropped blocks with these labels are OCRed with the chart prompt, others with standard
+FIGURE_LABELS = {"image", "figure", "chart"}
+# Above this share of changed blocks the whole page is OCRed again
+MAX_CHANGED_SHARE = 0.5
+
+def layout_path(output_dir, input_path):
+    return Path(output_dir) / f"{Path(input_path).stem}.layout.json"
+
+def region_mode(label):
+    """
+    OCR mode for a cropped block.
+    """
+    return "chart" if label.lower() in FIGURE_LABELS else "standard"
+
+def page_text(blocks):
+    return "\n\n".join(block["text"] for block in blocks if block["text"])
+
+def same_text(a, b):
+    return a.split() == b.split()
+
+def pixel_box(box, size, padding=0):
+    """
+    A 0-999 grid box as a pixel box (left, top, right, bottom) on an image of `size`.
+    """
+    width, height = size
+    x1, y1, x2, y2 = box
+    return (max(0, round((x1 - padding) * width / GRID)), max(0, round((y1 - padding) * height / GRID)),
+            min(width, round((x2 + padding) * width / GRID)), min(height, round((y2 + padding) * height / GRID)))
+
+def crop_block(image, box):
+    """
+    The part of a page image covered by a block, with a small margin.
+    """
+    return image.crop(pixel_box(box, image.size, REGION_PADDING))
+
+def layout_blocks(grounding):
+    """
+    Blocks (label, box, text) from parse_grounding output; a block with several
+    boxes gets their union.
+    """
+    blocks = []
+    for region in grounding:
+        boxes = [box for box in region["boxes"] if len(box) == 4]
+        if not boxes:
+            continue
+        box = [min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes)]
+        blocks.append({"label": region["label"], "box": box, "text": region["text"]})
+    return blocks
+
+class PageFingerprint:
+    """
+    A page's ink mask at HASH_WIDTH, for content hashes of the whole page, of single
+    blocks and of everything outside the blocks. Hashes are exact: any change in the
+    ink, or a page rendered at another size, means the content is OCRed again.
+    """
+
+    def __init__(self, image):
+        import numpy as np
+        from PIL import Image
+
+        width, height = image.size
+        gray = image.convert("L").resize((HASH_WIDTH, max(1, round(height * HASH_WIDTH / width))),
+                                         Image.Resampling.BOX)
+        pixels = np.asarray(gray)
+        self.ink = pixels < float(np.median(pixels)) - INK_CONTRAST
+        self.size = list(gray.size)
+
+    def _digest(self, ink):
+        import numpy as np
+
+        digest = hashlib.sha1(f"{ink.shape}".encode())
+        digest.update(np.packbits(ink).tobytes())
+        return digest.hexdigest()[:16]
+
+    def digest(self, box=None):
+        if box is None:
+            return self._digest(self.ink)
+        # Padded like the crop and the outside mask, so no ink falls between them
+        left, top, right, bottom = pixel_box(box, self.size, REGION_PADDING)
+        return self._digest(self.ink[top:bottom, left:right])
+
+    def outside_digest(self, boxes):
+        ink = self.ink.copy()
+        for box in boxes:
+            left, top, right, bottom = pixel_box(box, self.size, REGION_PADDING)
+            ink[top:bottom, left:right] = False
+        return self._digest(ink)
+
+class DocumentLayout:
+    """
+    Layout index of one document, kept in `<output dir>/<stem>.layout.json`: per page
+    its text, grounding blocks (label, 0-999 box, content hash, text) and a hash of
+    the ink outside the blocks. A later run of a revised document compares each page
+    with it: unchanged pages reuse their text, and when only some blocks changed just
+    those are cropped and OCRed again.
+    """
+
+    def __init__(self, output_dir, input_path, mode):
+        self.path = layout_path(output_dir, input_path)
+        self.mode = mode
+        self.pages = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == LAYOUT_VERSION:
+                self.pages = data["pages"]
+        except (OSError, ValueError, KeyError):
+            pass
+        # The previous run's pages, to compare against while self.pages is updated
+        self.previous = {page: entry for page, entry in self.pages.items() if entry.get("mode") == mode}
+        self._by_hash = {entry["page_hash"]: entry for entry in self.previous.values()}
+
+    def plan(self, page, fingerprint):
+        """
+        Compare page number `page` with the previous run. Returns (entry, changed):
+        the previous entry that still applies (None: OCR the whole page) and the
+        indexes of its blocks whose content changed.
+        """
+        page_hash = fingerprint.digest()
+        # Same page number first, then a page that moved within the document
+        for entry in (self.previous.get(str(page)), self._by_hash.get(page_hash)):
+            if entry is None or entry["size"] != fingerprint.size:
+                continue
+            if entry["page_hash"] == page_hash:
+                return entry, []
+            blocks = entry["blocks"]
+            if not blocks or fingerprint.outside_digest([b["box"] for b in blocks]) != entry["outside_hash"]:
+                continue
+            changed = [i for i, block in enumerate(blocks) if fingerprint.digest(block["box"]) != block["hash"]]
+            if len(changed) <= MAX_CHANGED_SHARE * len(blocks):
+                return entry, changed
+        return None, None
+
+    def record(self, page, fingerprint, text, blocks):
+        """
+        Store a finished page. Blocks are kept only if they account for all of its text,
+        so reassembling them can never drop content.
+        """
+        if not same_text(page_text(blocks), text):
+            blocks = []
+        self.pages[str(page)] = {
+            "mode": self.mode,
+            "size": fingerprint.size,
+            "page_hash": fingerprint.digest(),
+            "outside_hash": fingerprint.outside_digest([block["box"] for block in blocks]),
+            "text": text,
+            "blocks": [dict(block, hash=fingerprint.digest(block["box"])) for block in blocks],
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps({"version": LAYOUT_VERSION, "pages": self.pages}, ensure_ascii=False))
@@ -0,0 +1,255 @@
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from rich.console import Console
+
+console = Console()
+
+# Report order of the stages a page goes through
+STAGES = [
+    "model load",
+    "download",
+    "docx conversion",
+    "pdf render",
+    "image decode",
+    "blank check",
+    "layout check",
+    "resolution check",
+    "inference",
+    "region ocr",
+    # Parts of inference, measured inside model.infer
+    "image encode",
+    "tokenizer",
+    "vision encoder",
+    "generation",
+    "clean output",
+    "write",
+]
+
+# Remote-code helpers timed as part of a stage
+_REMOTE_FUNCTIONS = {
+    "load_image": "image encode",
+    "dynamic_preprocess": "image encode",
+    "format_messages": "tokenizer",
+    "text_encode": "tokenizer",
+}
+_VISION_MODULES = ("sam_model", "vision_model", "projector")
+
+def peak_rss_bytes():
+    """
+    High-water mark of this process's resident memory, or None where unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class StageStats:
+    """
+    Thread-safe busy-time accounting per pipeline stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.busy = {}
+        self.counts = {}
+
+    def add(self, stage, seconds, count=1):
+        with self._lock:
+            self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + count
+
+    @contextmanager
+    def timed(self, stage, count=1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, count)
+
+class RunMetrics(StageStats):
+    """
+    Stage timings, generated tokens and per-page records of an OCRSession,
+    exportable as a JSON report.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started_at = time.perf_counter()
+        self.tokens = 0
+        self.generation_time = 0.0
+        # Pages whose decoding was stopped early, by reason
+        self.stops = {}
+        self.pages = []
+
+    def reset(self):
+        """
+        Start a new report in place (the instrumented model and controller keep this object).
+        """
+        with self._lock:
+            self.busy.clear()
+            self.counts.clear()
+            self.started_at = time.perf_counter()
+            self.tokens = 0
+            self.generation_time = 0.0
+            self.stops.clear()
+            self.pages.clear()
+
+    def add_tokens(self, tokens, seconds):
+        with self._lock:
+            self.tokens += tokens
+            self.generation_time += seconds
+
+    def add_stop(self, reason):
+        with self._lock:
+            self.stops[reason] = self.stops.get(reason, 0) + 1
+
+    def add_page(self, document, page, seconds, tokens=None, mode="ocr", stop=None, resolution=None,
+                 vision_tokens_saved=None):
+        peak = peak_rss_bytes()
+        record = {
+            "document": document,
+            "page": page,
+            "mode": mode,
+            "seconds": round(seconds, 4),
+            "tokens": tokens,
+            "tokens_per_sec": round(tokens / seconds, 2) if tokens and seconds > 0 else None,
+            "peak_rss_mb": round(peak / 2**20, 1) if peak else None,
+            "stopped_early": stop,
+            "resolution": resolution,
+            "vision_tokens_saved": vision_tokens_saved,
+        }
+        with self._lock:
+            self.pages.append(record)
+
+    def timed_pages(self, pages, stage="pdf render"):
+        """
+        Wrap a page iterator so the time spent producing each page is recorded.
+        """
+        pages = iter(pages)
+        try:
+            while True:
+                start = time.perf_counter()
+                item = next(pages, None)
+                elapsed = time.perf_counter() - start
+                if item is None:
+                    self.add(stage, elapsed, count=0)
+                    return
+                self.add(stage, elapsed)
+                yield item
+        finally:
+            # Close the wrapped generator (e.g. the open PDF) on the consuming thread
+            if hasattr(pages, "close"):
+                pages.close()
+
+    def to_dict(self):
+        with self._lock:
+            names = [s for s in STAGES if s in self.busy] + sorted(s for s in self.busy if s not in STAGES)
+            stages = {s: {"seconds": round(self.busy[s], 4), "count": self.counts[s]} for s in names}
+            peak = peak_rss_bytes()
+            return {
+                "wall_time": round(time.perf_counter() - self.started_at, 4),
+                "pages": len(self.pages),
+                "stages": stages,
+                "generated_tokens": self.tokens,
+                "tokens_per_sec": round(self.tokens / self.generation_time, 2) if self.generation_time > 0 else None,
+                "early_stops": dict(self.stops),
+                "peak_rss_mb": round(peak / 2**20, 1) if peak else None,
+                "per_page": list(self.pages),
+            }
+
+    def write_json(self, path, **extra):
+        """
+        Write the report (plus `extra` top-level fields) to `path`.
+        """
+        report = dict(extra)
+        report.update(self.to_dict())
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return path
+
+    def summary(self):
+        """
+        One-line stage breakdown for the end-of-run summary.
+        """
+        report = self.to_dict()
+        parts = [f"{name} {stage['seconds']:.1f}s" for name, stage in report["stages"].items()]
+        line = "Stages: " + ", ".join(parts)
+        if report["tokens_per_sec"]:
+            line += f" | {report['generated_tokens']} tokens, {report['tokens_per_sec']:.1f} tok/s"
+        if report["early_stops"]:
+            stops = ", ".join(f"{count} {reason}" for reason, count in sorted(report["early_stops"].items()))
+            line += f" | stopped early: {stops}"
+        if report["peak_rss_mb"]:
+            line += f" | peak RSS {report['peak_rss_mb']:.0f} MB"
+        return line
+
+def _timed_function(function, metrics, stage):
+    def wrapper(*args, **kwargs):
+        with metrics.timed(stage, count=0):
+            return function(*args, **kwargs)
+    wrapper._dsocr_timed = True
+    return wrapper
+
+def _count_new_tokens(output_ids, input_ids, pad_token_id):
+    if not hasattr(output_ids, "shape") or input_ids is None:
+        return 0
+    new = output_ids[:, input_ids.shape[-1]:]
+    if pad_token_id is not None and new.shape[0] > 1:
+        # Finished rows of a batch are padded up to the longest one
+        return int((new != pad_token_id).sum())
+    return int(new.numel())
+
+def instrument_model(model, metrics):
+    """
+    Time the stages inside model.infer (image preprocessing, tokenization, vision
+    encoder, generation) and count generated tokens, by wrapping the remote code's
+    helpers, hooking the vision modules and wrapping `model.generate`.
+    """
+    if getattr(model, "_dsocr_metrics", None) is not None:
+        return
+    model._dsocr_metrics = metrics
+
+    remote = sys.modules.get(type(model).__module__)
+    if remote is not None:
+        for name, stage in _REMOTE_FUNCTIONS.items():
+            function = getattr(remote, name, None)
+            if function is not None and not getattr(function, "_dsocr_timed", False):
+                setattr(remote, name, _timed_function(function, metrics, stage))
+        transform = getattr(remote, "BasicImageTransform", None)
+        if transform is not None and not getattr(transform.__call__, "_dsocr_timed", False):
+            transform.__call__ = _timed_function(transform.__call__, metrics, "image encode")
+
+    starts = {}
+    def _pre_hook(module, args):
+        starts[id(module)] = time.perf_counter()
+    def _post_hook(module, args, output):
+        start = starts.pop(id(module), None)
+        if start is not None:
+            metrics.add("vision encoder", time.perf_counter() - start, count=0)
+    for name, module in model.named_modules():
+        if name.split(".")[-1] in _VISION_MODULES:
+            module.register_forward_pre_hook(_pre_hook)
+            module.register_forward_hook(_post_hook)
+
+    generate = model.generate
+    def timed_generate(*args, **kwargs):
+        vision_before = metrics.busy.get("vision encoder", 0.0)
+        start = time.perf_counter()
+        output_ids = generate(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        # The vision encoder runs inside the first forward pass of generate
+        decode_time = elapsed - (metrics.busy.get("vision encoder", 0.0) - vision_before)
+        metrics.add("generation", decode_time)
+        input_ids = kwargs.get("input_ids", args[0] if args else None)
+        tokens = _count_new_tokens(output_ids, input_ids, kwargs.get("pad_token_id"))
+        metrics.add_tokens(tokens, decode_time)
+        return output_ids
+    model.generate = timed_generate
@@ -0,0 +1,278 @@
+import sys
+import json
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+import importlib.util
+from pathlib import Path
+from rich.console import Console
+from .converters import docx_to_pdf, find_soffice
+
+console = Console()
+
+DEFAULT_OFFICE_WORKERS = 1
+# Seconds to wait for a LibreOffice instance to start, and for one document to convert
+START_TIMEOUT = 90
+CONVERT_TIMEOUT = 300
+WORKER_SCRIPT = Path(__file__).with_name("office_worker.py")
+
+def find_uno_python(soffice):
+    """
+    A Python interpreter that can `import uno`: this one, LibreOffice's bundled
+    interpreter, or the system python3 (distro python3-uno). None if there is none.
+    """
+    if importlib.util.find_spec("uno") is not None:
+        return sys.executable
+    program = Path(soffice).resolve().parent
+    candidates = [
+        program / "python",
+        program / "python.exe",
+        # macOS: Contents/MacOS/soffice, Contents/Resources/python
+        program.parent / "Resources" / "python",
+        shutil.which("python3"),
+    ]
+    for candidate in candidates:
+        if candidate is None or not Path(candidate).exists():
+            continue
+        try:
+            probe = subprocess.run([str(candidate), "-c", "import uno"], stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL, timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        if probe.returncode == 0:
+            return str(candidate)
+    return None
+
+class _ConversionError(RuntimeError):
+    """
+    LibreOffice rejected a document; the instance itself is still usable.
+    """
+
+class _OfficeProcess:
+    """
+    One warm headless LibreOffice instance with a private profile, driven over UNO
+    by office_worker.py running under `python`.
+    """
+
+    def __init__(self, python, soffice):
+        self.profile = tempfile.mkdtemp(prefix="dsocr-office-")
+        self.process = subprocess.Popen(
+            [python, str(WORKER_SCRIPT), soffice, self.profile],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8",
+        )
+        # Replies are read on a thread so every wait can time out
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read, name="dsocr-office-reader", daemon=True).start()
+        try:
+            self._reply(START_TIMEOUT)
+        except Exception:
+            self.close()
+            raise
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._replies.put(line)
+        self._replies.put(None)
+
+    def _reply(self, timeout):
+        while True:
+            try:
+                line = self._replies.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"LibreOffice did not answer within {timeout}s") from None
+            if line is None:
+                raise RuntimeError("LibreOffice worker exited")
+            try:
+                return json.loads(line)
+            except ValueError:
+                # Stray output from the interpreter or soffice
+                continue
+
+    def convert(self, input_path, output_path, timeout=CONVERT_TIMEOUT):
+        request = {"input": str(input_path), "output": str(output_path)}
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        reply = self._reply(timeout)
+        if not reply.get("ok"):
+            raise _ConversionError(reply.get("error") or "conversion failed")
+
+    def close(self):
+        try:
+            # End of input makes the worker terminate its soffice and exit
+            self.process.stdin.close()
+            self.process.wait(timeout=15)
+        except Exception:
+            self.process.kill()
+        shutil.rmtree(self.profile, ignore_errors=True)
+
+class OfficePool:
+    """
+    Warm headless LibreOffice instances, started on first use (or by `warm`) and kept
+    for the life of the session, so each DOCX costs a document load instead of a
+    LibreOffice start. Up to `instances` documents convert in parallel.
+    """
+
+    def __init__(self, instances=DEFAULT_OFFICE_WORKERS, timeout=CONVERT_TIMEOUT):
+        self.instances = max(1, instances)
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._processes = []
+        self._started = 0
+        self._lock = threading.Lock()
+        # (python, soffice) once found; False when LibreOffice or its UNO bridge is missing
+        self._runtime = None
+
+    def available(self):
+        with self._lock:
+            if self._runtime is None:
+                soffice = find_soffice()
+                python = find_uno_python(soffice) if soffice else None
+                if soffice and not python:
+                    console.print("[dim]LibreOffice's Python UNO bridge not found; no warm LibreOffice instances.[/dim]")
+                self._runtime = (python, soffice) if python else False
+            return bool(self._runtime)
+
+    def _reserve(self):
+        with self._lock:
+            if self._runtime and self._started < self.instances:
+                self._started += 1
+                return True
+            return False
+
+    def _spawn(self):
+        try:
+            process = _OfficeProcess(*self._runtime)
+        except Exception as e:
+            with self._lock:
+                self._started -= 1
+                # A broken install would fail the same way for every document
+                self._runtime = False
+            console.print(f"[yellow]Could not start LibreOffice: {e}. Converting without a warm instance.[/yellow]")
+            raise
+        with self._lock:
+            self._processes.append(process)
+        return process
+
+    def _discard(self, process):
+        with self._lock:
+            self._processes.remove(process)
+            self._started -= 1
+        process.close()
+
+    def _checkout(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._reserve():
+                return self._spawn()
+            if not self._runtime:
+                raise RuntimeError("LibreOffice is not available")
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def warm(self, count=None):
+        """
+        Start up to `count` instances (default: all) in the background, ahead of the first document.
+        """
+        if not self.available():
+            return
+        def start():
+            try:
+                self._idle.put(self._spawn())
+            except Exception:
+                pass
+        for _ in range(min(count or self.instances, self.instances)):
+            if not self._reserve():
+                break
+            threading.Thread(target=start, name="dsocr-office-start", daemon=True).start()
+
+    def convert(self, input_path, output_path):
+        """
+        Convert one document to PDF at `output_path` on an idle instance.
+        """
+        process = self._checkout()
+        try:
+            process.convert(input_path, output_path, self.timeout)
+        except _ConversionError:
+            self._idle.put(process)
+            raise
+        except Exception:
+            # Crashed or hung: replace it on the next checkout
+            self._discard(process)
+            raise
+        self._idle.put(process)
+
+    def close(self):
+        with self._lock:
+            processes, self._processes = self._processes, []
+            self._started = 0
+        for process in processes:
+            process.close()
+
+class DocxConverter:
+    """
+    Converts DOCX to PDF inside a private temp directory, never next to the input,
+    so concurrent runs on the same document cannot collide. Uses the warm OfficePool
+    when LibreOffice is usable and the one-shot strategies of docx_to_pdf otherwise.
+    """
+
+    def __init__(self, office_workers=DEFAULT_OFFICE_WORKERS):
+        # office_workers=0 skips the warm pool
+        self.pool = OfficePool(office_workers) if office_workers > 0 else None
+        self._workdir = None
+        self._lock = threading.Lock()
+
+    def _job_dir(self):
+        with self._lock:
+            if self._workdir is None:
+                self._workdir = Path(tempfile.mkdtemp(prefix="dsocr-docx-"))
+        # One directory per conversion: same-named documents from different folders coexist
+        return Path(tempfile.mkdtemp(dir=self._workdir))
+
+    def warm(self, count=None):
+        if self.pool is not None:
+            self.pool.warm(count)
+
+    def convert(self, input_path):
+        """
+        Convert `input_path` and return the PDF path. Pass it to `release` once its pages are rendered.
+        """
+        input_path = Path(input_path).absolute()
+        job_dir = self._job_dir()
+        output_path = job_dir / f"{input_path.stem}.pdf"
+        if self.pool is not None and self.pool.available():
+            try:
+                console.print("[dim]Converting DOCX to PDF using a warm LibreOffice instance...[/dim]")
+                self.pool.convert(input_path, output_path)
+                if output_path.exists():
+                    return output_path
+            except Exception as e:
+                console.print(f"[yellow]Warm LibreOffice conversion failed: {e}. Trying fallback...[/yellow]")
+        try:
+            return docx_to_pdf(input_path, job_dir)
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+    def release(self, pdf_path):
+        """
+        Delete a PDF made by `convert`; anything else is left alone.
+        """
+        pdf_path = Path(pdf_path)
+        if self._workdir is not None and pdf_path.parent.parent == self._workdir:
+            shutil.rmtree(pdf_path.parent, ignore_errors=True)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+        with self._lock:
+            if self._workdir is not None:
+                shutil.rmtree(self._workdir, ignore_errors=True)
+                self._workdir = None
@@ -0,0 +1,98 @@
+"""
+Conversion worker for OfficePool. Runs under a Python that has LibreOffice's
+`uno` module (often LibreOffice's bundled interpreter, not dsocr's), so it only
+uses the standard library and uno.
+
+Usage: python office_worker.py <soffice> <profile dir>
+
+Starts one headless soffice listening on a local socket with its own profile,
+prints {"ready": true}, then reads one JSON request per stdin line
+({"input": path, "output": path}) and answers each with {"ok": true} or
+{"ok": false, "error": "..."} on stdout.
+"""
+import sys
+import json
+import time
+import socket
+import subprocess
+from pathlib import Path
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+START_TIMEOUT = 60
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _props(**values):
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+def start_office(soffice, profile):
+    port = _free_port()
+    process = subprocess.Popen([
+        soffice,
+        "--headless", "--invisible", "--nologo", "--norestore", "--nodefault", "--nolockcheck",
+        f"-env:UserInstallation={Path(profile).as_uri()}",
+        f"--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext",
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        try:
+            context = resolver.resolve(f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext")
+            break
+        except NoConnectException:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("LibreOffice did not start")
+            time.sleep(0.2)
+    desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+    return process, desktop
+
+def convert(desktop, input_path, output_path):
+    document = desktop.loadComponentFromURL(uno.systemPathToFileUrl(input_path), "_blank", 0,
+                                            _props(Hidden=True, ReadOnly=True))
+    if document is None:
+        raise RuntimeError("LibreOffice could not open the document")
+    try:
+        document.storeToURL(uno.systemPathToFileUrl(output_path), _props(FilterName="writer_pdf_Export"))
+    finally:
+        document.close(True)
+
+def main():
+    soffice, profile = sys.argv[1:3]
+    process, desktop = start_office(soffice, profile)
+    print(json.dumps({"ready": True}), flush=True)
+    try:
+        for line in sys.stdin:
+            request = json.loads(line)
+            try:
+                convert(desktop, request["input"], request["output"])
+                reply = {"ok": True}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            print(json.dumps(reply), flush=True)
+    finally:
+        try:
+            desktop.terminate()
+        except Exception:
+            pass
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import sys
+import glob
+import time
+import queue
+import threading
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from rich.progress import Progress, TextColumn
+from .converters import iter_pages, page_stage, SUPPORTED_SUFFIXES
+from .core import get_prompt, default_output_dir, as_modes, mode_output_dir
+from .writers import open_writer, DEFAULT_FORMATS
+from .jobs import CheckpointedWriter
+from .metrics import StageStats
+from .ingest import URLIngester, DEFAULT_DOWNLOAD_WORKERS, download_dir
+
+console = Console()
+
+# Markers a render worker puts on the page queue besides actual pages
+_DOC_END = "end"
+_DOC_ERROR = "error"
+_WORKER_DONE = None
+
+def _is_page(item):
+    return item is not _WORKER_DONE and not isinstance(item[1], str)
+
+def collect_inputs(paths, file_list=None):
+    """
+    Expand files, directories (recursively) and glob patterns into a sorted,
+    de-duplicated list of supported input files.
+    `file_list` is a text file with one path per line, or '-' for stdin.
+    """
+    candidates = list(paths or [])
+    if file_list:
+        if file_list == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            lines = Path(file_list).read_text(encoding='utf-8').splitlines()
+        candidates += [line.strip() for line in lines if line.strip() and not line.startswith('#')]
+
+    found = []
+    for candidate in candidates:
+        if glob.has_magic(candidate):
+            matches = [Path(p) for p in sorted(glob.glob(candidate, recursive=True))]
+        else:
+            matches = [Path(candidate)]
+        for path in matches:
+            if path.is_dir():
+                found += sorted(p for p in path.rglob('*') if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES)
+            elif path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+                found.append(path)
+            elif path.exists():
+                console.print(f"[yellow]Skipping unsupported file: {path}[/yellow]")
+            else:
+                console.print(f"[yellow]Skipping missing path: {path}[/yellow]")
+
+    # De-duplicate while keeping order
+    seen = set()
+    inputs = []
+    for path in found:
+        key = path.resolve()
+        if key not in seen:
+            seen.add(key)
+            inputs.append(path)
+    return inputs
+
+class BatchPipeline:
+    """
+    Bounded producer-consumer pipeline for many inputs.
+    Render workers convert/render/decode documents into a bounded page queue
+    ahead of time, while the calling thread is the single inference consumer.
+    With several modes each page is rendered once and written once per mode.
+    """
+
+    def __init__(self, session, mode, raw_output=False, output_root=None, render_workers=2, queue_size=4,
+                 formats=DEFAULT_FORMATS):
+        self.session = session
+        self.modes = as_modes(mode)
+        self.raw_output = raw_output
+        self.formats = formats
+        self.output_root = Path(output_root) if output_root else None
+        self.render_workers = max(1, render_workers)
+        self.queue_size = max(1, queue_size)
+        self.stats = StageStats()
+
+    def _output_dir(self, input_path, mode=None):
+        if self.output_root:
+            output_dir = self.output_root / input_path.stem
+        else:
+            output_dir = default_output_dir(input_path)
+        return output_dir if mode is None else mode_output_dir(output_dir, mode, self.modes)
+
+    def _writers(self, doc_index, input_path):
+        """
+        One CheckpointedWriter per mode for a document.
+        """
+        writers = {}
+        for mode in self.modes:
+            writer = open_writer(self._output_dir(input_path, mode), input_path, mode, self.formats)
+            writers[mode] = CheckpointedWriter(writer, self._manifests[doc_index][mode])
+        return writers
+
+    def _open_manifests(self, doc_index, input_path):
+        """
+        Open the document's checkpoint and layout index in each mode. Returns the
+        pages done in every mode.
+        """
+        manifests, layouts = {}, {}
+        for mode in self.modes:
+            output_dir = self._output_dir(input_path, mode)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            manifests[mode] = self.session.open_manifest(output_dir, input_path, mode, self.raw_output)
+            layouts[mode] = self.session.open_layout(output_dir, input_path, mode, self.raw_output)
+        done = frozenset.intersection(*(frozenset(manifest.completed) for manifest in manifests.values()))
+        if done:
+            console.print(f"[dim]Resuming {input_path.name}: {len(done)} pages already done.[/dim]")
+        self._manifests[doc_index] = manifests
+        self._layouts[doc_index] = layouts
+        return done
+
+    def _page_drafts(self, pages):
+        """
+        Per mode, the reference text of each (doc_index, idx, image) page for speculative
+        decoding; None when it is off.
+        """
+        if not self.session.speculative:
+            return None
+        drafts = [self._drafts.get(doc_index, {}) for doc_index, _, _ in pages]
+        return [[page_drafts[mode].get(idx + 1) if mode in page_drafts else None
+                 for page_drafts, (_, idx, _) in zip(drafts, pages)] for mode in self.modes]
+
+    def _download_worker(self, ingester, urls, first_index, doc_queue, page_queue, render_workers):
+        """
+        Download URLs concurrently and queue each file for rendering as soon as it is complete.
+        """
+        try:
+            for i, url, path, error in ingester.download(urls):
+                doc_index = first_index + i
+                if error is not None:
+                    page_queue.put((doc_index, _DOC_ERROR, f"download failed: {error}"))
+                    continue
+                console.print(f"[dim]Downloaded {url} → {path}[/dim]")
+                self._paths[doc_index] = path
+                doc_queue.put((doc_index, path))
+        except Exception as e:
+            console.print(f"[red]URL ingestion stopped: {e}[/red]")
+        finally:
+            for _ in range(render_workers):
+                doc_queue.put(None)
+
+    def _render_worker(self, doc_queue, page_queue):
+        while True:
+            item = doc_queue.get()
+            if item is None:
+                break
+            doc_index, input_path = item
+            page_count = 0
+            metrics = self.session.metrics
+            try:
+                # Checkpoint first: pages already done are not rendered again
+                done = self._open_manifests(doc_index, input_path)
+                source_path = input_path
+                if input_path.suffix.lower() == '.docx':
+                    with self.stats.timed("render", count=0), metrics.timed("docx conversion"):
+                        source_path = self.session.docx.convert(input_path)
+                # Before the first page is queued, and while a converted DOCX still exists
+                self._drafts[doc_index] = self.session.open_drafts(
+                    {mode: self._output_dir(input_path, mode) for mode in self.modes}, input_path, source_path, done)
+                pages = metrics.timed_pages(iter_pages(source_path, self.session.renderer, skip=done), page_stage(source_path))
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        item = next(pages, None)
+                        elapsed = time.perf_counter() - start
+                        if item is None:
+                            self.stats.add("render", elapsed, count=0)
+                            break
+                        self.stats.add("render", elapsed)
+                        idx, image = item
+                        with self.stats.timed("render (queue full)", count=0):
+                            page_queue.put((doc_index, idx, image))
+                        page_count += 1
+                finally:
+                    # Every page is rendered (or the document failed): the converted PDF can go
+                    if source_path != input_path:
+                        self.session.docx.release(source_path)
+                page_queue.put((doc_index, _DOC_END, page_count))
+            except Exception as e:
+                page_queue.put((doc_index, _DOC_ERROR, str(e)))
+        page_queue.put(_WORKER_DONE)
+
+    def _take(self, page_queue):
+        """
+        Block for the next item, then greedily take pages that are already
+        queued, up to what the session can use in one step. Stops after the first marker
+        so each document's end is handled after its last page.
+        """
+        items = [page_queue.get()]
+        page_count = 0
+        while True:
+            if not _is_page(items[-1]):
+                break
+            page_count += 1
+            if page_count >= self.session.pages_per_step:
+                break
+            try:
+                items.append(page_queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def run(self, inputs, urls=(), ingester=None):
+        """
+        Process every input and return the list of written Markdown files.
+        `urls` are downloaded by `ingester` (a URLIngester) while earlier documents
+        are in inference; each one enters the pipeline as soon as it is on disk.
+        """
+        inputs = [Path(p) for p in inputs]
+        urls = list(urls)
+        prompts = [get_prompt(mode) for mode in self.modes]
+        # Labels for progress and errors; local paths are known now, URLs once downloaded
+        labels = [p.name for p in inputs] + urls
+        self._paths = dict(enumerate(inputs))
+        self._manifests = {}
+        self._layouts = {}
+        self._drafts = {}
+        doc_queue = queue.Queue()
+        for item in enumerate(inputs):
+            doc_queue.put(item)
+        page_queue = queue.Queue(maxsize=self.queue_size)
+        docx_count = sum(p.suffix.lower() == '.docx' for p in inputs)
+        if docx_count:
+            # Start LibreOffice while the first documents are still queued
+            self.session.docx.warm(min(docx_count, self.render_workers))
+
+        worker_count = min(self.render_workers, len(labels))
+        workers = [
+            threading.Thread(target=self._render_worker, args=(doc_queue, page_queue), daemon=True)
+            for _ in range(worker_count)
+        ]
+        if urls:
+            ingester.metrics = self.session.metrics
+            workers.append(threading.Thread(
+                target=self._download_worker,
+                args=(ingester, urls, len(inputs), doc_queue, page_queue, worker_count), daemon=True))
+        else:
+            for _ in range(worker_count):
+                doc_queue.put(None)
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+
+        writers = {}  # doc_index -> {mode: writer streaming that document}
+        results = []
+        finished_workers = 0
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            transient=False,
+        ) as progress:
+            task = progress.add_task("[green]OCR Processing...", total=len(labels))
+            while finished_workers < worker_count:
+                with self.stats.timed("inference (waiting for pages)", count=0):
+                    items = self._take(page_queue)
+                pages = [item for item in items if _is_page(item)]
+                markers = [item for item in items if not _is_page(item)]
+
+                if pages:
+                    for doc_index, _, _ in pages:
+                        if doc_index not in writers:
+                            writers[doc_index] = self._writers(doc_index, self._paths[doc_index])
+                    doc_index, idx, _ = pages[-1]
+                    progress.update(task, description=f"{labels[doc_index]}: page {idx+1}")
+                    with self.stats.timed("inference", count=len(pages)):
+                        texts, records = self.session.ocr_pages_multi(
+                            [image for _, _, image in pages], prompts,
+                            self._output_dir(self._paths[pages[0][0]]), self.raw_output,
+                            [(self._paths[doc_index].name, idx + 1) for doc_index, idx, _ in pages],
+                            [[self._layouts.get(doc_index, {}).get(mode) for doc_index, _, _ in pages]
+                             for mode in self.modes],
+                            self._page_drafts(pages),
+                            [[j for j, (doc_index, idx, _) in enumerate(pages)
+                              if idx in self._manifests[doc_index][mode].completed] for mode in self.modes],
+                        )
+                    with self.stats.timed("write", count=len(pages)), self.session.metrics.timed("write", count=len(pages)):
+                        for mode, mode_texts, mode_records in zip(self.modes, texts, records):
+                            for (doc_index, idx, _), text_result, record in zip(pages, mode_texts, mode_records):
+                                if idx in self._manifests[doc_index][mode].completed:
+                                    # Done in this mode by an earlier run; filled in from its checkpoint
+                                    continue
+                                writers[doc_index][mode].write_page(idx, text_result, record)
+
+                for item in markers:
+                    if item is _WORKER_DONE:
+                        finished_workers += 1
+                        continue
+                    doc_index, marker, payload = item
+                    self._drafts.pop(doc_index, None)
+                    for layout in self._layouts.pop(doc_index, {}).values():
+                        if layout is not None:
+                            layout.save()
+                    if marker == _DOC_ERROR:
+                        for writer in writers.pop(doc_index, {}).values():
+                            # Keep the checkpoint and any previous .md; the next run resumes
+                            writer.abort()
+                        console.print(f"[red]Failed to process {labels[doc_index]}: {payload}[/red]")
+                    else:
+                        doc_writers = writers.pop(doc_index, None)
+                        if doc_writers is None:
+                            # No new pages (empty or fully resumed): still produce its output file
+                            doc_writers = self._writers(doc_index, self._paths[doc_index])
+                        for mode, writer in doc_writers.items():
+                            result_file = writer.close()
+                            results.append(result_file)
+                            label = f" [{mode}]" if len(self.modes) > 1 else ""
+                            console.print(f"[green]✓[/green] {labels[doc_index]}{label} ({writer.pages_written} pages) → {result_file}")
+                    progress.advance(task)
+
+        self.report(time.perf_counter() - start)
+        return results
+
+    def report(self, wall_time):
+        """
+        Print per-stage busy time and utilization so the bottleneck is visible.
+        """
+        table = Table(title="Pipeline stages")
+        table.add_column("Stage")
+        table.add_column("Busy (s)", justify="right")
+        table.add_column("Pages", justify="right")
+        table.add_column("Utilization", justify="right")
+        for stage in sorted(self.stats.busy):
+            busy = self.stats.busy[stage]
+            # Render stages are spread over several threads
+            capacity = wall_time * (self.render_workers if stage.startswith("render") else 1)
+            utilization = busy / capacity if capacity > 0 else 0.0
+            count = self.stats.counts.get(stage, 0)
+            table.add_row(stage, f"{busy:.2f}", str(count) if count else "-", f"{utilization:.0%}")
+        console.print(table)
+        console.print(f"[dim]Wall time: {wall_time:.2f}s[/dim]")
+
+        starved = self.stats.busy.get("inference (waiting for pages)", 0.0)
+        blocked = self.stats.busy.get("render (queue full)", 0.0)
+        if starved > blocked:
+            console.print("[yellow]Inference spent more time waiting than rendering was blocked: rendering is the bottleneck (try more --render-workers or --render-processes).[/yellow]")
+        else:
+            console.print("[dim]Render workers were waiting on inference: the model is the bottleneck.[/dim]")
+
+def process_batch(inputs, mode, output_root, device_arg, model_cache=None, raw_output=False, render_workers=2, queue_size=4,
+                  urls=(), download_workers=DEFAULT_DOWNLOAD_WORKERS, formats=DEFAULT_FORMATS, **session_options):
+    """
+    Load the model once and run every input through a BatchPipeline.
+    `urls` are downloaded concurrently into `<output_root>/downloads` (or ./downloads)
+    and fed into the pipeline as they arrive.
+    `session_options` are passed through to create_session.
+    """
+    from .core import create_session
+
+    urls = list(urls)
+    console.print(f"Batch: {len(inputs)} files" + (f", {len(urls)} URLs" if urls else ""))
+    session = create_session(device_arg, model_cache, **session_options)
+    if session is None:
+        return []
+    # The queue must be able to hold a full inference step
+    queue_size = max(queue_size, session.pages_per_step)
+    pipeline = BatchPipeline(session, mode, raw_output, output_root, render_workers, queue_size, formats)
+    ingester = URLIngester(download_dir(output_root), download_workers) if urls else None
+    try:
+        results = pipeline.run(inputs, urls, ingester)
+    finally:
+        if ingester is not None:
+            ingester.close()
+        session.close()
+    session.print_summary()
+    return results
@@ -0,0 +1,77 @@
+import torch
+from torch import nn
+from rich.console import Console
+
+console = Console()
+
+QUANTIZE_MODES = ("int8",)
+
+# Vision side of DeepSeek-OCR (SAM + CLIP encoders, projector) stays in full precision;
+# only the language model's linears, which dominate per-token latency, are quantized.
+_SKIP_MODULES = ("sam_model", "vision_model", "projector")
+
+def select_quantized_engine():
+    """
+    Pick the int8 kernel backend for this CPU (fbgemm/x86 on Intel/AMD, qnnpack on ARM).
+    """
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError("This PyTorch build has no int8 CPU kernels.")
+
+class DynamicInt8Linear(nn.Module):
+    """
+    nn.Linear replacement with int8 weights and dynamically quantized activations.
+    The int8 kernels compute in float32, so inputs are upcast and the result is cast back,
+    letting the quantized layers sit inside a bfloat16/float16 model.
+    """
+
+    def __init__(self, in_features, out_features, bias=True):
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.linear = torch.ao.nn.quantized.dynamic.Linear(in_features, out_features, bias_=bias, dtype=torch.qint8)
+
+    @classmethod
+    def from_linear(cls, linear):
+        float_linear = nn.Linear(linear.in_features, linear.out_features, bias=linear.bias is not None)
+        with torch.no_grad():
+            float_linear.weight.copy_(linear.weight.float())
+            if linear.bias is not None:
+                float_linear.bias.copy_(linear.bias.float())
+        float_linear.qconfig = torch.ao.quantization.default_dynamic_qconfig
+        module = cls(linear.in_features, linear.out_features, bias=linear.bias is not None)
+        module.linear = torch.ao.nn.quantized.dynamic.Linear.from_float(float_linear)
+        return module
+
+    def forward(self, x):
+        return self.linear(x.float()).to(x.dtype)
+
+def quantize_model(model, mode="int8", convert=True):
+    """
+    Swap the language model's nn.Linear layers for DynamicInt8Linear in place.
+    With convert=False the layers are left empty (for loading a cached quantized checkpoint).
+    Returns the number of layers replaced.
+    """
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unsupported quantization mode: {mode}")
+    select_quantized_engine()
+
+    targets = [
+        (name, module) for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and not any(part in _SKIP_MODULES for part in name.split("."))
+    ]
+    for name, linear in targets:
+        parent_name, _, child_name = name.rpartition(".")
+        parent = model.get_submodule(parent_name) if parent_name else model
+        if convert:
+            replacement = DynamicInt8Linear.from_linear(linear)
+        else:
+            replacement = DynamicInt8Linear(linear.in_features, linear.out_features, bias=linear.bias is not None)
+        setattr(parent, child_name, replacement)
+
+    # Part of the model identity: the result cache must not mix quantized and full-precision output
+    model._dsocr_quantize = mode
+    return len(targets)
@@ -0,0 +1,123 @@
+from PIL import Image
+from .blank import INK_CONTRAST
+from .converters import tile_grid
+from .generation import TOKENS_PER_INK
+
+# DeepSeek-OCR's resolution modes as (base_size, image_size, crop_mode)
+PRESETS = {
+    "tiny": (512, 512, False),
+    "small": (640, 640, False),
+    "base": (1024, 1024, False),
+    "large": (1280, 1280, False),
+    # A base_size global view plus image_size crop tiles; what run_inference uses by default
+    "gundam": (1024, 640, True),
+}
+DEFAULT_PRESET = "gundam"
+AUTO = "auto"
+# One vision token per 64x64 input pixels (16px patches, 16x token compression)
+TOKEN_SIDE = 64
+# Text tokens per vision token the model still decodes near-losslessly (~10x in the DeepSeek-OCR paper)
+MAX_COMPRESSION = 10
+# Smallest text-line height (px, as the vision encoder sees it) that is read reliably
+MIN_LINE_PX = 14
+# Line heights are measured on a copy about this size (longest side, px), in vertical strips
+# so that lines of neighbouring columns do not merge
+ANALYSIS_SIZE = 1024
+STRIPS = 4
+# Line height taken at this percentile: the smallest text on the page decides
+LINE_PERCENTILE = 25
+
+def vision_tokens(preset, size):
+    """
+    Vision tokens the model spends on an image of `size` (width, height) with `preset`.
+    """
+    base_size, image_size, crop_mode = PRESETS[preset]
+    tokens = (base_size // TOKEN_SIDE) ** 2
+    width, height = size
+    if crop_mode and (width > image_size or height > image_size):
+        cols, rows = tile_grid(width / height)
+        tokens += cols * rows * (image_size // TOKEN_SIDE) ** 2
+    return tokens
+
+def encoder_scale(preset, size):
+    """
+    Scale from page pixels to the finest view the vision encoder gets with `preset`.
+    """
+    base_size, image_size, crop_mode = PRESETS[preset]
+    width, height = size
+    if crop_mode and (width > image_size or height > image_size):
+        cols, rows = tile_grid(width / height)
+        return min(cols * image_size / width, rows * image_size / height)
+    return base_size / max(width, height)
+
+def text_line_height(pixels):
+    """
+    Typical height (px) of the smallest text lines in a grayscale array, from runs of
+    inked rows; None when there are no text-like lines.
+    """
+    import numpy as np
+
+    ink = pixels < float(np.median(pixels)) - INK_CONTRAST
+    heights = []
+    for strip in np.array_split(ink, STRIPS, axis=1):
+        rows = np.concatenate(([0], strip.any(axis=1).astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(rows))
+        runs = edges[1::2] - edges[::2]
+        # 1px runs are rules and specks
+        heights.extend(runs[runs > 1].tolist())
+    if not heights:
+        return None
+    return float(np.percentile(heights, LINE_PERCENTILE))
+
+class PageComplexity:
+    """
+    What decides how much resolution a page needs: its size, how much output it will
+    produce (from its ink) and how small its text is.
+    """
+
+    def __init__(self, size, ink, line_height):
+        self.size = size
+        self.ink = ink
+        self.line_height = line_height
+
+    @property
+    def expected_tokens(self):
+        return round(self.ink * TOKENS_PER_INK)
+
+def analyze_complexity(image):
+    """
+    PageComplexity of a page (PIL Image or image path).
+    """
+    import numpy as np
+
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return analyze_complexity(opened.convert("RGB"))
+    # One box-reduced grayscale copy serves both measures
+    factor = max(1, round(max(image.size) / ANALYSIS_SIZE))
+    gray = (image.reduce(factor) if factor > 1 else image).convert("L")
+    pixels = np.asarray(gray, dtype=np.float32)
+    ink = 1.0 - float(pixels.mean()) / 255.0
+    line_height = text_line_height(pixels)
+    return PageComplexity(image.size, ink, line_height * factor if line_height is not None else None)
+
+def choose_preset(complexity):
+    """
+    The preset with the fewest vision tokens that keeps the page's text lines legible
+    and its expected output within MAX_COMPRESSION text tokens per vision token.
+    Pages no preset satisfies get DEFAULT_PRESET.
+    """
+    size = complexity.size
+    for preset in sorted(PRESETS, key=lambda p: vision_tokens(p, size)):
+        if complexity.expected_tokens > MAX_COMPRESSION * vision_tokens(preset, size):
+            continue
+        if complexity.line_height is not None and complexity.line_height * encoder_scale(preset, size) < MIN_LINE_PX:
+            continue
+        return preset
+    return DEFAULT_PRESET
+
+def image_size_of(image):
+    if isinstance(image, Image.Image):
+        return image.size
+    with Image.open(image) as opened:
+        return opened.size
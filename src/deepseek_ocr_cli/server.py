@@ -0,0 +1,167 @@
+import os
+import json
+import socket
+import socketserver
+from pathlib import Path
+from rich.console import Console
+from .writers import DEFAULT_FORMATS
+
+console = Console()
+
+DEFAULT_SOCKET_PATH = Path.home() / ".cache" / "dsocr" / "dsocr.sock"
+
+def get_socket_path(socket_path=None):
+    """
+    Resolve the daemon socket path.
+    Prioritizes:
+    1. socket_path (CLI arg)
+    2. DSOCR_SOCKET (Env var)
+    3. ~/.cache/dsocr/dsocr.sock
+    """
+    if socket_path:
+        return Path(socket_path)
+    env_socket = os.environ.get("DSOCR_SOCKET")
+    if env_socket:
+        return Path(env_socket)
+    return DEFAULT_SOCKET_PATH
+
+def _send(sock, message):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+def _recv(sock_file):
+    line = sock_file.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """
+    One connection = one JSON job line in, one JSON reply line out.
+    The server is single-threaded, so jobs are serialized on the resident model.
+    """
+
+    def handle(self):
+        try:
+            job = _recv(self.rfile)
+        except ValueError as e:
+            _send(self.connection, {"ok": False, "error": f"Malformed job: {e}"})
+            return
+        if job is None:
+            return
+
+        if job.get("type") == "ping":
+            _send(self.connection, {"ok": True, "pid": os.getpid()})
+            return
+
+        session = self.server.session
+        try:
+            console.print(f"[dim]Job: {job['input_path']} (mode={job['mode']})[/dim]")
+            # Summary and metrics report cover this job only
+            session.reset_run()
+            # The client's per-run flags apply to this job only
+            with session.job_options(**(job.get("options") or {})):
+                result_file = session.ocr_file(
+                    job["input_path"],
+                    job["mode"],
+                    job["output_dir"],
+                    raw_output=job.get("raw_output", False),
+                    formats=job.get("formats") or DEFAULT_FORMATS,
+                )
+        except Exception as e:
+            console.print(f"[red]Job failed: {e}[/red]")
+            _send(self.connection, {"ok": False, "error": str(e)})
+            return
+
+        if job.get("metrics_json"):
+            # This job's pages and stages; load_time is the server's one-time model load
+            session.write_metrics(job["metrics_json"])
+
+        if result_file is None:
+            _send(self.connection, {"ok": False, "error": "OCR failed, see server log."})
+        else:
+            _send(self.connection, {"ok": True, "result": str(result_file)})
+
+class _OCRServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path, session):
+        self.session = session
+        super().__init__(str(socket_path), _JobHandler)
+
+def is_server_running(socket_path=None):
+    """
+    Return True if a dsocr daemon answers on the socket.
+    """
+    socket_path = get_socket_path(socket_path)
+    if not socket_path.exists():
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(str(socket_path))
+            _send(sock, {"type": "ping"})
+            reply = _recv(sock.makefile("r", encoding="utf-8"))
+            return bool(reply and reply.get("ok"))
+    except (OSError, ValueError):
+        return False
+
+def submit_job(input_path, mode, output_dir, raw_output=False, socket_path=None, metrics_json=None,
+               formats=DEFAULT_FORMATS, options=None):
+    """
+    Hand a job to a running daemon. `options` are session options the daemon applies
+    to this job only (see core.JOB_OPTIONS).
+    Returns the reply dict, or None if no daemon is reachable (caller should fall back to in-process).
+    """
+    socket_path = get_socket_path(socket_path)
+    if not socket_path.exists():
+        return None
+    job = {
+        "type": "ocr",
+        "input_path": str(Path(input_path).absolute()),
+        "mode": mode,
+        "output_dir": str(Path(output_dir).absolute()),
+        "raw_output": raw_output,
+        "formats": list(formats),
+        "metrics_json": str(Path(metrics_json).absolute()) if metrics_json else None,
+        "options": dict(options or {}),
+    }
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(socket_path))
+    except OSError:
+        return None
+    # No timeout once connected: a long PDF can legitimately take minutes.
+    with sock:
+        _send(sock, job)
+        return _recv(sock.makefile("r", encoding="utf-8"))
+
+def serve(device_arg=None, model_cache=None, socket_path=None, **session_options):
+    """
+    Load the model once and serve OCR jobs on a local Unix socket until interrupted.
+    `session_options` are passed through to create_session.
+    """
+    from .core import create_session
+
+    socket_path = get_socket_path(socket_path)
+    if is_server_running(socket_path):
+        console.print(f"[red]A dsocr server is already running on {socket_path}[/red]")
+        return
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        # Stale socket from a server that did not shut down cleanly
+        socket_path.unlink()
+
+    session = create_session(device_arg, model_cache, **session_options)
+    if session is None:
+        return
+
+    server = _OCRServer(socket_path, session)
+    os.chmod(socket_path, 0o600)
+    console.print(f"[bold green]dsocr server listening on {socket_path}[/bold green] (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[dim]Shutting down server...[/dim]")
+    finally:
+        server.server_close()
+        session.close()
+        if socket_path.exists():
+            socket_path.unlink()
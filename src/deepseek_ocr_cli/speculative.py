@@ -0,0 +1,173 @@
+import re
+from bisect import bisect_left
+from pathlib import Path
+
+# Draft tokens proposed per verification pass
+DRAFT_TOKENS = 10
+# The output's last MAX_NGRAM..MIN_NGRAM tokens locate it in the reference (longest first)
+MAX_NGRAM = 4
+MIN_NGRAM = 2
+
+_PAGE_HEADING = re.compile(r"^## Page (\d+)\n", re.M)
+
+def previous_pages(markdown_file):
+    """
+    Page texts by page number from a Markdown file written by MarkdownWriter.
+    """
+    try:
+        text = Path(markdown_file).read_text(encoding="utf-8")
+    except OSError:
+        return {}
+    # [title, number, text, number, text, ...]
+    parts = _PAGE_HEADING.split(text)
+    return {int(number): body.strip() for number, body in zip(parts[1::2], parts[2::2]) if body.strip()}
+
+def text_layer_pages(pdf_path, skip=()):
+    """
+    Text layer of each PDF page, as Markdown, by page number; pages with no text
+    and page indices in `skip` are left out.
+    """
+    import fitz  # PyMuPDF
+    from .converters import FITZ_LOCK
+    from .textlayer import page_to_markdown
+
+    texts = {}
+    with FITZ_LOCK:
+        with fitz.open(pdf_path) as doc:
+            for i in range(len(doc)):
+                if i in skip:
+                    continue
+                # The model writes tables as HTML: a Markdown table would only be rejected
+                text = page_to_markdown(doc.load_page(i), tables=False)
+                if text.strip():
+                    texts[i + 1] = text
+    return texts
+
+class DocumentDrafts:
+    """
+    Reference text per page of one document for speculative decoding: the page as a
+    previous run wrote it to `<output dir>/<stem>.md`, else its PDF text layer
+    (`text_layer`, from text_layer_pages). Read up front, as the run replaces the
+    Markdown file and a converted DOCX does not outlive its rendering.
+    """
+
+    def __init__(self, output_dir, input_path, text_layer=None):
+        self.previous = previous_pages(Path(output_dir) / f"{Path(input_path).stem}.md")
+        self.text_layer = text_layer or {}
+
+    def get(self, page):
+        """
+        Reference text of page number `page`, or None.
+        """
+        return self.previous.get(page) or self.text_layer.get(page)
+
+class DraftLookup:
+    """
+    Proposes continuations of the output from a reference token sequence (prompt-lookup
+    style): the output's last few tokens are found in the reference and the tokens
+    that follow them there are the draft. Of several matches it takes the first one
+    after where the previous draft left off, so decoding walks through the reference in order.
+    """
+
+    def __init__(self, reference_ids):
+        self.reference = list(reference_ids)
+        # n-gram -> positions right after each of its occurrences, ascending
+        self._positions = {}
+        for n in range(MIN_NGRAM, MAX_NGRAM + 1):
+            for i in range(len(self.reference) - n):
+                self._positions.setdefault(tuple(self.reference[i:i + n]), []).append(i + n)
+        self._next = 0
+        self._start = None
+
+    def propose(self, tail, limit):
+        """
+        Up to `limit` reference tokens expected to follow `tail` (the output's last tokens).
+        """
+        self._start = None
+        if limit <= 0:
+            return []
+        for n in range(min(MAX_NGRAM, len(tail)), MIN_NGRAM - 1, -1):
+            positions = self._positions.get(tuple(tail[-n:]))
+            if not positions:
+                continue
+            after = bisect_left(positions, self._next)
+            self._start = positions[after] if after < len(positions) else positions[0]
+            return self.reference[self._start:self._start + limit]
+        return []
+
+    def accept(self, count):
+        """
+        The model kept the first `count` tokens of the last draft.
+        """
+        if self._start is not None:
+            self._next = self._start + count
+
+class DraftStats:
+    """
+    Run totals of speculative decoding: draft tokens proposed and accepted, forward
+    passes, the tokens and decode time of pages decoded with a draft, and the time of
+    their passes that had nothing drafted (one token each, as without a draft).
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.proposed = 0
+        self.accepted = 0
+        self.passes = 0
+        self.tokens = 0
+        self.seconds = 0.0
+        self.plain_passes = 0
+        self.plain_seconds = 0.0
+
+    def add(self, proposed, accepted, passes, tokens, seconds, plain_passes=0, plain_seconds=0.0):
+        self.pages += 1
+        self.proposed += proposed
+        self.accepted += accepted
+        self.passes += passes
+        self.tokens += tokens
+        self.seconds += seconds
+        self.plain_passes += plain_passes
+        self.plain_seconds += plain_seconds
+
+    @property
+    def acceptance(self):
+        return self.accepted / self.proposed if self.proposed else None
+
+    @property
+    def tokens_per_sec(self):
+        return self.tokens / self.seconds if self.seconds > 0 else None
+
+    def to_dict(self, plain_tokens_per_sec=None):
+        """
+        The totals as a report. The speedup is against `plain_tokens_per_sec` (pages
+        decoded without a draft) or, failing that, the undrafted passes.
+        """
+        rate = self.tokens_per_sec
+        if not plain_tokens_per_sec and self.plain_seconds > 0:
+            plain_tokens_per_sec = self.plain_passes / self.plain_seconds
+        return {
+            "pages": self.pages,
+            "draft_tokens": self.proposed,
+            "accepted_tokens": self.accepted,
+            "acceptance_rate": round(self.acceptance, 4) if self.acceptance is not None else None,
+            "tokens_per_pass": round(self.tokens / self.passes, 2) if self.passes else None,
+            "tokens_per_sec": round(rate, 2) if rate else None,
+            "plain_tokens_per_sec": round(plain_tokens_per_sec, 2) if plain_tokens_per_sec else None,
+            "speedup": round(rate / plain_tokens_per_sec, 2) if rate and plain_tokens_per_sec else None,
+        }
+
+    def summary(self, plain_tokens_per_sec=None):
+        """
+        One line for the end-of-run summary (see to_dict).
+        """
+        report = self.to_dict(plain_tokens_per_sec)
+        line = f"Speculative: {self.pages} pages drafted, {self.accepted} of {self.proposed} draft tokens accepted"
+        if report["acceptance_rate"] is not None:
+            line += f" ({report['acceptance_rate']:.0%})"
+        if report["tokens_per_pass"]:
+            line += f", {report['tokens_per_pass']:.1f} tokens per forward pass"
+        if report["tokens_per_sec"]:
+            line += f", {report['tokens_per_sec']:.1f} tok/s"
+        if report["speedup"]:
+            line += f" vs {report['plain_tokens_per_sec']:.1f} tok/s without a draft ({report['speedup']:.2f}x)"
+        return line
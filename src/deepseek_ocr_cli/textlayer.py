@@ -0,0 +1,182 @@
+import re
+from collections import Counter
+
+# A page's text layer is trusted when it has enough text, little of the page is
+# covered by raster images and the extracted characters look like real text.
+MIN_CHARS = 40
+MAX_IMAGE_COVERAGE = 0.15
+MIN_TEXT_CHAR_RATIO = 0.6
+MAX_BAD_CHAR_RATIO = 0.02
+MIN_MEAN_WORD_LENGTH = 2.0
+MAX_MEAN_WORD_LENGTH = 15.0
+# Blocks at least this share of the text width wide (titles, wide tables) span all columns
+FULL_WIDTH = 0.55
+
+_BULLETS = ("•", "·", "◦", "▪", "‣", "●", "○", "■")
+_BAD_CHARS = re.compile(r"[�\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def image_coverage(page):
+    """
+    Fraction of the page area covered by raster images (summed per image, capped at 1).
+    """
+    page_area = abs(page.rect) or 1.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = page.rect & info["bbox"]
+        covered += abs(bbox)
+    return min(1.0, covered / page_area)
+
+def assess_text_layer(page, text=None):
+    """
+    Decide whether a page's embedded text can replace OCR.
+    Returns (reliable, reason).
+    """
+    text = page.get_text("text") if text is None else text
+    chars = "".join(text.split())
+    if len(chars) < MIN_CHARS:
+        return False, "little or no text layer"
+    coverage = image_coverage(page)
+    if coverage > MAX_IMAGE_COVERAGE:
+        return False, f"images cover {coverage:.0%} of the page"
+    if len(_BAD_CHARS.findall(chars)) / len(chars) > MAX_BAD_CHAR_RATIO:
+        return False, "unmapped glyphs in the text layer"
+    # Letters/digits vs. symbol soup from fonts without a usable Unicode mapping
+    if sum(c.isalnum() for c in chars) / len(chars) < MIN_TEXT_CHAR_RATIO:
+        return False, "text layer is mostly symbols"
+    words = text.split()
+    mean_word = sum(len(w) for w in words) / len(words)
+    # Per-glyph positioning extracts as "w o r d s"; missing spaces as one long run
+    if not MIN_MEAN_WORD_LENGTH <= mean_word <= MAX_MEAN_WORD_LENGTH:
+        return False, "text layer has broken word spacing"
+    return True, "ok"
+
+def _body_size(blocks):
+    sizes = Counter()
+    for block in blocks:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+def _heading_prefix(size, body_size):
+    if not body_size:
+        return ""
+    ratio = size / body_size
+    if ratio >= 1.8:
+        return "# "
+    if ratio >= 1.4:
+        return "## "
+    if ratio >= 1.15:
+        return "### "
+    return ""
+
+def _inside(bbox, rects):
+    x0, y0, x1, y1 = bbox
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    return any(r[0] <= cx <= r[2] and r[1] <= cy <= r[3] for r in rects)
+
+def _block_markdown(block, body_size):
+    lines = []
+    for line in block["lines"]:
+        spans = [span for span in line["spans"] if span["text"].strip()]
+        if not spans:
+            continue
+        text = "".join(span["text"] for span in line["spans"]).strip()
+        size = max(span["size"] for span in spans)
+        lines.append((text, size))
+    if not lines:
+        return ""
+
+    prefix = _heading_prefix(max(size for _, size in lines), body_size)
+    if prefix:
+        return prefix + " ".join(text for text, _ in lines)
+
+    paragraphs = []
+    current = ""
+    for text, _ in lines:
+        if text.startswith(_BULLETS):
+            if current:
+                paragraphs.append(current)
+            current = "- " + text.lstrip("".join(_BULLETS)).strip()
+        elif current.endswith("-") and not current.endswith(" -"):
+            # Re-join words hyphenated across lines
+            current = current[:-1] + text
+        else:
+            current = f"{current} {text}" if current else text
+    paragraphs.append(current)
+    return "\n".join(paragraphs)
+
+def _reading_order(items):
+    """
+    Sort (bbox, markdown) items into reading order. Full-width items split the page
+    into bands read top to bottom; within a band, items whose horizontal extents
+    overlap form a column, and columns are read left to right, each top to bottom.
+    """
+    if not items:
+        return []
+    left = min(bbox[0] for bbox, _ in items)
+    width = max(bbox[2] for bbox, _ in items) - left or 1.0
+    ordered = []
+    band = []
+    def flush():
+        columns = []  # [x0, x1, items]
+        for item in sorted(band, key=lambda item: item[0][0]):
+            x0, _, x1, _ = item[0]
+            if columns and x0 < columns[-1][1]:
+                columns[-1][1] = max(columns[-1][1], x1)
+                columns[-1][2].append(item)
+            else:
+                columns.append([x0, x1, [item]])
+        for _, _, column in columns:
+            ordered.extend(sorted(column, key=lambda item: (item[0][1], item[0][0])))
+        band.clear()
+
+    for item in sorted(items, key=lambda item: (item[0][1], item[0][0])):
+        x0, _, x1, _ = item[0]
+        if x1 - x0 >= FULL_WIDTH * width:
+            flush()
+            ordered.append(item)
+        else:
+            band.append(item)
+    flush()
+    return ordered
+
+def page_to_markdown(page, tables=True):
+    """
+    Markdown from a page's text layer: headings from font size, bullet lists,
+    hyphenation repaired, and tables via PyMuPDF's table finder when available
+    (with tables=False their cells come out as plain text blocks).
+    """
+    items = []  # (bbox, markdown)
+    table_rects = []
+    if tables and hasattr(page, "find_tables"):
+        try:
+            for table in page.find_tables().tables:
+                markdown = table.to_markdown().strip()
+                if markdown:
+                    table_rects.append(tuple(table.bbox))
+                    items.append((tuple(table.bbox), markdown))
+        except Exception:
+            # Table detection is best effort; fall back to plain blocks
+            table_rects = []
+            items = []
+
+    blocks = [b for b in page.get_text("dict", sort=True)["blocks"] if b.get("type") == 0]
+    body_size = _body_size(blocks)
+    for block in blocks:
+        if _inside(block["bbox"], table_rects):
+            continue
+        markdown = _block_markdown(block, body_size)
+        if markdown:
+            items.append((tuple(block["bbox"]), markdown))
+
+    return "\n\n".join(markdown for _, markdown in _reading_order(items))
+
+def text_layer_markdown(page):
+    """
+    Markdown for the page if its text layer passes assess_text_layer, else None.
+    """
+    reliable, _ = assess_text_layer(page)
+    if not reliable:
+        return None
+    return page_to_markdown(page)
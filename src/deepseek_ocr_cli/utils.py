@@ -2,13 +2,13 @@ import os
 import sys
 import site
 import shutil
-import requests
 from pathlib import Path
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
-from huggingface_hub import snapshot_download
-import torch
 import re
+import json
+import itertools
+from contextlib import contextmanager
 
 console = Console()
 
@@ -67,6 +67,8 @@ def download_model(target_dir=None):
         console.print("[bold red]DSOCR_OFFLINE is set. Model not found locally and download is disabled.[/bold red]")
         sys.exit(1)
 
+    from huggingface_hub import snapshot_download
+
     console.print(f"[bold blue]Model not found locally.[/bold blue]")
     console.print(f"Downloading {DEEPSEEK_REPO} (approx. 10GB)...")
     
@@ -92,6 +94,7 @@ def disable_cuda(device: str):
     """
     if device == "cuda":
         return
+    import torch
     os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
     # Monkeypatch torch.cuda.is_available
     torch.cuda.is_available = lambda: False
@@ -105,6 +108,8 @@ def disable_cuda(device: str):
         return tensor.to(device)
     torch.Tensor.cuda = _noop_cuda
 
+GROUNDING_PATTERN = re.compile(r"<\|ref\|>(.*?)<\|/ref\|>\s*<\|det\|>(.*?)<\|/det\|>", re.DOTALL)
+
 def clean_ocr_output(text: str) -> str:
     """
     Remove model-specific markers (<|ref|>, <|det|>, compression stats) for cleaner output.
@@ -125,6 +130,30 @@ def clean_ocr_output(text: str) -> str:
     cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip()
     return cleaned
 
+def parse_grounding(text):
+    """
+    Grounding blocks from raw model output (the <|ref|>/<|det|> markers that
+    clean_ocr_output strips), as [{"label": str, "boxes": [[x1, y1, x2, y2], ...], "text": str}]
+    where `text` is the cleaned output that follows the block's markers.
+    Coordinates are on the model's 0-999 grid over the page, whatever its pixel size.
+    """
+    matches = list(GROUNDING_PATTERN.finditer(text or ""))
+    regions = []
+    for n, match in enumerate(matches):
+        try:
+            boxes = json.loads(match.group(2))
+        except ValueError:
+            continue
+        if boxes and not isinstance(boxes[0], list):
+            boxes = [boxes]
+        end = matches[n + 1].start() if n + 1 < len(matches) else len(text)
+        regions.append({
+            "label": match.group(1).strip(),
+            "boxes": boxes,
+            "text": clean_ocr_output(text[match.end():end]),
+        })
+    return regions
+
 def patch_transformers():
     """
     Apply runtime patches for transformers compatibility with DeepSeek-OCR.
@@ -184,29 +213,73 @@ def patch_transformers():
     except Exception as e:
         console.print(f"[red]Warning: Failed to patch transformers: {e}[/red]")
 
+IN_MEMORY_IMAGE_PREFIX = "dsocr-mem://"
+_in_memory_images = {}
+_in_memory_counter = itertools.count()
+
+def patch_image_loader(model):
+    """
+    Let the model's remote-code image loader accept in-memory PIL images.
+    upstream infer() only takes an `image_file` path and opens it with `load_image`;
+    we wrap that function so registered `dsocr-mem://` keys resolve to the PIL Image
+    directly, skipping the temp-file encode/decode per page.
+    Returns True if the loader is (now) patched.
+    """
+    module = sys.modules.get(type(model).__module__)
+    if module is None or not hasattr(module, "load_image"):
+        console.print("[dim]Model has no load_image hook; using temp files for in-memory pages.[/dim]")
+        return False
+    if getattr(module, "_dsocr_in_memory_loader", False):
+        return True
+
+    original_load_image = module.load_image
+
+    def load_image(image_path):
+        if isinstance(image_path, str) and image_path.startswith(IN_MEMORY_IMAGE_PREFIX):
+            return _in_memory_images[image_path]
+        return original_load_image(image_path)
+
+    module.load_image = load_image
+    module._dsocr_in_memory_loader = True
+    return True
+
+def supports_in_memory_images(model):
+    """
+    True if patch_image_loader succeeded for this model's remote code.
+    """
+    module = sys.modules.get(type(model).__module__)
+    return bool(module is not None and getattr(module, "_dsocr_in_memory_loader", False))
+
+@contextmanager
+def in_memory_image(image):
+    """
+    Register a PIL Image under a `dsocr-mem://` key usable as `image_file` for model.infer.
+    """
+    key = f"{IN_MEMORY_IMAGE_PREFIX}{next(_in_memory_counter)}"
+    _in_memory_images[key] = image
+    try:
+        yield key
+    finally:
+        _in_memory_images.pop(key, None)
+
 def download_file(url, target_dir):
     """
-    Download a file from a URL to the target directory.
+    Download a file from a URL to the target directory (see URLIngester).
+    The file type is sniffed from the response, not taken from the URL.
     """
-    filename = url.split('/')[-1]
-    if not filename:
-        filename = "downloaded_file"
-        
-    target_path = target_dir / filename
-    
+    from .ingest import URLIngester
+
+    ingester = URLIngester(target_dir, workers=1)
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         transient=True,
     ) as progress:
-        progress.add_task(description=f"Downloading {filename}...", total=None)
+        progress.add_task(description=f"Downloading {url}...", total=None)
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            with open(target_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            return target_path
+            return ingester.fetch(url)
         except Exception as e:
             console.print(f"[red]Failed to download {url}: {e}[/red]")
             return None
+        finally:
+            ingester.close()
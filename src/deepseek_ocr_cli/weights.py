@@ -0,0 +1,67 @@
+import os
+import shutil
+import hashlib
+from pathlib import Path
+import torch
+from rich.console import Console
+from .cache import get_cache_dir, snapshot_stats
+
+console = Console()
+
+def weights_cache_path(model_path, dtype, cache_dir=None, quantize=None):
+    """
+    Location of the pre-cast, mmap-able copy of a model snapshot's weights:
+    <cache dir>/weights/<model dir id>/<files id>/<dtype>[-<quantize>].pt
+    The files id covers the size and mtime of the snapshot's weight and config files
+    (as cache.model_fingerprint does), so a model directory updated in place is cast again.
+    """
+    model_path = Path(model_path).resolve()
+    snapshot_id = hashlib.sha256(str(model_path).encode("utf-8")).hexdigest()[:16]
+    files_id = hashlib.sha256("|".join(snapshot_stats(model_path)).encode("utf-8")).hexdigest()[:16]
+    name = str(dtype).replace("torch.", "")
+    if quantize:
+        name = f"{name}-{quantize}"
+    return get_cache_dir(cache_dir) / "weights" / f"{model_path.name}-{snapshot_id}" / files_id / f"{name}.pt"
+
+def save_weights_cache(model, weights_path):
+    """
+    Write the model's state dict (already in its target dtype) for later mmap loading.
+    Written to a temp file and renamed, so a crash never leaves a truncated checkpoint.
+    """
+    weights_path = Path(weights_path)
+    weights_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = weights_path.with_suffix(".tmp")
+    console.print(f"[dim]Caching weights for mmap loading: {weights_path}[/dim]")
+    state_dict = model.state_dict()
+    for k, v in state_dict.items():
+        # Quantized layers also store packed (weight, bias) tuples and dtypes; keep those as-is
+        if isinstance(v, torch.Tensor):
+            state_dict[k] = v.detach().to("cpu")
+    torch.save(state_dict, tmp_path)
+    os.replace(tmp_path, weights_path)
+    # Checkpoints cast from earlier versions of this model directory are stale
+    for stale in weights_path.parent.parent.iterdir():
+        if stale.is_dir() and stale != weights_path.parent:
+            shutil.rmtree(stale, ignore_errors=True)
+
+def load_model_from_weights_cache(model_path, weights_path, dtype, device, quantize=None):
+    """
+    Build the model skeleton without initializing weights, then attach tensors that are
+    memory-mapped from the cached checkpoint. On CPU the tensors stay backed by the file,
+    so several processes loading the same checkpoint share one copy in the page cache.
+    For a quantized checkpoint the skeleton gets empty quantized layers to load into.
+    """
+    from transformers import AutoConfig, AutoModel
+    from transformers.modeling_utils import no_init_weights
+
+    config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+    with no_init_weights():
+        model = AutoModel.from_config(config, trust_remote_code=True, torch_dtype=dtype)
+    if quantize:
+        from .quantize import quantize_model
+        quantize_model(model, quantize, convert=False)
+    state_dict = torch.load(weights_path, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state_dict, assign=True)
+    model.config._name_or_path = str(model_path)
+    model.name_or_path = str(model_path)
+    return model.eval().to(device)
@@ -0,0 +1,228 @@
+import os
+import gc
+import sys
+import queue
+import multiprocessing as mp
+from pathlib import Path
+from rich.console import Console
+from .resolution import PRESETS, DEFAULT_PRESET
+
+console = Console()
+
+# How often the dispatcher checks that workers are still alive while waiting
+_POLL_SECONDS = 5
+
+def plan_cores(workers, threads_per_worker=None):
+    """
+    Split the available CPUs into one contiguous block per worker.
+    Returns a list of core lists (one per worker).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = threads_per_worker or max(1, len(cores) // workers)
+    return [
+        [cores[(i * per_worker + j) % len(cores)] for j in range(per_worker)]
+        for i in range(workers)
+    ]
+
+def _worker_main(worker_id, options, task_queue, result_queue):
+    """
+    Worker process: load the model from the mmap'd weights cache and OCR pages until told to stop.
+    """
+    import torch
+    from .core import run_inference
+    from .cache import ResultCache
+    from .generation import GenerationController
+    from .utils import disable_cuda, patch_transformers, patch_image_loader
+    from .weights import load_model_from_weights_cache
+
+    try:
+        cores = options["cores"]
+        if options["pin_cores"] and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        torch.set_num_threads(len(cores))
+
+        device = options["device"]
+        disable_cuda(device)
+        patch_transformers()
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(options["model_path"], trust_remote_code=True)
+        dtype = getattr(torch, options["dtype"])
+        model = load_model_from_weights_cache(options["model_path"], options["weights_path"], dtype, device,
+                                              options["quantize"])
+        patch_image_loader(model)
+        controller = GenerationController(**options["generation"])
+        controller.install(model)
+        cache = ResultCache(options["cache_dir"], options["cache_max_bytes"]) if options["use_cache"] else None
+    except Exception as e:
+        result_queue.put(("startup", worker_id, f"{type(e).__name__}: {e}", False, None))
+        return
+
+    result_queue.put(("ready", worker_id, None, False, None))
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, image, prompt, output_dir, geometry, generation = task
+        hits_before = cache.hits if cache else 0
+        try:
+            # The submitting session's current limits (a daemon job may change them)
+            for name, value in generation.items():
+                setattr(controller, name, value)
+            result = run_inference(model, tokenizer, image, prompt, Path(output_dir), *geometry, cache=cache,
+                                   controller=controller)
+            stop = next((stop for stop in controller.stops if stop), None)
+            result_queue.put((task_id, str(result), None, bool(cache and cache.hits > hits_before), stop))
+        except Exception as e:
+            result_queue.put((task_id, None, f"{type(e).__name__}: {e}", False, None))
+
+class WorkerPool:
+    """
+    N model-holding worker processes, each with its own torch thread budget and
+    optional CPU affinity. Pages are pulled from a shared queue (so slow pages do not
+    stall the others) and results are reassembled in page order.
+    Weights are loaded from one memory-mapped checkpoint, so workers share them
+    through the page cache instead of costing N copies of the model.
+    """
+
+    def __init__(self, workers, device, model_cache=None, threads_per_worker=None, pin_cores=False,
+                 cache_dir=None, cache_max_bytes=None, use_cache=True, quantize=None, generation=None):
+        self.workers = workers
+        self.device = device
+        self.model_cache = model_cache
+        self.threads_per_worker = threads_per_worker
+        self.pin_cores = pin_cores
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.use_cache = use_cache
+        self.quantize = quantize
+        # GenerationController options applied in every worker
+        self.generation = generation or {}
+        self.hits = 0
+        self.misses = 0
+        # Early-stop reason per page of the last ocr_pages call
+        self.last_stops = []
+        self._processes = []
+        self._next_task = 0
+
+    def start(self):
+        """
+        Make sure the mmap-able weights exist, then spawn the workers and wait until all are ready.
+        """
+        from .core import load_model, resolve_model_path, select_dtype
+        from .weights import weights_cache_path, save_weights_cache
+
+        model_path = resolve_model_path(self.model_cache)
+        dtype = select_dtype(self.device)
+        weights_path = weights_cache_path(model_path, dtype, self.cache_dir, self.quantize)
+        if not weights_path.exists():
+            # One-time conversion in the parent (load_model writes the pre-cast
+            # checkpoint); workers then only mmap the result
+            _, model = load_model(self.device, self.model_cache, cache_dir=self.cache_dir, quantize=self.quantize)
+            if not weights_path.exists():
+                save_weights_cache(model, weights_path)
+            del model
+            gc.collect()
+
+        if self.pin_cores and not hasattr(os, "sched_setaffinity"):
+            console.print(f"[yellow]CPU pinning is not supported on {sys.platform}; workers will float.[/yellow]")
+        core_plan = plan_cores(self.workers, self.threads_per_worker)
+
+        # spawn: a fresh interpreter per worker avoids forking an initialized torch/OpenMP runtime
+        ctx = mp.get_context("spawn")
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        for worker_id in range(self.workers):
+            options = {
+                "device": self.device,
+                "model_path": str(model_path),
+                "weights_path": str(weights_path),
+                "dtype": str(dtype).replace("torch.", ""),
+                "cores": core_plan[worker_id],
+                "pin_cores": self.pin_cores,
+                "cache_dir": self.cache_dir,
+                "cache_max_bytes": self.cache_max_bytes,
+                "use_cache": self.use_cache,
+                "quantize": self.quantize,
+                "generation": self.generation,
+            }
+            process = ctx.Process(
+                target=_worker_main,
+                args=(worker_id, options, self._task_queue, self._result_queue),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        ready = 0
+        while ready < self.workers:
+            kind, worker_id, error, _, _ = self._get_result()
+            if kind == "startup":
+                self.shutdown()
+                raise RuntimeError(f"Worker {worker_id} failed to start: {error}")
+            if kind == "ready":
+                ready += 1
+        pinning = " (pinned)" if self.pin_cores else ""
+        console.print(f"[green]{self.workers} workers ready, {len(core_plan[0])} threads each{pinning}.[/green]")
+
+    def _get_result(self):
+        while True:
+            try:
+                return self._result_queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                dead = [p for p in self._processes if not p.is_alive()]
+                if dead:
+                    self.shutdown()
+                    raise RuntimeError(f"{len(dead)} OCR worker(s) exited unexpectedly.")
+
+    def ocr_pages(self, images, prompt, output_dir, geometries=None, generation=None):
+        """
+        Distribute pages across workers and return raw results in input order.
+        `geometries` optionally gives each page's (base_size, image_size, crop_mode);
+        `generation` overrides the GenerationController options the pool started with.
+        """
+        geometries = geometries or [PRESETS[DEFAULT_PRESET]] * len(images)
+        generation = dict(self.generation, **(generation or {}))
+        task_ids = []
+        for image, geometry in zip(images, geometries):
+            task_id = self._next_task
+            self._next_task += 1
+            task_ids.append(task_id)
+            self._task_queue.put((task_id, image, prompt, str(output_dir), tuple(geometry), generation))
+
+        results = {}
+        stops = {}
+        errors = []
+        while len(results) < len(task_ids):
+            task_id, text, error, cache_hit, stop = self._get_result()
+            # Drain every task of this call even on failure, so no stale result leaks into the next one
+            results[task_id] = text
+            stops[task_id] = stop
+            if error is not None:
+                errors.append(error)
+            elif self.use_cache:
+                if cache_hit:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        if errors:
+            raise RuntimeError(f"OCR worker failed: {errors[0]}")
+        self.last_stops = [stops[task_id] for task_id in task_ids]
+        return [results[task_id] for task_id in task_ids]
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
+
+    def shutdown(self):
+        for process in self._processes:
+            if process.is_alive():
+                self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
@@ -0,0 +1,182 @@
+import os
+import json
+from pathlib import Path
+from .jobs import atomic_write_text
+
+# Output formats a document can be written in, see open_writer
+OUTPUT_FORMATS = ("md", "jsonl", "pages")
+DEFAULT_FORMATS = ("md",)
+
+class PageWriter:
+    """
+    Receives a document's pages in page order as they finish.
+    `record` is the page's metadata (see OCRSession.last_pages), or None for pages
+    filled in from a checkpoint.
+    """
+
+    pages_written = 0
+
+    def write_page(self, idx, text, record=None):
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Finish the output and return its path.
+        """
+        raise NotImplementedError
+
+    def abort(self):
+        """
+        Stop after a failure, keeping whatever was written.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class MarkdownWriter(PageWriter):
+    """
+    Streams page results into `<name>.md.part` as they arrive, so nothing accumulates
+    in memory, and atomically renames it to the `.md` when the document is complete.
+    A crash never leaves a half-written `.md` behind.
+    """
+
+    def __init__(self, result_file, title):
+        self.result_file = Path(result_file)
+        self.result_file.parent.mkdir(parents=True, exist_ok=True)
+        self.part_file = self.result_file.with_name(self.result_file.name + ".part")
+        self._file = open(self.part_file, 'w', encoding='utf-8')
+        self._file.write(f"# {title}\n\n")
+        self._file.flush()
+        self.pages_written = 0
+
+    def write_page(self, idx, text, record=None):
+        self._file.write(f"## Page {idx+1}\n\n")
+        self._file.write(text + "\n\n")
+        self._file.flush()
+        self.pages_written += 1
+
+    def close(self):
+        """
+        Publish the finished document as the `.md`.
+        """
+        if not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.part_file, self.result_file)
+        return self.result_file
+
+    def abort(self):
+        """
+        Stop without publishing; the partial output stays in the `.part` file.
+        """
+        if not self._file.closed:
+            self._file.close()
+
+class PageFilesWriter(PageWriter):
+    """
+    One Markdown file per page, `<pages dir>/page-0001.md` and so on, each written
+    atomically as soon as its page is done.
+    """
+
+    def __init__(self, pages_dir):
+        self.result_file = Path(pages_dir)
+        self.result_file.mkdir(parents=True, exist_ok=True)
+        self.pages_written = 0
+
+    def write_page(self, idx, text, record=None):
+        atomic_write_text(self.result_file / f"page-{idx+1:04d}.md", text + "\n")
+        self.pages_written += 1
+
+    def close(self):
+        return self.result_file
+
+class JSONLWriter(PageWriter):
+    """
+    One JSON record per page (document, page, mode, text, plus how the page was
+    produced, its timings and grounding boxes when known), appended and flushed as
+    each page finishes so indexers can tail the file while the document runs.
+    Pages taken from a checkpoint are marked "resumed" and carry no timings.
+    """
+
+    def __init__(self, result_file, document, mode):
+        self.result_file = Path(result_file)
+        self.result_file.parent.mkdir(parents=True, exist_ok=True)
+        self.document = document
+        self.mode = mode
+        # Whole lines only, so a reader never sees a partial record
+        self._file = open(self.result_file, 'w', encoding='utf-8')
+        self.pages_written = 0
+
+    def write_page(self, idx, text, record=None):
+        entry = {"document": self.document, "page": idx + 1, "mode": self.mode, "text": text}
+        entry.update(record if record is not None else {"resumed": True})
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.pages_written += 1
+
+    def close(self):
+        if not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._file.close()
+        return self.result_file
+
+    def abort(self):
+        if not self._file.closed:
+            self._file.close()
+
+class MultiWriter(PageWriter):
+    """
+    Fans each page out to several writers. `close` returns the first writer's output.
+    """
+
+    def __init__(self, writers):
+        self.writers = list(writers)
+
+    @property
+    def pages_written(self):
+        return self.writers[0].pages_written
+
+    @property
+    def result_file(self):
+        return self.writers[0].result_file
+
+    def write_page(self, idx, text, record=None):
+        for writer in self.writers:
+            writer.write_page(idx, text, record)
+
+    def close(self):
+        return [writer.close() for writer in self.writers][0]
+
+    def abort(self):
+        for writer in self.writers:
+            writer.abort()
+
+def open_writer(output_dir, input_path, mode, formats=DEFAULT_FORMATS):
+    """
+    Writer streaming one document's pages into `output_dir` in each of `formats`:
+    "md" (<stem>.md), "jsonl" (<stem>.jsonl) and "pages" (<stem>_pages/page-NNNN.md).
+    """
+    output_dir = Path(output_dir)
+    input_path = Path(input_path)
+    writers = []
+    try:
+        for fmt in dict.fromkeys(formats or DEFAULT_FORMATS):
+            if fmt == "md":
+                writers.append(MarkdownWriter(output_dir / f"{input_path.stem}.md", input_path.name))
+            elif fmt == "jsonl":
+                writers.append(JSONLWriter(output_dir / f"{input_path.stem}.jsonl", input_path.name, mode))
+            elif fmt == "pages":
+                writers.append(PageFilesWriter(output_dir / f"{input_path.stem}_pages"))
+            else:
+                raise ValueError(f"Unknown output format: {fmt}")
+    except Exception:
+        for writer in writers:
+            writer.abort()
+        raise
+    return writers[0] if len(writers) == 1 else MultiWriter(writers)
@@ -0,0 +1,56 @@
+"""
+Blank-page detection on synthetic pages: empty and specked pages are blank, pages
+with a single word are not, whether dark-on-light or light-on-dark.
+
+    python -m pytest tests/test_blank.py
+"""
+import sys
+import random
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli.blank import is_blank_page  # noqa: E402
+
+# A4 at 200 DPI
+SIZE = (1654, 2339)
+
+def _page(text=None, background="white", ink="black", font_size=24):
+    image = Image.new("RGB", SIZE, background)
+    if text:
+        draw = ImageDraw.Draw(image)
+        for line, words in enumerate(text.splitlines()):
+            draw.text((200, 300 + line * font_size * 2), words, fill=ink, font=ImageFont.load_default(font_size))
+    return image
+
+def test_empty_page_is_blank():
+    blank, content = is_blank_page(_page())
+    assert blank and content.regions == 0
+
+def test_specks_are_blank():
+    image = _page()
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(0)
+    for _ in range(200):
+        draw.point((rng.randrange(SIZE[0]), rng.randrange(SIZE[1])), fill="black")
+    assert is_blank_page(image)[0]
+
+def test_single_word_is_not_blank():
+    blank, content = is_blank_page(_page("hello", font_size=12))
+    assert not blank and content.regions >= 1
+
+def test_inverted_page_is_not_blank():
+    text = "\n".join(f"Line {i}: the quick brown fox jumps over the lazy dog" for i in range(20))
+    inverted = ImageOps.invert(_page(text))
+    blank, content = is_blank_page(inverted)
+    assert not blank
+    # Same ink as the page it was inverted from
+    assert content.coverage == is_blank_page(_page(text))[1].coverage
+
+def test_dark_slide_is_not_blank():
+    slide = _page("Quarterly review\n- revenue up", background=(20, 30, 60), ink=(230, 230, 230), font_size=40)
+    assert not is_blank_page(slide)[0]
+
+def test_empty_dark_page_is_blank():
+    assert is_blank_page(_page(background=(20, 30, 60)))[0]
@@ -0,0 +1,36 @@
+"""
+DOCX input to iter_pages: the converted PDF goes to a temporary directory, never
+next to the input, and is removed once the pages are consumed.
+
+    python -m pytest tests/test_converters.py
+"""
+import sys
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli import converters  # noqa: E402
+
+def test_docx_converts_into_temp_dir(tmp_path, monkeypatch):
+    source = tmp_path / "report.docx"
+    source.write_bytes(b"PK\x03\x04")
+    outputs = []
+
+    def fake_docx_to_pdf(input_path, output_dir=None):
+        # Stands in for docx2pdf/LibreOffice, which honour output_dir the same way
+        output_path = Path(output_dir or Path(input_path).parent) / f"{Path(input_path).stem}.pdf"
+        doc = fitz.open()
+        for i in range(2):
+            doc.new_page().insert_text((72, 72), f"Page {i + 1}")
+        doc.save(output_path)
+        outputs.append(output_path)
+        return output_path
+
+    monkeypatch.setattr(converters, "docx_to_pdf", fake_docx_to_pdf)
+    pages = converters.iter_pages(source)
+    assert next(pages)[0] == 0
+    assert outputs[0].exists() and outputs[0].parent != tmp_path
+    assert [index for index, _ in pages] == [1]
+    assert not outputs[0].parent.exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["report.docx"]
@@ -0,0 +1,58 @@
+"""
+Repetition guard on synthetic token streams: table-heavy HTML output must decode
+to the end, a decoding loop must be stopped.
+
+    python -m pytest tests/test_generation.py
+"""
+import re
+import sys
+import random
+from pathlib import Path
+
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli.generation import (  # noqa: E402
+    GenerationController, SUGGESTED_REPETITION_GUARD, REPEAT_WINDOW, _PageGuard, repeated_fraction,
+)
+
+EOS = 0
+
+def _table_tokens(rows=120, columns=8, seed=0):
+    """
+    Token ids of a sparse numeric HTML table, one token per tag, digit or word.
+    """
+    rng = random.Random(seed)
+    html = "<table>"
+    for _ in range(rows):
+        cells = "".join(f"<td>{rng.choice([0, 0, 0, 1, 2, 5, 10, 12]) if rng.random() < 0.5 else ''}</td>"
+                        for _ in range(columns))
+        html += f"<tr>{cells}</tr>"
+    html += "</table>"
+    vocab = {}
+    return [vocab.setdefault(token, len(vocab) + 1) for token in re.findall(r"</?\w+>|\d|\w+", html)]
+
+def _run_guard(tokens, threshold):
+    """
+    Feed `tokens` to a _PageGuard one step at a time. Returns the stop reason and step.
+    """
+    guard = _PageGuard(budget=10 ** 6, repetition_guard=threshold, deadline=None, eos_ids={EOS}, prompt_length=0)
+    for step in range(1, len(tokens) + 1):
+        if bool(guard(torch.tensor([tokens[:step]]), None)[0]):
+            return guard.reasons[0], step
+    return guard.reasons[0] if guard.reasons else None, None
+
+def test_guard_is_off_by_default():
+    assert not GenerationController().repetition_guard
+
+def test_table_does_not_trip_guard():
+    tokens = _table_tokens()
+    assert len(tokens) > 2 * REPEAT_WINDOW
+    assert repeated_fraction(tokens[-REPEAT_WINDOW:]) < SUGGESTED_REPETITION_GUARD
+    assert _run_guard(tokens, SUGGESTED_REPETITION_GUARD) == (None, None)
+
+def test_loop_trips_guard():
+    tokens = _table_tokens(rows=20) + [7, 8, 9, 10, 11] * 300
+    reason, step = _run_guard(tokens, SUGGESTED_REPETITION_GUARD)
+    assert reason == "repetition"
+    assert step < len(tokens)
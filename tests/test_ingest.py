@@ -0,0 +1,150 @@
+"""
+URLIngester against a local http.server: retries on 5xx and timeouts, file type
+sniffing and sha256 de-duplication of repeated downloads.
+
+    python -m pytest tests/test_ingest.py
+"""
+import sys
+import time
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli.ingest import URLIngester  # noqa: E402
+
+PDF = b"%PDF-1.4\n" + b"0" * 2048 + b"\n%%EOF\n"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+
+class _Handler(BaseHTTPRequestHandler):
+    # path -> list of responses, one per request (the last one repeats):
+    # (status, body, headers) or ("sleep", seconds) to stall before answering
+    routes = {}
+    hits = {}
+
+    def do_GET(self):
+        responses = self.routes.get(self.path, [(404, b"", {})])
+        hit = self.hits.get(self.path, 0)
+        self.hits[self.path] = hit + 1
+        response = responses[min(hit, len(responses) - 1)]
+        if response[0] == "sleep":
+            time.sleep(response[1])
+            response = responses[-1]
+        status, body, headers = response
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            # The client gave up (read timeout)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    _Handler.routes, _Handler.hits = {}, {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}", _Handler
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+def _ingester(tmp_path, **kwargs):
+    kwargs.setdefault("retries", 2)
+    kwargs.setdefault("timeout", (2, 2))
+    return URLIngester(tmp_path / "downloads", **kwargs)
+
+def test_retries_5xx(server, tmp_path):
+    base, handler = server
+    handler.routes["/report.pdf"] = [(503, b"busy", {}), (502, b"", {}), (200, PDF, {})]
+    ingester = _ingester(tmp_path)
+    path = ingester.fetch(f"{base}/report.pdf")
+    ingester.close()
+    assert path.name == "report.pdf"
+    assert path.read_bytes() == PDF
+    assert handler.hits["/report.pdf"] == 3
+
+def test_gives_up_after_retries(server, tmp_path):
+    base, handler = server
+    handler.routes["/down.pdf"] = [(500, b"", {})]
+    ingester = _ingester(tmp_path, retries=1)
+    with pytest.raises(Exception):
+        ingester.fetch(f"{base}/down.pdf")
+    ingester.close()
+    assert not list((tmp_path / "downloads").glob("*.pdf"))
+
+def test_retries_timeout(server, tmp_path):
+    base, handler = server
+    handler.routes["/slow.pdf"] = [("sleep", 1.5), (200, PDF, {})]
+    ingester = _ingester(tmp_path, timeout=(2, 0.5))
+    path = ingester.fetch(f"{base}/slow.pdf")
+    ingester.close()
+    assert path.read_bytes() == PDF
+    assert handler.hits["/slow.pdf"] >= 2
+
+def test_sniffs_suffix(server, tmp_path):
+    base, handler = server
+    # Content decides over the URL and a generic Content-Type
+    handler.routes["/download?id=1"] = [(200, PDF, {"Content-Type": "application/octet-stream"})]
+    handler.routes["/picture.bin"] = [(200, PNG, {})]
+    # Unrecognized bytes fall back to the Content-Type header
+    handler.routes["/scan"] = [(200, b"\0" * 32, {"Content-Type": "image/jpeg; charset=binary",
+                                                  "Content-Disposition": 'attachment; filename="Scan 01.jpeg"'})]
+    handler.routes["/page.html"] = [(200, b"<html></html>", {"Content-Type": "text/html"})]
+    ingester = _ingester(tmp_path)
+    assert ingester.fetch(f"{base}/download?id=1").name == "download.pdf"
+    assert ingester.fetch(f"{base}/picture.bin").name == "picture.png"
+    assert ingester.fetch(f"{base}/scan").name == "Scan_01.jpg"
+    with pytest.raises(ValueError, match="unsupported content type"):
+        ingester.fetch(f"{base}/page.html")
+    ingester.close()
+
+def test_sha256_dedup(server, tmp_path):
+    base, handler = server
+    handler.routes["/a/doc.pdf"] = [(200, PDF, {})]
+    handler.routes["/b/doc.pdf"] = [(200, PDF + b"changed", {})]
+    ingester = _ingester(tmp_path)
+    first = ingester.fetch(f"{base}/a/doc.pdf")
+    # Same name in one run: the second URL gets its own file
+    second = ingester.fetch(f"{base}/b/doc.pdf")
+    ingester.close()
+    assert (first.name, second.name) == ("doc.pdf", "doc-2.pdf")
+
+    # A later run with identical content keeps the existing file and its mtime
+    mtime = first.stat().st_mtime_ns
+    time.sleep(0.01)
+    ingester = _ingester(tmp_path)
+    assert ingester.fetch(f"{base}/a/doc.pdf") == first
+    ingester.close()
+    assert first.stat().st_mtime_ns == mtime
+    assert not list((tmp_path / "downloads").glob(".download-*"))
+
+    # Changed content replaces it
+    handler.routes["/a/doc.pdf"] = [(200, PDF + b"v2", {})]
+    ingester = _ingester(tmp_path)
+    ingester.fetch(f"{base}/a/doc.pdf")
+    ingester.close()
+    assert first.read_bytes() == PDF + b"v2"
+
+def test_download_concurrently(server, tmp_path):
+    base, handler = server
+    for i in range(6):
+        handler.routes[f"/doc{i}.pdf"] = [(200, PDF + str(i).encode(), {})]
+    handler.routes["/missing.pdf"] = [(404, b"", {})]
+    ingester = _ingester(tmp_path, workers=3)
+    urls = [f"{base}/doc{i}.pdf" for i in range(6)] + [f"{base}/missing.pdf"]
+    results = {i: (path, error) for i, _, path, error in ingester.download(urls)}
+    ingester.close()
+    assert all(results[i][0].read_bytes() == PDF + str(i).encode() for i in range(6))
+    assert results[6][0] is None and "404" in results[6][1]
@@ -0,0 +1,36 @@
+"""
+Resume checkpoints: a run with the same input and settings continues the
+checkpoint, changing a setting that affects page text starts over.
+
+    python -m pytest tests/test_jobs.py
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli.jobs import JobManifest  # noqa: E402
+
+SETTINGS = {"hybrid": False, "resolution": "gundam", "layout": False}
+
+def _checkpoint(tmp_path):
+    source = tmp_path / "report.pdf"
+    source.write_bytes(b"%PDF-1.4")
+    manifest = JobManifest.open(tmp_path / "out", source, "document", **SETTINGS)
+    manifest.record(0, "page one")
+    manifest.record(1, "page two")
+    return source
+
+def test_same_settings_resume(tmp_path):
+    source = _checkpoint(tmp_path)
+    manifest = JobManifest.open(tmp_path / "out", source, "document", **SETTINGS)
+    assert manifest.completed == {0, 1}
+    assert manifest.read_page(1) == "page two"
+
+@pytest.mark.parametrize("name, value", [("hybrid", True), ("resolution", "auto"), ("layout", True)])
+def test_changed_setting_restarts(tmp_path, name, value):
+    source = _checkpoint(tmp_path)
+    manifest = JobManifest.open(tmp_path / "out", source, "document", **dict(SETTINGS, **{name: value}))
+    assert manifest.completed == set()
+    assert not manifest.job_dir.exists()
@@ -0,0 +1,39 @@
+"""
+Run metrics of a resident session: each `--serve` job starts from empty counters
+and page lists, so reports do not accumulate across jobs.
+
+    python -m pytest tests/test_metrics.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from deepseek_ocr_cli.core import OCRSession  # noqa: E402
+
+def _run_job(session, document, pages):
+    for page in range(1, pages + 1):
+        session.metrics.add("inference", 0.5)
+        session.metrics.add_tokens(100, 0.4)
+        session.metrics.add_page(document, page, 0.5, tokens=100)
+        session.blank_pages.append({"document": document, "page": page})
+        session.resolution_counts["gundam"] = session.resolution_counts.get("gundam", 0) + 1
+    session.pages_processed += pages
+    session.inference_time += 0.5 * pages
+
+def test_reset_run_clears_previous_job():
+    session = OCRSession(None, None)
+    session.load_time = 3.0
+    _run_job(session, "first.pdf", 3)
+    session.reset_run()
+    _run_job(session, "second.pdf", 2)
+
+    report = session.metrics.to_dict()
+    assert report["pages"] == 2 and report["generated_tokens"] == 200
+    assert report["stages"]["inference"]["count"] == 2
+    assert {record["document"] for record in report["per_page"]} == {"second.pdf"}
+    assert [record["document"] for record in session.blank_pages] == ["second.pdf"] * 2
+    assert session.resolution_counts == {"gundam": 2}
+    assert session.pages_processed == 2
+    # Startup timings belong to the server, not the job
+    assert session.load_time == 3.0
+    session.close()